@@ -124,6 +124,9 @@
 from dataclasses import dataclass, field
 from typing import Dict, List, Set, Any, Optional, Tuple
 from typing import Generator
+from array import array
+from bisect import bisect_left
+import re
 
 @dataclass
 class Token:
@@ -131,6 +134,51 @@ class Token:
     value: str
     position: int
 
+# Compact type codes used by TokenStream
+TOKEN_TYPES = ('IDENTIFIER', 'KEYWORD', '(', ')', '{', '}', ',', ';', 'ARROW', 'DOT')
+TOKEN_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+
+# One master pattern for the tokenizer. Comments, string/char literals and numeric
+# literals are matched only so that nothing inside them is tokenized; any other
+# character (operators, preprocessor '#', ...) is skipped by finditer itself.
+TOKEN_PATTERN = re.compile(
+    r'(?P<IDENTIFIER>[A-Za-z_]\w*)'
+    r'|(?P<SYMBOL>->|[(){},;.])'
+    r'|(?P<skip>'
+    r'//[^\n]*'                           # Single line comment
+    r'|/\*.*?(?:\*/|\Z)'                  # Multi-line comment, possibly unterminated
+    r'|"(?:[^"\\\n]|\\.)*"?'             # String literal
+    r"|'(?:[^'\\\n]|\\.)*'?"             # Char literal
+    r'|\d[\w.]*'                          # Numeric literal, including suffixes and hex
+    r')',
+    re.DOTALL
+)
+SYMBOL_CODES = {'->': TOKEN_CODES['ARROW'], '.': TOKEN_CODES['DOT'],
+                **{char: TOKEN_CODES[char] for char in '(){},;'}}
+
+@dataclass
+class TokenStream:
+    """Tokens of a whole file as parallel arrays of type codes and source offsets"""
+    content: str
+    types: array = field(default_factory=lambda: array('b'))
+    starts: array = field(default_factory=lambda: array('l'))
+    ends: array = field(default_factory=lambda: array('l'))
+    # Index of the first '{' or ';' token at or after each token, len(types) if none
+    next_stop: array = field(default_factory=lambda: array('l'))
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def value(self, index: int) -> str:
+        return self.content[self.starts[index]:self.ends[index]]
+
+    def slice_bounds(self, start_pos: int, end_pos: int) -> Tuple[int, int]:
+        """Token index range covering the source range [start_pos, end_pos)"""
+        return bisect_left(self.starts, start_pos), bisect_left(self.starts, end_pos)
+
+    def token(self, index: int) -> Token:
+        return Token(TOKEN_TYPES[self.types[index]], self.value(index), self.starts[index])
+
 class CFunctionParser:
     def __init__(self):
         self.keywords = {'if', 'while', 'for', 'switch', 'return'}
@@ -138,6 +186,41 @@ class CFunctionParser:
         
     def tokenize(self, content: str) -> Generator[Token, None, None]:
         """Tokenize C code content"""
+        stream = self.tokenize_compact(content)
+        for index in range(len(stream)):
+            yield stream.token(index)
+
+    def tokenize_compact(self, content: str) -> TokenStream:
+        """Tokenize C code content once into a TokenStream using TOKEN_PATTERN"""
+        stream = TokenStream(content)
+        types, starts, ends = stream.types, stream.starts, stream.ends
+        add_type, add_start, add_end = types.append, starts.append, ends.append
+        keywords = self.keywords
+        identifier, keyword = TOKEN_CODES['IDENTIFIER'], TOKEN_CODES['KEYWORD']
+        
+        for match in TOKEN_PATTERN.finditer(content):
+            kind = match.lastgroup
+            if kind == 'IDENTIFIER':
+                add_type(keyword if match.group() in keywords else identifier)
+            elif kind == 'SYMBOL':
+                add_type(SYMBOL_CODES[match.group()])
+            else:
+                continue
+            start, end = match.span()
+            add_start(start)
+            add_end(end)
+
+        stream.next_stop = self._compute_next_stop(types)
+        return stream
+
+    def _tokenize_compact_charwise(self, content: str) -> TokenStream:
+        """Character-loop tokenizer kept as the reference for benchmark_tokenizer.py.
+
+        Unlike tokenize_compact it does not skip string, char or numeric literals.
+        """
+        stream = TokenStream(content)
+        types, starts, ends = stream.types, stream.starts, stream.ends
+        identifier, keyword = TOKEN_CODES['IDENTIFIER'], TOKEN_CODES['KEYWORD']
         i = 0
         length = len(content)
         
@@ -167,101 +250,132 @@ class CFunctionParser:
                 start = i
                 while i < length and (content[i].isalnum() or content[i] == '_'):
                     i += 1
-                value = content[start:i]
-                token_type = 'KEYWORD' if value in self.keywords else 'IDENTIFIER'
-                yield Token(token_type, value, start)
+                types.append(keyword if content[start:i] in self.keywords else identifier)
+                starts.append(start)
+                ends.append(i)
                 continue
             
             # Operators and punctuation
             if char in '(){},;':
-                yield Token(char, char, i)
+                types.append(TOKEN_CODES[char])
+                starts.append(i)
+                ends.append(i + 1)
                 i += 1
                 continue
             
             # Arrow operator
             if char == '-' and i + 1 < length and content[i + 1] == '>':
-                yield Token('ARROW', '->', i)
+                types.append(TOKEN_CODES['ARROW'])
+                starts.append(i)
+                ends.append(i + 2)
                 i += 2
                 continue
                 
             # Dot operator
             if char == '.':
-                yield Token('DOT', '.', i)
+                types.append(TOKEN_CODES['DOT'])
+                starts.append(i)
+                ends.append(i + 1)
                 i += 1
                 continue
             
             i += 1
 
-    def is_function_declaration(self, tokens: List[Token], start_idx: int) -> bool:
+        stream.next_stop = self._compute_next_stop(types)
+        return stream
+
+    @staticmethod
+    def _compute_next_stop(types: array) -> array:
+        """One backward pass recording the next '{' or ';' for every token"""
+        brace, semicolon = TOKEN_CODES['{'], TOKEN_CODES[';']
+        count = len(types)
+        next_stop = array('l', [count]) * count
+        upcoming = count
+        for index in range(count - 1, -1, -1):
+            if types[index] == brace or types[index] == semicolon:
+                upcoming = index
+            next_stop[index] = upcoming
+        return next_stop
+
+    def is_function_declaration(self, tokens: TokenStream, start_idx: int,
+                                lower: int = 0, upper: Optional[int] = None) -> bool:
         """
         Check if the identifier at start_idx is part of a function declaration.
         Look for patterns like:
         - return_type function_name(params) {
         - struct_name* function_name(params) {
+        Only tokens in [lower, upper) are considered.
         """
-        if start_idx <= 0:
+        if start_idx <= lower:
             return False
+        if upper is None:
+            upper = len(tokens)
             
-        # Look ahead for opening brace after parentheses
-        i = start_idx
-        while i < len(tokens):
-            if tokens[i].type == '{':
-                return True
-            if tokens[i].type == ';':
-                return False
-            i += 1
-            
-        return False
+        # Opening brace before the next semicolon
+        stop = tokens.next_stop[start_idx]
+        return stop < upper and tokens.types[stop] == TOKEN_CODES['{']
+
+    def parse_function_calls(self, content: str, stream: Optional[TokenStream] = None,
+                             start_pos: int = 0, end_pos: Optional[int] = None) -> List[Tuple[str, str, int]]:
+        """Parse function calls returning (name, params, position).
+
+        When a TokenStream of the enclosing file is given, content is ignored and
+        only tokens in [start_pos, end_pos) are examined; positions are still
+        returned relative to start_pos.
+        """
+        if stream is None:
+            stream = self.tokenize_compact(content)
+            start_pos = 0
+            end_pos = len(content)
+        elif end_pos is None:
+            end_pos = len(stream.content)
+
+        types, starts = stream.types, stream.starts
+        identifier = TOKEN_CODES['IDENTIFIER']
+        open_paren, close_paren = TOKEN_CODES['('], TOKEN_CODES[')']
+        member_access = (TOKEN_CODES['ARROW'], TOKEN_CODES['DOT'])
 
-    def parse_function_calls(self, content: str) -> List[Tuple[str, str, int]]:
-        """Parse function calls returning (name, params, position)"""
-        tokens = list(self.tokenize(content))
+        lower, upper = stream.slice_bounds(start_pos, end_pos)
         calls = []
-        i = 0
+        i = lower
         
-        while i < len(tokens):
-            token = tokens[i]
-            
+        while i < upper:
             # Look for identifier followed by open parenthesis
-            if (token.type == 'IDENTIFIER' and 
-                i + 1 < len(tokens) and 
-                tokens[i + 1].type == '(' and
-                token.value not in self.keywords):
+            if (types[i] == identifier and
+                i + 1 < upper and
+                types[i + 1] == open_paren and
+                not self.is_function_declaration(stream, i, lower, upper)):
                 
-                # Skip if this is a function declaration
-                if not self.is_function_declaration(tokens, i):
-                    # Get function name
-                    func_name = token.value
-                    position = token.position
-                    
-                    # Handle member access (-> or .)
-                    if i > 1:
-                        prev_token = tokens[i - 1]
-                        if prev_token.type in ('ARROW', 'DOT'):
-                            if i > 2 and tokens[i - 2].type == 'IDENTIFIER':
-                                func_name = f"{tokens[i - 2].value}{prev_token.value}{func_name}"
-                    
-                    # Extract parameters
-                    i += 2  # Skip to first parameter
-                    param_tokens = []
-                    paren_count = 1
-                    
-                    while i < len(tokens) and paren_count > 0:
-                        if tokens[i].type == '(':
-                            paren_count += 1
-                        elif tokens[i].type == ')':
-                            paren_count -= 1
-                        if paren_count > 0:
-                            param_tokens.append(tokens[i])
-                        i += 1
-                    
-                    # Convert parameter tokens to string
-                    params = self._tokens_to_params(param_tokens)
-                    calls.append((func_name, params, position))
-            i += 1
+                # Get function name
+                func_name = stream.value(i)
+                position = starts[i] - start_pos
+                
+                # Handle member access (-> or .)
+                if i - lower > 1 and types[i - 1] in member_access:
+                    if i - lower > 2 and types[i - 2] == identifier:
+                        func_name = f"{stream.value(i - 2)}{stream.value(i - 1)}{func_name}"
+                
+                # Extract parameters
+                i += 2  # Skip to first parameter
+                param_start = i
+                paren_count = 1
+                
+                while i < upper and paren_count > 0:
+                    if types[i] == open_paren:
+                        paren_count += 1
+                    elif types[i] == close_paren:
+                        paren_count -= 1
+                    i += 1
+                
+                # Convert parameter tokens to string, excluding the closing parenthesis
+                param_end = i - 1 if paren_count == 0 else i
+                params = self._tokens_to_params(stream, param_start, param_end)
+                calls.append((func_name, params, position))
+            else:
+                i += 1
                 
         return calls
     
-    def _tokens_to_params(self, tokens: List[Token]) -> str:
+    def _tokens_to_params(self, tokens: TokenStream, start: int, end: int) -> str:
         """Convert parameter tokens to string representation"""
-        return ''.join(t.value for t in tokens).strip()
\ No newline at end of file
+        return ''.join(tokens.value(index) for index in range(start, end)).strip()
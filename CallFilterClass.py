@@ -0,0 +1,146 @@
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable, FrozenSet
+from collections import Counter
+from datetime import datetime
+from CodeEntityClass import CodeEntity
+from logger import logger
+import json
+import os
+import re
+
+
+class CallFilter:
+    """Single place that decides which calls are noise and which are RDK API calls.
+
+    Shared by the code parser, the log analyzer and the vector search so that the
+    common-function list and the API prefixes are defined once. Besides the
+    configured list, callees made from a large share of all functions (logging
+    and error-check macros mostly) can be suppressed automatically.
+    """
+
+    DEFAULT_COMMON_FUNCTIONS = frozenset((
+        'printf', 'scanf', 'malloc', 'free', 'strlen', 'strcpy', 'strcmp_s', 'ERR_CHK', 'CcspTraceWarning', 'ccspWifiDbgPrint',
+        'strcmp', 'memcpy', 'memset', 'fopen', 'fclose', 'AnscCopyString', 'strcat', 'AnscSizeOfString', 'CcspTraceInfo',
+        'main', 'if', 'for', 'while', 'switch', 'wifi_util_dbg_print', 'snprintf', 'strncmp', 'defined', 'remove', 'CcspTraceError',
+        'UNREFERENCED_PARAMETER', 'return', 'strncat', 'fprintf', 'strncpy', 'strtok', 'wifi_util_error_print', 'CcspWifiTrace',
+    ))
+    DEFAULT_API_PREFIXES = ('CCSP_', 'RDK_', 'RBUS_', 'TR181_', 'CcspCommon_', 'DM_', 'PSM_')
+    DEFAULT_CONFIG_PATH = "call_filter_config.json"
+
+    def __init__(self, common_functions: Optional[Iterable[str]] = None,
+                 api_prefixes: Optional[Iterable[str]] = None,
+                 min_caller_ratio: float = 0.05, min_callers: int = 50):
+        self.common_functions: FrozenSet[str] = frozenset(
+            self.DEFAULT_COMMON_FUNCTIONS if common_functions is None else common_functions
+        )
+        self.api_prefixes: Tuple[str, ...] = tuple(api_prefixes or self.DEFAULT_API_PREFIXES)
+        self.min_caller_ratio = min_caller_ratio  # Share of all functions calling a callee
+        self.min_callers = min_callers            # ... and an absolute floor, for small code bases
+        self.suppressed: Set[str] = set()
+
+        self._trie = self._build_trie(self.api_prefixes)
+        alternation = '|'.join(re.escape(p) for p in sorted(self.api_prefixes, key=len, reverse=True))
+        # Whole API names in free text (log messages, LLM responses)
+        self.api_pattern = re.compile(rf'\b(?:{alternation})\w+')
+        # API invocations in source, capturing the name after the prefix
+        self.api_call_pattern = re.compile(rf'(?:{alternation})(\w+)\s*\([^)]*\)', re.MULTILINE)
+
+    @classmethod
+    def from_config(cls, config_path: Optional[str] = None) -> 'CallFilter':
+        """Build a filter from an optional JSON config, falling back to the defaults.
+
+        Recognised keys: common_functions (added to the defaults),
+        replace_common_functions (bool), api_prefixes, min_caller_ratio, min_callers.
+        """
+        config_path = config_path or os.getenv('CALL_FILTER_CONFIG', cls.DEFAULT_CONFIG_PATH)
+        if not os.path.exists(config_path):
+            return cls()
+        try:
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+            common = set(config.get('common_functions', []))
+            if not config.get('replace_common_functions', False):
+                common |= cls.DEFAULT_COMMON_FUNCTIONS
+            return cls(
+                common_functions=common,
+                api_prefixes=config.get('api_prefixes'),
+                min_caller_ratio=config.get('min_caller_ratio', 0.05),
+                min_callers=config.get('min_callers', 50)
+            )
+        except Exception as e:
+            logger.error(f"Error loading call filter config {config_path}: {str(e)}")
+            return cls()
+
+    @staticmethod
+    def _build_trie(prefixes: Iterable[str]) -> Dict[str, Any]:
+        root: Dict[str, Any] = {}
+        for prefix in prefixes:
+            node = root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[''] = True  # End of a prefix
+        return root
+
+    def is_api(self, name: str) -> bool:
+        """True if name starts with one of the API prefixes and has something after it."""
+        node = self._trie
+        for idx, char in enumerate(name):
+            node = node.get(char)
+            if node is None:
+                return False
+            if '' in node and idx + 1 < len(name):
+                return True
+        return False
+
+    def is_common(self, name: str) -> bool:
+        """True for calls that carry no information: libc, logging, suppressed callees."""
+        return name in self.common_functions or name in self.suppressed
+
+    def find_apis(self, text: str) -> Set[str]:
+        return set(self.api_pattern.findall(text))
+
+    def suppress_ubiquitous(self, entities: Iterable[CodeEntity]) -> Set[str]:
+        """Suppress callees made from too many functions and drop their calls.
+
+        API calls are never suppressed. Returns the names that were newly suppressed.
+        """
+        functions = [entity for entity in entities if entity.type == 'function']
+        callers = Counter()
+        for entity in functions:
+            callers.update({call.function_name for call in entity.function_calls})
+
+        threshold = max(self.min_callers, self.min_caller_ratio * len(functions))
+        newly_suppressed = {
+            name for name, count in callers.items()
+            if count >= threshold and not self.is_api(name) and name not in self.suppressed
+        }
+        if not newly_suppressed:
+            return newly_suppressed
+
+        self.suppressed |= newly_suppressed
+        for entity in functions:
+            entity.function_calls = [
+                call for call in entity.function_calls if call.function_name not in self.suppressed
+            ]
+        logger.info(f"Suppressed {len(newly_suppressed)} ubiquitous callees: {sorted(newly_suppressed)}")
+        return newly_suppressed
+
+    def save(self, base_path: str = "vector_stores"):
+        """Persist the learned suppressions so incremental parses apply them too."""
+        os.makedirs(base_path, exist_ok=True)
+        with open(os.path.join(base_path, "call_filter.json"), 'w') as f:
+            json.dump({
+                'suppressed': sorted(self.suppressed),
+                'creation_timestamp': datetime.now().isoformat()
+            }, f)
+
+    def load_suppressed(self, base_path: str = "vector_stores") -> bool:
+        path = os.path.join(base_path, "call_filter.json")
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'r') as f:
+                self.suppressed = set(json.load(f).get('suppressed', []))
+            return True
+        except Exception as e:
+            logger.error(f"Error loading call filter: {str(e)}")
+            return False
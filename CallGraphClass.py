@@ -0,0 +1,294 @@
+from typing import Dict, List, Set, Any, Optional, Tuple
+from collections import defaultdict, deque
+from datetime import datetime
+from CodeEntityClass import CodeEntity
+from logger import logger
+import numpy as np
+import json
+import os
+
+
+class CallGraph:
+    """Call graph keyed by entity id with CSR forward and reverse adjacency arrays.
+
+    Entity ids are dense integers assigned in first-seen order, so the id of an
+    entity never changes across incremental updates. Edges also remember the
+    index of the originating FunctionCall in the caller's function_calls list,
+    which lets consumers get back to call parameters without name lookups.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.files: List[str] = []
+        # Calls whose target has not been parsed yet: target name -> [(src_id, call_idx)]
+        self.unresolved: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._edge_src = np.empty(0, dtype=np.int32)
+        self._edge_dst = np.empty(0, dtype=np.int32)
+        self._edge_call = np.empty(0, dtype=np.int32)
+        self._build_csr()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edge_src)
+
+    def _intern(self, name: str, file_path: str = "") -> int:
+        """Return the id for a name, assigning a new one if needed."""
+        entity_id = self.ids.get(name)
+        if entity_id is None:
+            entity_id = len(self.names)
+            self.ids[name] = entity_id
+            self.names.append(name)
+            self.files.append(file_path)
+        elif file_path:
+            self.files[entity_id] = file_path
+        return entity_id
+
+    def build(self, entities: Dict[str, CodeEntity]):
+        """Build the graph from scratch for a full set of entities."""
+        self.__init__()
+        for entity in entities.values():
+            self._intern(entity.name, str(entity.file_path))
+
+        src, dst, call_idx = [], [], []
+        for entity in entities.values():
+            self._collect_edges(entity, src, dst, call_idx)
+
+        self._set_edges(src, dst, call_idx)
+        logger.info(f"Built call graph with {len(self.names)} entities and {self.edge_count} edges")
+
+    def update_file(self, file_path: str, entities: List[CodeEntity]):
+        """Replace the outgoing edges of every entity defined in file_path."""
+        self.update_files({str(file_path): entities})
+
+    def update_files(self, entities_by_file: Dict[str, List[CodeEntity]]):
+        """Replace the edges of the entities defined in each file, rebuilding the CSR arrays once.
+
+        Functions that are no longer defined in their file keep their id but lose
+        their edges; calls to them become unresolved again until they reappear.
+        """
+        paths = {str(file_path) for file_path in entities_by_file}
+        stale_ids = {i for i, f in enumerate(self.files) if f in paths}
+
+        new_ids = set()
+        for file_path, entities in entities_by_file.items():
+            for entity in entities:
+                new_ids.add(self._intern(entity.name, str(file_path)))
+
+        removed = stale_ids - new_ids
+        for entity_id in removed:
+            self.files[entity_id] = ""
+
+        dropped = np.fromiter(stale_ids | new_ids, dtype=np.int32)
+        keep = ~np.isin(self._edge_src, dropped)
+        if removed:
+            incoming = keep & np.isin(self._edge_dst, np.fromiter(removed, dtype=np.int32))
+            for s, d, c in zip(self._edge_src[incoming].tolist(), self._edge_dst[incoming].tolist(),
+                               self._edge_call[incoming].tolist()):
+                self.unresolved[self.names[d]].append((s, c))
+            keep &= ~incoming
+
+        dropped = set(dropped.tolist())
+        for target, pending in list(self.unresolved.items()):
+            pending = [(s, c) for s, c in pending if s not in dropped]
+            if pending:
+                self.unresolved[target] = pending
+            else:
+                del self.unresolved[target]
+
+        src, dst, call_idx = [], [], []
+        for entities in entities_by_file.values():
+            for entity in entities:
+                self._collect_edges(entity, src, dst, call_idx)
+
+        # Calls made earlier to functions that only now appear in these files
+        for entities in entities_by_file.values():
+            for entity in entities:
+                for s, c in self.unresolved.pop(entity.name, []):
+                    src.append(s)
+                    dst.append(self.ids[entity.name])
+                    call_idx.append(c)
+
+        self._edge_src = np.concatenate([self._edge_src[keep], np.asarray(src, dtype=np.int32)])
+        self._edge_dst = np.concatenate([self._edge_dst[keep], np.asarray(dst, dtype=np.int32)])
+        self._edge_call = np.concatenate([self._edge_call[keep], np.asarray(call_idx, dtype=np.int32)])
+        self._build_csr()
+
+    def _collect_edges(self, entity: CodeEntity, src: List[int], dst: List[int], call_idx: List[int]):
+        src_id = self.ids[entity.name]
+        for idx, call in enumerate(entity.function_calls):
+            dst_id = self.ids.get(call.function_name)
+            # Nodes whose file no longer defines them are not call targets
+            if dst_id is None or not self.files[dst_id]:
+                self.unresolved[call.function_name].append((src_id, idx))
+                continue
+            src.append(src_id)
+            dst.append(dst_id)
+            call_idx.append(idx)
+
+    def _set_edges(self, src: List[int], dst: List[int], call_idx: List[int]):
+        self._edge_src = np.asarray(src, dtype=np.int32)
+        self._edge_dst = np.asarray(dst, dtype=np.int32)
+        self._edge_call = np.asarray(call_idx, dtype=np.int32)
+        self._build_csr()
+
+    def _build_csr(self):
+        """Rebuild forward and reverse CSR arrays from the edge list."""
+        n = len(self.names)
+
+        order = np.lexsort((self._edge_call, self._edge_src))
+        self.fwd_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self._edge_src, minlength=n), out=self.fwd_offsets[1:])
+        self.fwd_targets = self._edge_dst[order]
+        self.fwd_calls = self._edge_call[order]
+
+        order = np.argsort(self._edge_dst, kind='stable')
+        self.rev_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self._edge_dst, minlength=n), out=self.rev_offsets[1:])
+        self.rev_sources = self._edge_src[order]
+        self.rev_calls = self._edge_call[order]
+
+        # Plain-list mirrors for traversal, built lazily on first use
+        self._traversal_lists = {}
+
+    def resolve_call_components(self, entities: Dict[str, CodeEntity]) -> int:
+        """Set FunctionCall.component for every resolved edge in one gather over the id table."""
+        component_names = sorted({entity.component for entity in entities.values()})
+        component_codes = {name: code for code, name in enumerate(component_names)}
+
+        by_id = [entities.get(name) for name in self.names]
+        entity_components = np.array(
+            [component_codes[e.component] if e is not None else -1 for e in by_id],
+            dtype=np.int32
+        )
+        edge_components = entity_components[self._edge_dst]
+
+        updated = 0
+        for src, call_idx, code in zip(self._edge_src.tolist(), self._edge_call.tolist(),
+                                       edge_components.tolist()):
+            caller = by_id[src]
+            if code < 0 or caller is None or call_idx >= len(caller.function_calls):
+                continue
+            caller.function_calls[call_idx].component = component_names[code]
+            updated += 1
+        return updated
+
+    def callee_ids(self, entity_id: int) -> np.ndarray:
+        return self.fwd_targets[self.fwd_offsets[entity_id]:self.fwd_offsets[entity_id + 1]]
+
+    def caller_ids(self, entity_id: int) -> np.ndarray:
+        return self.rev_sources[self.rev_offsets[entity_id]:self.rev_offsets[entity_id + 1]]
+
+    def callees(self, name: str) -> List[str]:
+        """Direct callees of a function, in call order."""
+        entity_id = self.ids.get(name)
+        if entity_id is None:
+            return []
+        return [self.names[i] for i in dict.fromkeys(self.callee_ids(entity_id).tolist())]
+
+    def callers(self, name: str) -> List[str]:
+        """Direct callers of a function."""
+        entity_id = self.ids.get(name)
+        if entity_id is None:
+            return []
+        return [self.names[i] for i in dict.fromkeys(self.caller_ids(entity_id).tolist())]
+
+    def callee_edges(self, name: str) -> List[Tuple[str, int]]:
+        """Outgoing edges as (callee name, index into the caller's function_calls)."""
+        entity_id = self.ids.get(name)
+        if entity_id is None:
+            return []
+        start, end = self.fwd_offsets[entity_id], self.fwd_offsets[entity_id + 1]
+        return [
+            (self.names[dst], call)
+            for dst, call in zip(self.fwd_targets[start:end].tolist(), self.fwd_calls[start:end].tolist())
+        ]
+
+    def transitive_callees(self, name: str, max_depth: Optional[int] = None) -> Set[str]:
+        """All functions reachable from name, optionally bounded by depth."""
+        return self._reachable(name, 'forward', max_depth)
+
+    def transitive_callers(self, name: str, max_depth: Optional[int] = None) -> Set[str]:
+        """All functions that can reach name, optionally bounded by depth."""
+        return self._reachable(name, 'reverse', max_depth)
+
+    def _reachable(self, name: str, direction: str, max_depth: Optional[int]) -> Set[str]:
+        start_id = self.ids.get(name)
+        if start_id is None:
+            return set()
+
+        if direction not in self._traversal_lists:
+            if direction == 'forward':
+                arrays = (self.fwd_offsets, self.fwd_targets)
+            else:
+                arrays = (self.rev_offsets, self.rev_sources)
+            self._traversal_lists[direction] = (arrays[0].tolist(), arrays[1].tolist())
+        offsets, targets = self._traversal_lists[direction]
+
+        seen = {start_id}
+        queue = deque([(start_id, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for neighbour in targets[offsets[node]:offsets[node + 1]]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append((neighbour, depth + 1))
+
+        seen.discard(start_id)
+        return {self.names[i] for i in seen}
+
+    def save(self, base_path: str = "vector_stores"):
+        """Persist the CSR arrays next to the vector store indices."""
+        os.makedirs(base_path, exist_ok=True)
+        np.savez(
+            os.path.join(base_path, "call_graph.npz"),
+            fwd_offsets=self.fwd_offsets,
+            fwd_targets=self.fwd_targets,
+            fwd_calls=self.fwd_calls
+        )
+        with open(os.path.join(base_path, "call_graph_metadata.json"), 'w') as f:
+            json.dump({
+                'names': self.names,
+                'files': self.files,
+                'unresolved': {name: pending for name, pending in self.unresolved.items()},
+                'total_edges': self.edge_count,
+                'creation_timestamp': datetime.now().isoformat()
+            }, f)
+
+    @classmethod
+    def load(cls, base_path: str = "vector_stores") -> Optional['CallGraph']:
+        """Load a persisted call graph, or None if there is none on disk."""
+        arrays_path = os.path.join(base_path, "call_graph.npz")
+        metadata_path = os.path.join(base_path, "call_graph_metadata.json")
+        if not (os.path.exists(arrays_path) and os.path.exists(metadata_path)):
+            return None
+
+        try:
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+            arrays = np.load(arrays_path)
+
+            graph = cls()
+            graph.names = metadata['names']
+            graph.files = metadata['files']
+            graph.ids = {name: i for i, name in enumerate(graph.names)}
+            for name, pending in metadata.get('unresolved', {}).items():
+                graph.unresolved[name] = [tuple(p) for p in pending]
+
+            # The reverse index is derived from the forward one
+            offsets = arrays['fwd_offsets']
+            graph._edge_src = np.repeat(np.arange(len(graph.names), dtype=np.int32), np.diff(offsets))
+            graph._edge_dst = arrays['fwd_targets'].astype(np.int32)
+            graph._edge_call = arrays['fwd_calls'].astype(np.int32)
+            graph._build_csr()
+
+            logger.info(f"Loaded call graph with {len(graph.names)} entities and {graph.edge_count} edges")
+            return graph
+        except Exception as e:
+            logger.error(f"Error loading call graph: {str(e)}")
+            return None
@@ -0,0 +1,351 @@
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable, Union
+from datetime import datetime, timedelta
+from LogEntryClass import LogEntry
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_micros(timestamp: datetime) -> int:
+    """Naive datetime to integer microseconds since 1970-01-01 (no timezone applied)."""
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(micros: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+class _GrowableArray:
+    """NumPy array with amortised appends (capacity doubles when full)."""
+
+    def __init__(self, dtype, capacity: int = 1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        needed = self._size + len(values)
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:needed] = values
+        self._size = needed
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self._size]
+
+
+class _Dictionary:
+    """Dictionary encoding of a string column; code 0 is always the empty string."""
+
+    def __init__(self):
+        self.values: List[str] = ['']
+        self.codes: Dict[str, int] = {'': 0}
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, values: Union[str, Iterable[str]]) -> List[int]:
+        if isinstance(values, str):
+            values = [values]
+        return [self.codes[value] for value in values if value in self.codes]
+
+
+class ColumnarLogStore:
+    """Column-oriented log entries with a time index and per-value posting lists.
+
+    Rows are stored in arrival order: timestamps as int64 epoch microseconds,
+    module, level, component and function dictionary-encoded into int32 codes,
+    messages in one UTF-8 blob addressed by offsets, and API names as a CSR list
+    of codes. A permutation keeps the rows in time order for binary search, and
+    the level, module and component posting lists hold positions in that order,
+    so a window query is two searchsorted calls per posting list. An optional
+    int32 column holds the template id of each row (-1 when not mined), and an
+    optional CSR list the code entities each row was linked to.
+    """
+
+    FACETS = ('module', 'level', 'component')
+
+    def __init__(self):
+        self.dictionaries = {name: _Dictionary() for name in ('module', 'level', 'component', 'function', 'api', 'entity')}
+        self._timestamps = _GrowableArray(np.int64)
+        self._thread_ids = _GrowableArray(np.int64)
+        self._template_ids = _GrowableArray(np.int32)
+        self._codes = {name: _GrowableArray(np.int32) for name in ('module', 'level', 'component', 'function')}
+        self._message_blob = bytearray()
+        self._message_offsets = _GrowableArray(np.int64)
+        self._message_offsets.extend([0])
+        self._api_offsets = _GrowableArray(np.int64)
+        self._api_offsets.extend([0])
+        self._api_codes = _GrowableArray(np.int32)
+        self._entity_offsets = _GrowableArray(np.int64)
+        self._entity_offsets.extend([0])
+        self._entity_codes = _GrowableArray(np.int32)
+
+        # Time order: row ids sorted by timestamp, and the sorted timestamps
+        self._order = _GrowableArray(np.int64)
+        self._sorted_timestamps = _GrowableArray(np.int64)
+        # facet -> code -> ascending positions in the time order
+        self._postings: Dict[str, List[_GrowableArray]] = {facet: [] for facet in self.FACETS}
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self._timestamps, self._thread_ids, self._template_ids, self._message_offsets, self._api_offsets,
+                  self._api_codes, self._entity_offsets, self._entity_codes, self._order, self._sorted_timestamps,
+                  *self._codes.values()]
+        arrays += [posting for postings in self._postings.values() for posting in postings]
+        return sum(array.values.nbytes for array in arrays) + len(self._message_blob)
+
+    def append(self, entries: List[LogEntry], template_ids: Optional[Iterable[int]] = None,
+               entity_links: Optional[List[Iterable[str]]] = None):
+        """Add entries in any order; the time index is extended or rebuilt as needed."""
+        if not entries:
+            return
+        first_row = len(self)
+        timestamps = np.fromiter((entry.timestamp_us for entry in entries), dtype=np.int64, count=len(entries))
+        self._timestamps.extend(timestamps)
+        self._thread_ids.extend([int(entry.thread_id) if str(entry.thread_id).isdigit() else -1 for entry in entries])
+        self._template_ids.extend(list(template_ids) if template_ids is not None else np.full(len(entries), -1))
+        for name, attribute in (('module', 'module'), ('level', 'level'),
+                                ('component', 'component'), ('function', 'function_name')):
+            encode = self.dictionaries[name].encode
+            self._codes[name].extend([encode(getattr(entry, attribute) or '') for entry in entries])
+
+        offsets = []
+        api_offsets = []
+        api_codes = []
+        encode_api = self.dictionaries['api'].encode
+        api_total = len(self._api_codes)
+        for entry in entries:
+            self._message_blob += entry.message.encode('utf-8', errors='ignore')
+            offsets.append(len(self._message_blob))
+            for api in sorted(entry.api_calls):
+                api_codes.append(encode_api(api))
+            api_offsets.append(api_total + len(api_codes))
+        self._message_offsets.extend(offsets)
+        self._api_offsets.extend(api_offsets)
+        self._api_codes.extend(api_codes)
+        self._extend_entity_links(entity_links if entity_links is not None else [()] * len(entries))
+
+        batch_order = np.argsort(timestamps, kind='stable')
+        sorted_batch = timestamps[batch_order]
+        if len(self._sorted_timestamps) and sorted_batch[0] < self._sorted_timestamps.values[-1]:
+            self._merge_time_index(batch_order + first_row, sorted_batch)
+            return
+
+        start = len(self._order)
+        self._order.extend(batch_order + first_row)
+        self._sorted_timestamps.extend(sorted_batch)
+        positions = np.arange(start, start + len(entries), dtype=np.int64)
+        for facet in self.FACETS:
+            codes = self._codes[facet].values[first_row:][batch_order]
+            self._extend_postings(facet, codes, positions)
+
+    def _extend_entity_links(self, entity_links: List[Iterable[str]]):
+        encode = self.dictionaries['entity'].encode
+        total = len(self._entity_codes)
+        offsets = []
+        codes = []
+        for names in entity_links:
+            codes.extend(encode(name) for name in sorted(names))
+            offsets.append(total + len(codes))
+        self._entity_offsets.extend(offsets)
+        self._entity_codes.extend(codes)
+
+    def set_entity_links(self, entity_links: List[Iterable[str]]):
+        """Replace the entity links of all rows, given in row order."""
+        self._entity_offsets = _GrowableArray(np.int64)
+        self._entity_offsets.extend([0])
+        self._entity_codes = _GrowableArray(np.int32)
+        self._extend_entity_links(entity_links)
+
+    @staticmethod
+    def _csr_positions(offsets: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions of all values of the given rows of a CSR column, and each row's value count."""
+        starts = offsets[rows]
+        lengths = offsets[rows + 1] - starts
+        # Without a Python loop over rows: row i contributes starts[i] .. starts[i] + lengths[i]
+        index = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(int(lengths.sum()))
+        return index, lengths
+
+    def linked_entities(self, rows: np.ndarray) -> Dict[str, int]:
+        """Entity name -> number of the given rows linked to it."""
+        index, _ = self._csr_positions(self._entity_offsets.values, np.asarray(rows, dtype=np.int64))
+        if not len(index):
+            return {}
+        counts = np.bincount(self._entity_codes.values[index])
+        names = self.dictionaries['entity'].values
+        return {names[code]: int(count) for code, count in enumerate(counts) if count}
+
+    def retain(self, rows: Iterable[int]) -> 'ColumnarLogStore':
+        """A new store with only the given rows, renumbered in the given order.
+
+        Dictionaries are shared with this store, so codes stay valid; every
+        column is gathered with array operations.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        kept = ColumnarLogStore()
+        kept.dictionaries = self.dictionaries
+        timestamps = self._timestamps.values[rows]
+        kept._timestamps.extend(timestamps)
+        kept._thread_ids.extend(self._thread_ids.values[rows])
+        kept._template_ids.extend(self._template_ids.values[rows])
+        for name, codes in self._codes.items():
+            kept._codes[name].extend(codes.values[rows])
+
+        offsets = self._message_offsets.values
+        blob = memoryview(self._message_blob)
+        kept._message_blob = bytearray(b''.join([blob[offsets[row]:offsets[row + 1]] for row in rows]))
+        kept._message_offsets.extend(np.cumsum(offsets[rows + 1] - offsets[rows]))
+        for offsets_name, codes_name in (('_api_offsets', '_api_codes'), ('_entity_offsets', '_entity_codes')):
+            index, lengths = self._csr_positions(getattr(self, offsets_name).values, rows)
+            getattr(kept, offsets_name).extend(np.cumsum(lengths))
+            getattr(kept, codes_name).extend(getattr(self, codes_name).values[index])
+
+        order = np.argsort(timestamps, kind='stable')
+        kept._order.extend(order)
+        kept._sorted_timestamps.extend(timestamps[order])
+        positions = np.arange(len(rows), dtype=np.int64)
+        for facet in self.FACETS:
+            kept._extend_postings(facet, kept._codes[facet].values[order], positions)
+        return kept
+
+    def _extend_postings(self, facet: str, codes: np.ndarray, positions: np.ndarray):
+        postings = self._postings[facet]
+        while len(postings) < len(self.dictionaries[facet].values):
+            postings.append(_GrowableArray(np.int64, capacity=16))
+        for code in np.unique(codes):
+            postings[code].extend(positions[codes == code])
+
+    def _merge_time_index(self, batch_rows: np.ndarray, sorted_batch: np.ndarray):
+        """Merge a time-sorted batch that overlaps the indexed range, in linear time.
+
+        Batches from different files interleave in time, so this is the usual case
+        on a full ingest; existing posting positions are shifted rather than rebuilt.
+        """
+        old_timestamps = self._sorted_timestamps.values
+        insert_at = np.searchsorted(old_timestamps, sorted_batch, 'right')
+        new_positions = insert_at + np.arange(len(sorted_batch), dtype=np.int64)
+
+        order = np.insert(self._order.values, insert_at, batch_rows)
+        timestamps = np.insert(old_timestamps, insert_at, sorted_batch)
+        self._order = _GrowableArray(np.int64, capacity=max(2 * len(order), 1024))
+        self._order.extend(order)
+        self._sorted_timestamps = _GrowableArray(np.int64, capacity=max(2 * len(order), 1024))
+        self._sorted_timestamps.extend(timestamps)
+
+        for facet in self.FACETS:
+            batch_codes = self._codes[facet].values[batch_rows]
+            postings = self._postings[facet]
+            while len(postings) < len(self.dictionaries[facet].values):
+                postings.append(_GrowableArray(np.int64, capacity=16))
+            for code, posting in enumerate(postings):
+                old = posting.values
+                shifted = old + np.searchsorted(insert_at, old, 'right')
+                added = new_positions[batch_codes == code]
+                if not len(added) and np.array_equal(shifted, old):
+                    continue
+                merged = np.sort(np.concatenate([shifted, added]), kind='stable') if len(added) else shifted
+                postings[code] = _GrowableArray(np.int64, capacity=max(2 * len(merged), 16))
+                postings[code].extend(merged)
+
+    def query(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              limit: Optional[int] = None, **facets: Union[str, Iterable[str], None]) -> np.ndarray:
+        """Row ids in time order with start <= timestamp <= end and matching facets.
+
+        Facets are module, level and component, each a value or a list of values.
+        limit keeps the latest rows.
+        """
+        sorted_timestamps = self._sorted_timestamps.values
+        if start is None and end is None and not any(value is not None for value in facets.values()):
+            if limit is None:
+                return self._order.values.copy()
+            return self._order.values[max(len(sorted_timestamps) - max(limit, 0), 0):] if limit > 0 else np.empty(0, np.int64)
+        low = 0 if start is None else int(np.searchsorted(sorted_timestamps, to_micros(start), 'left'))
+        high = len(sorted_timestamps) if end is None else int(np.searchsorted(sorted_timestamps, to_micros(end), 'right'))
+        if low >= high:
+            return np.empty(0, dtype=np.int64)
+
+        positions = None
+        for facet, values in facets.items():
+            if facet not in self.FACETS:
+                raise ValueError(f"Unknown facet {facet!r}, expected one of {self.FACETS}")
+            if values is None:
+                continue
+            postings = self._postings[facet]
+            parts = []
+            for code in self.dictionaries[facet].lookup(values):
+                if code < len(postings):
+                    posting = postings[code].values
+                    parts.append(posting[np.searchsorted(posting, low):np.searchsorted(posting, high)])
+            matched = np.sort(np.concatenate(parts)) if len(parts) > 1 else (parts[0] if parts else np.empty(0, np.int64))
+            positions = matched if positions is None else np.intersect1d(positions, matched, assume_unique=True)
+            if not len(positions):
+                return np.empty(0, dtype=np.int64)
+
+        if positions is None:
+            positions = np.arange(low, high, dtype=np.int64)
+        if limit is not None:
+            positions = positions[-limit:] if limit > 0 else positions[:0]
+        return self._order.values[positions]
+
+    def recent(self, count: int) -> np.ndarray:
+        return self.query(limit=count)
+
+    def timestamp(self, row: int) -> datetime:
+        return from_micros(self._timestamps.values[row])
+
+    def template_id(self, row: int) -> int:
+        return int(self._template_ids.values[row])
+
+    def template_rows(self, template_id: int, limit: Optional[int] = None) -> np.ndarray:
+        """Row ids of a template in time order; limit keeps the latest rows."""
+        order = self._order.values
+        rows = order[self._template_ids.values[order] == template_id]
+        if limit is not None:
+            rows = rows[-limit:] if limit > 0 else rows[:0]
+        return rows
+
+    def message(self, row: int) -> str:
+        offsets = self._message_offsets.values
+        return self._message_blob[offsets[row]:offsets[row + 1]].decode('utf-8', errors='ignore')
+
+    def entry(self, row: int) -> LogEntry:
+        values = {name: self.dictionaries[name].values[self._codes[name].values[row]] for name in self._codes}
+        api_offsets = self._api_offsets.values
+        api_names = self.dictionaries['api'].values
+        thread_id = int(self._thread_ids.values[row])
+        return LogEntry(
+            timestamp=self.timestamp(row),
+            module=values['module'],
+            level=values['level'],
+            thread_id=str(thread_id) if thread_id >= 0 else '',
+            message=self.message(row),
+            component=values['component'],
+            function_name=values['function'],
+            api_calls={api_names[code] for code in self._api_codes.values[api_offsets[row]:api_offsets[row + 1]]}
+        )
+
+    def entries(self, rows: Iterable[int]) -> List[LogEntry]:
+        return [self.entry(int(row)) for row in rows]
+
+    def distinct(self, name: str) -> Set[str]:
+        """Values of a dictionary-encoded column ('module', 'level', 'component', 'function', 'api')."""
+        return set(self.dictionaries[name].values[1:])
+
+    def counts(self, facet: str) -> Dict[str, int]:
+        codes = self._codes[facet].values
+        counts = np.bincount(codes, minlength=len(self.dictionaries[facet].values))
+        return {value: int(count) for value, count in zip(self.dictionaries[facet].values, counts) if value and count}
@@ -0,0 +1,55 @@
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable
+from pathlib import Path
+import re
+
+
+class ComponentMatcher:
+    """Resolve RDK component names from file paths using one precompiled pattern."""
+
+    # Common RDK component names
+    DEFAULT_COMPONENTS = (
+        'CcspCr', 'CcspCommonLibrary', 'CcspPsm', 'RdkWanManager',
+        'RdkWifiManager', 'RdkCellularManager', 'CcspTr069Pa',
+        'CcspLMLite', 'CcspEthAgent', 'Utopia', 'hal', 'webpa',
+        'OneWifi', 'CcspWifiAgent'
+    )
+
+    def __init__(self, components: Optional[Iterable[str]] = None):
+        self.components = tuple(components or self.DEFAULT_COMPONENTS)
+        self._by_lower = {component.lower(): component for component in self.components}
+
+        # Longest names first so that e.g. 'CcspCr' never shadows a longer name
+        # starting at the same position
+        alternation = '|'.join(
+            re.escape(name) for name in sorted(self._by_lower, key=len, reverse=True)
+        )
+        self._pattern = re.compile(alternation)
+        self._directory_cache: Dict[str, Optional[str]] = {}
+
+    def match_part(self, part: str) -> Optional[str]:
+        """Return the component whose name occurs in a single path part, if any."""
+        match = self._pattern.search(part.lower())
+        return self._by_lower[match.group(0)] if match else None
+
+    def match_directory(self, directory: Path) -> Optional[str]:
+        """Return the first component found along a directory path, cached per directory."""
+        key = str(directory)
+        if key not in self._directory_cache:
+            component = None
+            for part in directory.parts:
+                component = self.match_part(part)
+                if component:
+                    break
+            self._directory_cache[key] = component
+        return self._directory_cache[key]
+
+    def component_for(self, file_path: Path) -> str:
+        """Determine RDK component name from file path"""
+        file_path = Path(file_path)
+        component = self.match_directory(file_path.parent) or self.match_part(file_path.name)
+        if component:
+            return component
+
+        # If no known component found, use parent directory name
+        parts = file_path.parts
+        return parts[-2] if len(parts) > 1 else 'Unknown'
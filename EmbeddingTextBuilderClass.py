@@ -0,0 +1,106 @@
+from typing import Dict, List, Set, Any, Optional, Tuple
+from CodeEntityClass import CodeEntity
+import hashlib
+import json
+import re
+
+
+class EmbeddingTextBuilder:
+    """Build compact embedding text for code entities with per-field token budgets.
+
+    Compared to CodeEntity.to_embedding_text the description is stripped of
+    markdown, calls are listed once each, comments are removed from the source
+    and every field is cut to its budget. The version string covers the builder
+    revision and its configuration; it is stored in the index metadata so that
+    indices built with different text are not mixed.
+    """
+
+    BUILDER_REVISION = 2
+    DEFAULT_BUDGETS = {
+        'description': 96,
+        'calls': 64,
+        'structs': 24,
+        'apis': 24,
+        'content': 320,
+        'description_index': 256  # Text of the separate description vector
+    }
+
+    TOKEN = re.compile(r'\w+|[^\w\s]')
+    COMMENT_OR_STRING = re.compile(r'/\*.*?(?:\*/|\Z)|//[^\n]*|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'', re.DOTALL)
+    MARKDOWN = re.compile(r'[#*`>|]+|^\s*[-+]\s+', re.MULTILINE)
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, strip_comments: bool = True,
+                 include_call_components: bool = True):
+        self.budgets = dict(self.DEFAULT_BUDGETS)
+        self.budgets.update(budgets or {})
+        self.strip_comments = strip_comments
+        self.include_call_components = include_call_components
+
+    @property
+    def version(self) -> str:
+        config = json.dumps({
+            'budgets': self.budgets,
+            'strip_comments': self.strip_comments,
+            'include_call_components': self.include_call_components
+        }, sort_keys=True)
+        return f"{self.BUILDER_REVISION}-{hashlib.md5(config.encode()).hexdigest()[:8]}"
+
+    def truncate(self, text: str, budget: int) -> str:
+        """Cut text after its budget-th token (words and punctuation count as tokens)."""
+        if budget <= 0:
+            return ""
+        for count, match in enumerate(self.TOKEN.finditer(text), 1):
+            if count == budget:
+                return text[:match.end()]
+        return text
+
+    def _strip_comments(self, content: str) -> str:
+        def replace(match: re.Match) -> str:
+            text = match.group(0)
+            return text if text[0] in '"\'' else ' '
+        content = self.COMMENT_OR_STRING.sub(replace, content)
+        return '\n'.join(line.rstrip() for line in content.split('\n') if line.strip())
+
+    def _clean_description(self, description: str) -> str:
+        return ' '.join(self.MARKDOWN.sub(' ', description).split())
+
+    def _calls_text(self, entity: CodeEntity) -> str:
+        calls = {}
+        for call in entity.function_calls:
+            component = call.component if self.include_call_components and call.component not in ('', 'Unknown') else None
+            calls.setdefault(call.function_name, component)
+        return ", ".join(f"{name} ({component})" if component else name for name, component in calls.items())
+
+    def body(self, entity: CodeEntity) -> str:
+        """The entity source as it is embedded, before the content budget is applied."""
+        return self._strip_comments(entity.content) if self.strip_comments else entity.content
+
+    def description_text(self, entity: CodeEntity) -> str:
+        """Text for the description vector; empty when the entity has no description."""
+        description = self._clean_description(entity.description)
+        if not description:
+            return ""
+        return f"{entity.name} ({entity.type}, {entity.component}): " + self.truncate(
+            description, self.budgets['description_index']
+        )
+
+    def build(self, entity: CodeEntity, include_description: bool = True) -> str:
+        content = self.body(entity)
+        parts = [
+            f"Name: {entity.name}",
+            f"Type: {entity.type}",
+            f"Component: {entity.component}"
+        ]
+        fields = [
+            ("Description", 'description', self._clean_description(entity.description) if include_description else ""),
+            ("Function Calls", 'calls', self._calls_text(entity)),
+            ("Structs Used", 'structs', ", ".join(dict.fromkeys(entity.structs_used))),
+            ("API Calls", 'apis', ", ".join(dict.fromkeys(entity.api_calls)))
+        ]
+        for label, field, value in fields:
+            value = self.truncate(value, self.budgets[field])
+            if value:
+                parts.append(f"{label}: {value}")
+        parts.append("Context:")
+        parts.append(self.truncate(content, self.budgets['content']))
+        return "\n".join(parts)
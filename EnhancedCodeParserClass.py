@@ -1,17 +1,34 @@
-from CFunctionParserClass import CFunctionParser
+from CFunctionParserClass import CFunctionParser, TokenStream
 from FunctionCallClass import FunctionCall
 from logger import logger
 from CodeEntityClass import CodeEntity
+from CallGraphClass import CallGraph
+from IncludeGraphClass import IncludeGraph
+from SymbolTableClass import SymbolTable
+from PreprocessorClass import Preprocessor
+from CallFilterClass import CallFilter
 import re
-import networkx as nx
+import time
+from bisect import bisect_right
 from typing import Dict, List, Set, Any, Optional, Tuple
 
+
+class ParseTimeoutError(Exception):
+    """Raised when a single file takes longer than the parser's parse_timeout."""
+
+
 class EnhancedCodeParser:
-    def __init__(self):
-        self.call_graph = nx.DiGraph()
+    def __init__(self, context_lines: int = 40, parse_timeout: Optional[float] = 30.0,
+                 preprocessor: Optional[Preprocessor] = None, call_filter: Optional[CallFilter] = None):
+        self.context_lines = context_lines  # Lines of context stored before and after each function
+        self.parse_timeout = parse_timeout  # Seconds allowed per file, None to disable
+        self.preprocessor = preprocessor    # Optional #if resolution and macro table
+        self.call_filter = call_filter or CallFilter.from_config()
+        self.call_graph = CallGraph()
+        self.include_graph = IncludeGraph()
+        self.c_parser = CFunctionParser()
         self._compile_patterns()
-        self.known_struct_types = set()  # Initialize empty set for known struct types
-        self.type_definitions = {}  # Store typedef mappings
+        self.symbol_table = SymbolTable()  # Structs, unions, enums and typedefs seen so far
         
     def _compile_patterns(self):
         # Your existing patterns...
@@ -21,7 +38,7 @@ class EnhancedCodeParser:
                 r'(?:inline\s+)?'   # Optional inline
                 r'(?:extern\s+)?'   # Optional extern
                 r'(?!if\b|for\b|while\b|switch\b)'  # Exclude control statements
-                r'(?:\w+\s*\*?\s+)+' # Return type(s)
+                r'(?:\w+(?:\s*\*\s+|\s+))+' # Return type(s)
                 r'(\w+)\s*\(',      # Function name and opening parenthesis
                 re.MULTILINE
             ),
@@ -51,27 +68,20 @@ class EnhancedCodeParser:
             #     r'\s*(?://[/\s]*<?([^>]*))?',  # Optional documentation
             #     re.MULTILINE
             # ),
-            #-------------
-            'union': re.compile(
-                r'union\s*\{([^{}]*(?:\{[^{}]*\}[^{}]*)*)\}\s*(\w+);',
-                re.MULTILINE | re.DOTALL
-            ),
-            #-------------
-            #Updated struct pattern to handle both direct struct definitions and typedefs
-            'struct': re.compile(
-                r'(?:typedef\s+)?struct\s*'  # Optional typedef and struct keyword
-                r'(_?\w+)?\s*'               # Optional struct name with possible underscore
-                r'\{'                        # Opening brace
-                r'([^{}]*(?:\{[^{}]*\}[^{}]*)*)\}'  # Struct body
-                r'\s*(_struct_pack_)?'       # Optional _struct_pack_ attribute
-                r'(?:\s*(\w+))?;',           # Optional typedef name
-                re.MULTILINE | re.DOTALL
+            # Linear scan for struct/union/enum definitions: comments, literals,
+            # aggregate keywords and the symbols that open, close or end them
+            'aggregate_scan': re.compile(
+                r'(?P<comment>/\*.*?(?:\*/|\Z)|//[^\n]*)'
+                r'|(?P<literal>"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\')'
+                r'|(?P<keyword>\b(?:typedef|struct|union|enum)\b)'
+                r'|(?P<symbol>[{}();=])',
+                re.DOTALL
             ),
             # New pattern for separate typedef statements
             'typedef_declaration': re.compile(
-                r'typedef\s+struct\s+(_?\w+)\s+'    # struct name
-                r'(\w+)\s*,\s*'                     # type name
-                r'\*\s*([P_]\w+);',                 # pointer type name
+                r'typedef\s+(?:(struct|union|enum)\s+)?(\w+)\s+'  # optional kind and target name
+                r'(\*\s*)?(\w+)\s*'                               # type name, possibly a pointer
+                r'(?:,\s*\*\s*(\w+)\s*)?;',                        # optional pointer type name
                 re.MULTILINE
             ),
             # Updated member line pattern to handle more cases
@@ -89,15 +99,8 @@ class EnhancedCodeParser:
                 r'\s*(?:/\*\s*([^*]*)\*/)?',  # Optional trailing comment
                 re.MULTILINE
             ),
-            'doc_comment': re.compile(
-                r'/\*\s*([^*]*)\*/',
-                re.MULTILINE | re.DOTALL
-            ),
             #============================================
-            'api_call': re.compile(
-                r'(?:CCSP_|RDK_|RBUS_|TR181_|CcspCommon_|DM_|PSM_)(\w+)\s*\([^)]*\)',
-                re.MULTILINE
-            ),
+            'api_call': self.call_filter.api_call_pattern,
             'include': re.compile(
                 r'#include\s*[<"]([^>"]+)[>"]',
                 re.MULTILINE
@@ -106,13 +109,19 @@ class EnhancedCodeParser:
                 r'struct\s+(\w+)\s+\w+',
                 re.MULTILINE
             ),
-            # 'function_call': re.compile(
-            #     r'\b(\w+)\s*\(((?:[^()]*|\([^()]*\))*)\)',
-            #     re.MULTILINE
-            # )
-            'function_call': re.compile(
-                r'\b([a-zA-Z_]\w*)\s*\(((?:[^()]*|\((?:[^()]*|\([^()]*\))*\))*)\)',
-                re.MULTILINE
+            # Logging calls whose format strings end up in device logs
+            'log_call': re.compile(
+                r'\b(CcspTrace\w*|Ccsp\w*Trace\w*|AnscTrace\w*|\w+_(?:dbg|info|error|warn|warning)_print'
+                r'|RDK_LOG|\w+_LOG(?:_\w+)?|\w+Log(?:Info|Error|Warning|Debug)|syslog|v?[fs]?n?printf)\s*\('
+            ),
+            # Tokens of a call's argument list, for picking out its string literals
+            'argument_token': re.compile(
+                r'(?P<comment>/\*.*?\*/|//[^\n]*)'
+                r'|(?P<literal>"(?:[^"\\\n]|\\.)*")'
+                r'|(?P<char>\'(?:[^\'\\\n]|\\.)*\')'
+                r'|(?P<identifier>[A-Za-z_]\w*)'
+                r'|(?P<symbol>[^\s\w])',
+                re.DOTALL
             )
         }
         
@@ -130,11 +139,37 @@ class EnhancedCodeParser:
                 return pos
         return -1
 
-    def find_functions(self, content: str) -> List[Dict[str, str]]:
+    @staticmethod
+    def _line_offsets(content: str) -> List[int]:
+        """Start offset of every line in content, computed once per file."""
+        offsets = [0]
+        pos = content.find('\n')
+        while pos != -1:
+            offsets.append(pos + 1)
+            pos = content.find('\n', pos + 1)
+        return offsets
+
+    @staticmethod
+    def _line_index(line_offsets: List[int], position: int) -> int:
+        """Zero-based line containing position."""
+        return bisect_right(line_offsets, position) - 1
+
+    @staticmethod
+    def _check_deadline(deadline: Optional[float]):
+        if deadline is not None and time.monotonic() > deadline:
+            raise ParseTimeoutError("parse timeout exceeded")
+
+    def find_functions(self, content: str, line_offsets: Optional[List[int]] = None,
+                       deadline: Optional[float] = None) -> List[Dict[str, Any]]:
         """Find complete C functions including their bodies."""
         functions = []
+        if line_offsets is None:
+            line_offsets = self._line_offsets(content)
         
         for match in self.patterns['function'].finditer(content):
+            self._check_deadline(deadline)
+            if self.preprocessor is not None and self.preprocessor.is_function_macro(match.group(1)):
+                continue
             start_pos = match.start()
             
             # Find opening brace
@@ -159,13 +194,112 @@ class EnhancedCodeParser:
                 'name': match.group(1),
                 'content': complete_function,
                 'parameters': params_str,
-                'start_line': content[:start_pos].count('\n') + 1,
-                'end_line': content[:end_pos].count('\n') + 1
+                'start_pos': start_pos,
+                'end_pos': end_pos,
+                'start_line': self._line_index(line_offsets, start_pos) + 1,
+                'end_line': self._line_index(line_offsets, end_pos) + 1
             })
         
         return functions
     
-    def get_context(self, content: str, match_start: int, match_end: int, context_lines: int = 40) -> Tuple[str, str]:
+    def find_aggregates(self, content: str, deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Find struct, union and enum definitions at any nesting depth in one pass.
+
+        Comments and literals are skipped by the scanner, braces are tracked on a
+        stack, and each definition is finished at the first ';' (or other
+        statement symbol) after its closing brace, so the scan is linear in the
+        size of the file however deeply definitions are nested.
+        """
+        aggregates = []
+        comment_starts, comment_ends = [], []
+        stack = []            # One entry per open brace: aggregate dict or None
+        pending = None        # (kind, keyword_end, start) of a keyword awaiting its '{'
+        typedef_start = None  # Position of 'typedef' in the current statement
+        closed = None         # Aggregate whose '}' was seen, awaiting its declarators
+        
+        for count, match in enumerate(self.patterns['aggregate_scan'].finditer(content)):
+            if not count & 1023:
+                self._check_deadline(deadline)
+            
+            group = match.lastgroup
+            if group == 'comment':
+                comment_starts.append(match.start())
+                comment_ends.append(match.end())
+                continue
+            if group == 'literal':
+                continue
+            
+            text = match.group()
+            pos = match.start()
+            if closed is not None and text != '(' and text != ')':
+                closed['end_pos'] = pos + 1 if text == ';' else pos
+                closed['trailer'] = content[closed['body_end'] + 1:pos]
+                aggregates.append(closed)
+                closed = None
+            
+            if group == 'keyword':
+                if text == 'typedef':
+                    typedef_start = pos
+                else:
+                    pending = (text, match.end(), pos if typedef_start is None else typedef_start)
+                continue
+            
+            if text == '{':
+                frame = None
+                if pending is not None:
+                    kind, keyword_end, start = pending
+                    names = re.findall(r'\w+', content[keyword_end:pos])
+                    frame = {
+                        'kind': kind,
+                        'name': names[0] if names else None,
+                        'is_typedef': typedef_start is not None,
+                        'start_pos': start,
+                        'body_start': pos + 1
+                    }
+                stack.append(frame)
+                typedef_start = None
+            elif text == '}':
+                frame = stack.pop() if stack else None
+                if frame is not None:
+                    frame['body_end'] = pos
+                    closed = frame
+            elif text == ';':
+                typedef_start = None
+            # '(' , ')' and '=' mean the keyword was only naming a type, e.g. in a
+            # prototype, a cast or an initialised declaration
+            pending = None
+        
+        if closed is not None:
+            closed['end_pos'] = len(content)
+            closed['trailer'] = content[closed['body_end'] + 1:]
+            aggregates.append(closed)
+        
+        for aggregate in aggregates:
+            aggregate['body'] = content[aggregate['body_start']:aggregate['body_end']]
+            aggregate['content'] = content[aggregate['start_pos']:aggregate['end_pos']]
+            aggregate['documentation'] = self._preceding_comment(
+                content, aggregate['start_pos'], comment_starts, comment_ends
+            )
+        aggregates.sort(key=lambda aggregate: aggregate['start_pos'])
+        return aggregates
+
+    @staticmethod
+    def _preceding_comment(content: str, position: int, comment_starts: List[int],
+                           comment_ends: List[int]) -> str:
+        """Return the comment directly above position, separated only by whitespace."""
+        idx = bisect_right(comment_ends, position) - 1
+        if idx < 0 or content[comment_ends[idx]:position].strip():
+            return ""
+        comment = content[comment_starts[idx]:comment_ends[idx]]
+        if comment.startswith('//'):
+            return comment.lstrip('/').strip()
+        comment = comment[2:-2] if comment.endswith('*/') else comment[2:]
+        lines = [line.strip().lstrip('*').strip() for line in comment.split('\n')]
+        return '\n'.join(line for line in lines if line).strip()
+
+    def get_context(self, content: str, match_start: int, match_end: int,
+                    context_lines: Optional[int] = None,
+                    line_offsets: Optional[List[int]] = None) -> Tuple[str, str]:
         """
         Get context before and after a match with proper line counting and boundary handling.
         
@@ -173,48 +307,40 @@ class EnhancedCodeParser:
             content (str): The full source code content
             match_start (int): Starting position of the match
             match_end (int): Ending position of the match
-            context_lines (int): Number of context lines to include before and after
+            context_lines (int): Number of context lines to include before and after,
+                defaults to the parser's context_lines
+            line_offsets (List[int]): Precomputed line offsets of content, see _line_offsets
         
         Returns:
             Tuple[str, str]: Context before and after the match
         """
-        # Split content into lines and get line numbers
-        lines = content.split('\n')
+        if context_lines is None:
+            context_lines = self.context_lines
+        if line_offsets is None:
+            line_offsets = self._line_offsets(content)
+        total_lines = len(line_offsets)
         
         # Find the line number where the match starts
-        current_pos = 0
-        current_line = 0
-        for i, line in enumerate(lines):
-            next_pos = current_pos + len(line) + 1  # +1 for newline
-            if current_pos <= match_start < next_pos:
-                current_line = i
-                break
-            current_pos = next_pos
+        current_line = self._line_index(line_offsets, match_start)
+        if not 0 <= current_line < total_lines:
+            current_line = 0
         
         # Calculate line ranges for context
         start_line = max(0, current_line - context_lines)
-        end_line = min(len(lines), current_line + context_lines + 1)
+        end_line = min(total_lines, current_line + context_lines + 1)
         
-        # Get the matching line
-        matching_line = lines[current_line] if 0 <= current_line < len(lines) else ""
+        # Slice each context block straight out of content; the -1 drops the
+        # newline that terminates the last line of the block
+        context_before = ''
+        if start_line < current_line:
+            context_before = content[line_offsets[start_line]:line_offsets[current_line] - 1]
         
-        # Extract context before
-        context_before = []
-        for i in range(start_line, current_line):
-            if i >= 0 and i < len(lines):
-                context_before.append(lines[i])
+        context_after = ''
+        if current_line + 1 < end_line:
+            after_end = line_offsets[end_line] - 1 if end_line < total_lines else len(content)
+            context_after = content[line_offsets[current_line + 1]:after_end]
         
-        # Extract context after
-        context_after = []
-        for i in range(current_line + 1, end_line):
-            if i < len(lines):
-                context_after.append(lines[i])
-        
-        return (
-            '\n'.join(context_before),
-            '\n'.join(context_after)
-        )
-
+        return context_before, context_after
 
 
     # def parse_file(self, file_path: str, component_name: str) -> List[CodeEntity]:
@@ -279,7 +405,7 @@ class EnhancedCodeParser:
                         referenced_structs.add(struct_name)
                 
                 # Check for typedef'd struct types
-                elif member_type in self.known_struct_types:
+                elif member_type in self.symbol_table:
                     referenced_structs.add(member_type)
             
             # Add referenced structs to entity
@@ -367,31 +493,60 @@ class EnhancedCodeParser:
     #         logger.error(f"Error parsing file {file_path}: {str(e)}")
     #         return []
     #===================================================================================
-    def parse_file(self, file_path: str, component_name: str) -> List[CodeEntity]:
-        """Parse a file and extract code entities including functions and structures."""
+    def _included_headers(self, file_path: str, content: str) -> Set[str]:
+        """Headers a file includes, directly or through other headers, as far as the include graph knows."""
+        headers = set()
+        for match in self.patterns['include'].finditer(content):
+            header = self.include_graph.resolve(match.group(1), file_path)
+            if header is not None and header not in headers:
+                headers.add(header)
+                headers |= self.include_graph.transitive_includes(header)
+        return headers
+
+    def parse_file(self, file_path: str, component_name: str, include_functions: bool = True) -> List[CodeEntity]:
+        """Parse a file and extract code entities including functions and structures.
+
+        Headers are parsed with include_functions=False: their prototypes have no
+        bodies, so only typedefs and structures are extracted from them.
+        """
         try:
             logger.info(f"Starting to parse file: {file_path}")
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                 content = f.read()
             
+            # Blank the #if branches inactive in this build profile and learn macros
+            if self.preprocessor is not None:
+                content = self.preprocessor.process(content, file_path, self._included_headers(file_path, content))
+            
             # # Pre-process: handle and store type definitions
             # self._process_type_definitions(content)
             # Process typedef declarations first
             self._process_typedef_declarations(content)
             
+            deadline = time.monotonic() + self.parse_timeout if self.parse_timeout else None
             entities = []
             includes = [m.group(1) for m in self.patterns['include'].finditer(content)]
             logger.info(f"Found {len(includes)} includes in {file_path}")
+            line_offsets = self._line_offsets(content)
+            # Tokenize the whole file once; every function reads its slice of it
+            token_stream = self.c_parser.tokenize_compact(content) if include_functions else None
             
             # Step 1: Parse Functions
             logger.info("Starting function parsing")
-            functions = self.find_functions(content)
+            functions = self.find_functions(content, line_offsets, deadline) if include_functions else []
             for func in functions:
+                self._check_deadline(deadline)
                 entity = self._create_function_entity_from_dict(
-                    func, content, file_path, component_name, includes
+                    func, content, file_path, component_name, includes, line_offsets
                 )
                 if entity:
-                    self._analyze_function_interactions(entity, content)
+                    self._analyze_function_interactions(
+                        entity, content, token_stream, func['start_pos'], line_offsets
+                    )
+                    entity.structs_used = self.symbol_table.structs_used(entity)
+                    entity.metadata['log_formats'] = self.find_log_formats(
+                        entity.content, entity.metadata.get('line_number', 1)
+                    )
                     entities.append(entity)
                     logger.info(f"Successfully appended {entity.type} {entity.name} to entities")
             logger.info(f"Parsed {len(functions)} functions")
@@ -399,44 +554,84 @@ class EnhancedCodeParser:
             # Step 2: Parse Structures
             logger.info("Starting structure parsing")
             
-            # Process typedef structs
-            # typedef_matches = list(self.patterns['struct'].finditer(content))
-            # for match in typedef_matches:
-            #     logger.info(f"Struct Match from Mtaches : {match.group(0)}")
-            #     entity = self._create_struct_entity(match, content, file_path, component_name, includes)
-            #     if entity:
-            #         entities.append(entity)
-            struct_matches = list(self.patterns['struct'].finditer(content))
-            for match in struct_matches:
-                # logger.info(f"Struct Match from Mtaches : {match.group(0)}")
-                entity = self._create_struct_entity(match, content, file_path, component_name, includes)
+            aggregates = self.find_aggregates(content, deadline)
+            for aggregate in aggregates:
+                entity = self._create_struct_entity(
+                    aggregate, file_path, component_name, includes, line_offsets
+                )
                 if entity:
                     entities.append(entity)
                     logger.info(f"Successfully appended {entity.type} {entity.name} to entities")
-            logger.info(f"Parsed {len(struct_matches)} Structures")
+            logger.info(f"Parsed {len(aggregates)} Structures")
+
+            self.include_graph.add_file(file_path, includes)
             logger.info(f"returing entities back to process single file.. ")
             return entities
             
+        except ParseTimeoutError:
+            logger.warning(f"Skipping file {file_path}: parsing took longer than {self.parse_timeout}s")
+            return []
         except Exception as e:
             logger.error(f"Error parsing file {file_path}: {str(e)}")
             return []
         
+    def find_log_formats(self, content: str, first_line: int = 1) -> List[Dict[str, Any]]:
+        """printf-style format strings passed to logging calls in a function body."""
+        formats = []
+        for match in self.patterns['log_call'].finditer(content):
+            format_string = self._call_format_string(content, match.end())
+            if format_string:
+                formats.append({
+                    'format': format_string,
+                    'call': match.group(1),
+                    'line': first_line + content.count('\n', 0, match.start())
+                })
+        return formats
+
+    def _call_format_string(self, content: str, start: int, max_chars: int = 2000) -> str:
+        """Longest run of adjacent string literals in the argument list opened before start.
+
+        Identifiers between literals (PRIu64 and friends) become conversions; the
+        module name of RDK_LOG loses to the longer format string.
+        """
+        depth = 1
+        runs = []
+        current: List[str] = []
+        for token in self.patterns['argument_token'].finditer(content, start, min(len(content), start + max_chars)):
+            kind = token.lastgroup
+            if kind == 'comment':
+                continue
+            if kind == 'literal':
+                current.append(token.group()[1:-1])
+                continue
+            if kind == 'identifier' and current:
+                # "%" PRIu64 completes a conversion; other macros expand to text
+                current.append('s' if current[-1].endswith('%') else '%s')
+                continue
+            if current:
+                runs.append(''.join(current))
+                current = []
+            symbol = token.group()
+            if symbol in '([{':
+                depth += 1
+            elif symbol in ')]}':
+                depth -= 1
+                if depth == 0:
+                    break
+        if current:
+            runs.append(''.join(current))
+        return max(runs, key=len) if runs else ''
+
     def _process_typedef_declarations(self, content: str):
-        """Process separate typedef declarations for structs and their pointer types."""
+        """Register typedefs that name an existing type and their pointer types."""
         for match in self.patterns['typedef_declaration'].finditer(content):
-            struct_name = match.group(1)
-            type_name = match.group(2)
-            ptr_type_name = match.group(3)
+            kind, target, is_pointer, type_name, ptr_type_name = match.groups()
+            if kind:
+                target = SymbolTable.type_key(kind, target)
             
-            self.type_definitions[type_name] = {
-                'base_type': f'struct {struct_name}',
-                'is_pointer': False
-            }
-            self.type_definitions[ptr_type_name] = {
-                'base_type': f'struct {struct_name}',
-                'is_pointer': True
-            }
-            self.known_struct_types.update([type_name, ptr_type_name])
+            self.symbol_table.add_typedef(type_name, target, bool(is_pointer))
+            if ptr_type_name:
+                self.symbol_table.add_typedef(ptr_type_name, target, True)
 
     # def _parse_struct_members(self, struct_content: str) -> List[Dict]:
     #     """Parse structure members with improved array handling."""
@@ -663,59 +858,73 @@ class EnhancedCodeParser:
     #         logger.error(f"Error creating struct entity: {str(e)}")
     #         return None
 
-    def _create_struct_entity(self, match: re.Match, content: str, file_path: str, component_name: str, includes: List[str]) -> Optional[CodeEntity]:
+    def _create_struct_entity(self, aggregate: Dict[str, Any], file_path: str, component_name: str,
+                              includes: List[str], line_offsets: List[int]) -> Optional[CodeEntity]:
         try:
-            struct_name = match.group(1)
-            struct_body = match.group(2)
-            struct_pack = match.group(3)
-            typedef_name = match.group(4)
-            
-            # Get documentation comment before the struct
-            start_pos = content.find(match.group(0))
-            prev_content = content[:start_pos].rstrip()
-            doc_match = list(self.patterns['doc_comment'].finditer(prev_content))
-            documentation = doc_match[-1].group(1).strip() if doc_match else ""
+            kind = aggregate['kind']
+            struct_name = aggregate['name']
+            trailer = aggregate['trailer']
+            documentation = aggregate['documentation']
+            struct_pack = '_struct_pack_' in trailer or 'packed' in trailer
+            
+            # The first declarator after the closing brace is the typedef name
+            typedef_name = None
+            if aggregate['is_typedef']:
+                trailer = re.sub(r'__attribute__\s*\(\(.*?\)\)|_struct_pack_', ' ', trailer, flags=re.DOTALL)
+                declarator = re.search(r'\w+', trailer.split(',')[0])
+                typedef_name = declarator.group(0) if declarator else None
             
             # Parse members
-            members = self._parse_struct_members(struct_body)
+            if kind == 'enum':
+                members = self._parse_enum_members(aggregate['body'])
+            else:
+                members = self._parse_struct_members(aggregate['body'])
             
             # Determine the final type name
             final_name = typedef_name if typedef_name else struct_name
             if not final_name:
                 return None
                 
-            # Store in type definitions
-            self.type_definitions[final_name] = {
-                'original_type': 'struct',
-                'struct_name': struct_name,
-                'has_struct_pack': bool(struct_pack),
-                'members': members,
-                'documentation': documentation
-            }
-            self.known_struct_types.add(final_name)
+            self.symbol_table.add_aggregate(
+                kind, struct_name, typedef_name, members, file_path, documentation
+            )
             
-            return CodeEntity(
+            entity = CodeEntity(
                 name=final_name,
                 type='struct',
-                content=match.group(0),
+                content=aggregate['content'],
                 file_path=file_path,
                 component=component_name,
                 includes=includes,
                 metadata={
+                    'kind': kind,
                     'struct_name': struct_name,
                     'members': members,
-                    'has_struct_pack': bool(struct_pack),
+                    'has_struct_pack': struct_pack,
                     'documentation': documentation,
-                    'line_number': content[:start_pos].count('\n') + 1,
+                    'line_number': self._line_index(line_offsets, aggregate['start_pos']) + 1,
                     'member_count': len(members),
                     'has_arrays': any('array_dimensions' in m for m in members),
                     'has_pointers': any(m.get('is_pointer', False) for m in members)
                 }
             )
+            entity.structs_used = self.symbol_table.structs_used(entity)
+            return entity
             
         except Exception as e:
             logger.error(f"Error creating struct entity: {str(e)}")
             return None
+
+    def _parse_enum_members(self, enum_content: str) -> List[Dict]:
+        """Parse enumerators and their explicit values, if any."""
+        content = re.sub(r'/\*.*?\*/|//[^\n]*', '', enum_content, flags=re.DOTALL)
+        members = []
+        for item in content.split(','):
+            name, _, value = item.partition('=')
+            name = name.strip()
+            if re.fullmatch(r'[A-Za-z_]\w*', name):
+                members.append({'name': name, 'type': 'enumerator', 'value': value.strip() or None})
+        return members
     # #==============================================================================================
 
     def _is_embedded_struct(self, content: str, start_pos: int) -> bool:
@@ -742,7 +951,8 @@ class EnhancedCodeParser:
         content: str, 
         file_path: str, 
         component_name: str, 
-        includes: List[str]
+        includes: List[str],
+        line_offsets: Optional[List[int]] = None
     ) -> Optional[CodeEntity]:
         """Create a function entity from the dictionary returned by find_functions."""
         try:
@@ -757,12 +967,13 @@ class EnhancedCodeParser:
             # print("\n function_content : ",function_content)
             # Get context
             # print("\ncontent : ",content)
-            start_pos = content.find(function_content)
-            print("\nstart_pos : ",start_pos)
-            end_pos = start_pos + len(function_content)
-            print("\nend_pos : ",end_pos)
+            # find_functions already knows where the function lives
+            start_pos = func_dict.get('start_pos')
+            if start_pos is None:
+                start_pos = content.find(function_content)
+            end_pos = func_dict.get('end_pos', start_pos + len(function_content))
             context_before, context_after = self.get_context(
-                content, start_pos, end_pos
+                content, start_pos, end_pos, line_offsets=line_offsets
             )
             # print("\ncontext_before : ",context_before)
             # print("\ncontext_after : ",context_after)
@@ -839,10 +1050,26 @@ class EnhancedCodeParser:
 
 
 
-    def _analyze_function_interactions(self, entity: CodeEntity, content: str):
-        """Analyze function calls using the token-based parser"""
-        parser = CFunctionParser()
-        function_calls = parser.parse_function_calls(entity.content)
+    def _analyze_function_interactions(self, entity: CodeEntity, content: str,
+                                       token_stream: Optional[TokenStream] = None,
+                                       start_pos: Optional[int] = None,
+                                       line_offsets: Optional[List[int]] = None):
+        """Analyze function calls using the token-based parser.
+
+        With the file's token stream and the function's start offset, calls are read
+        from the shared stream instead of re-tokenizing the function body.
+        """
+        if token_stream is not None and start_pos is not None:
+            function_calls = self.c_parser.parse_function_calls(
+                content, token_stream, start_pos, start_pos + len(entity.content)
+            )
+            if line_offsets is None:
+                line_offsets = self._line_offsets(content)
+        else:
+            function_calls = self.c_parser.parse_function_calls(entity.content)
+            start_pos = 0
+            line_offsets = self._line_offsets(entity.content)
+        first_line = self._line_index(line_offsets, start_pos)
         
         processed_functions = set()
         
@@ -852,12 +1079,13 @@ class EnhancedCodeParser:
             # Skip if already processed or common function
             if func_name in processed_functions or self._is_common_function(func_name):
                 continue
+            if self.preprocessor is not None and self.preprocessor.is_function_macro(func_name):
+                continue
                 
             processed_functions.add(func_name)
             
             # Determine if it's an API call
-            is_api = any(func_name.startswith(prefix) for prefix in 
-                        ('CCSP_', 'RDK_', 'RBUS_', 'TR181_', 'CcspCommon_', 'DM_', 'PSM_'))
+            is_api = self.call_filter.is_api(func_name)
             
             # Create function call object
             call = FunctionCall(
@@ -866,7 +1094,7 @@ class EnhancedCodeParser:
                 parameters=self._parse_parameters(params),
                 return_type="Unknown",
                 is_api=is_api,
-                line_number=entity.content[:position].count('\n') + 1
+                line_number=self._line_index(line_offsets, start_pos + position) - first_line + 1
             )
             
             entity.function_calls.append(call)
@@ -1156,20 +1384,8 @@ class EnhancedCodeParser:
         return content[context_start:line_start].strip(), content[line_end:context_end].strip()
     #===================================================================================================
 
-    @staticmethod
-    def _is_common_function(name: str) -> bool:
-        # common_functions = {
-        #     'printf', 'scanf', 'malloc', 'free', 'strlen', 'strcpy',
-        #     'strcmp', 'memcpy', 'memset', 'fopen', 'fclose',
-        #     'main', 'if', 'for', 'while', 'switch'
-        # }
-        common_functions = {
-            'printf', 'scanf', 'malloc', 'free', 'strlen', 'strcpy','strcmp_s','ERR_CHK','CcspTraceWarning','ccspWifiDbgPrint',
-            'strcmp', 'memcpy', 'memset', 'fopen', 'fclose','AnscCopyString','strcat','AnscSizeOfString','CcspTraceInfo',
-            'main', 'if', 'for', 'while', 'switch','wifi_util_dbg_print','snprintf','strncmp','defined','remove','CcspTraceError',
-            'UNREFERENCED_PARAMETER','return','strncat','fprintf','strncpy','strtok','wifi_util_error_print','CcspWifiTrace',
-        }
-        return name in common_functions
+    def _is_common_function(self, name: str) -> bool:
+        return self.call_filter.is_common(name)
 
     @staticmethod
     def _extract_return_type(function_content: str) -> str:
@@ -1,6 +1,8 @@
 from typing import List, Dict, Set, Optional
 from dataclasses import dataclass
 from CodeEntityClass import CodeEntity
+from LogIndexClass import LogIndex
+from LogVectorIndexClass import LogVectorIndex
 import re
 from logging import getLogger
 
@@ -17,41 +19,40 @@ class LogAnalysisResult:
 class EnhancedRDKAssistant:
     def __init__(self, embedding_model, log_vector_store, code_vector_store, llm):
         self.embedding_model = embedding_model
-        self.log_vector_store = log_vector_store
+        self.log_vector_store: Optional[LogVectorIndex] = log_vector_store
+        self.log_vector_base_path = "vector_stores"
         self.code_vector_store = code_vector_store
         self.llm = llm  # Gemini or other LLM client
         
-    def create_log_index(self, logs: List[str]):
-        """Create vector store index for RDK logs"""
-        texts = []
-        metadatas = []
-        
-        for idx, log in enumerate(logs):
-            texts.append(log)
-            metadatas.append({
-                'log_id': f'log_{idx}',
-                'timestamp': self._extract_timestamp(log)  # Implement based on your log format
-            })
-            
-        self.log_vector_store = FAISS.from_texts(
-            texts=texts,
-            embedding=self.embedding_model,
-            metadatas=metadatas
-        )
+    def create_log_index(self, log_index: LogIndex, base_path: str = "vector_stores") -> LogVectorIndex:
+        """Create or load the template vector index for the logs held by a LogIndex"""
+        self.log_vector_store = (LogVectorIndex.load(self.embedding_model, log_index, base_path)
+                                 or LogVectorIndex(self.embedding_model, log_index))
+        self.log_vector_base_path = base_path
+        if self.log_vector_store.update():
+            self.log_vector_store.save(base_path)
+        return self.log_vector_store
     
     def analyze_logs(self, query: str, k: int = 5) -> LogAnalysisResult:
         """Analyze logs to extract relevant code entities"""
-        # Search for relevant logs
-        relevant_logs = self.log_vector_store.similarity_search_with_score(query, k=k)
-        
-        # Combine relevant log snippets
-        log_snippets = [log.page_content for log, _ in relevant_logs]
+        # Pick up templates mined since the last query
+        if self.log_vector_store.update():
+            self.log_vector_store.save(self.log_vector_base_path)
+        relevant_logs = self.log_vector_store.search(query, k=k, rows_per_template=3)
+        
+        # One snippet per template: the template, how often it occurred and its latest lines
+        log_snippets = [
+            f"[{hit['count']}x {', '.join(hit['components'])}] {hit['template']}\n"
+            + '\n'.join(f"  {entry.timestamp.isoformat()} {entry.message}" for entry in hit['entries'])
+            for hit in relevant_logs
+        ]
         
         # Create a prompt for the LLM to extract code entities
+        snippets_text = '\n'.join(log_snippets)
         prompt = f"""
         Analyze these log snippets and extract mentioned code entities. 
         Log snippets:
-        {'\n'.join(log_snippets)}
+        {snippets_text}
         
         Please identify:
         1. Function names
@@ -144,11 +145,12 @@ class EnhancedRDKAssistant:
             context.append(f"Component: {entity.component}")
         
         # Generate response using the enhanced context
+        context_text = '\n'.join(context)
         prompt = f"""
         Query: {query}
         
         Context:
-        {'\n'.join(context)}
+        {context_text}
         
         Please provide a detailed response addressing the query using the provided context.
         Include specific references to both the code entities and relevant log patterns where applicable.
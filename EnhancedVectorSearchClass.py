@@ -6,27 +6,44 @@ import re
 from CodeEntityClass import CodeEntity
 from LogEntryClass import LogEntry
 from LogAnalyzerClass import LogAnalyzer
+from LogIndexClass import LogIndex
+from LogCorrelatorClass import LogCorrelator
+from SymbolTableClass import SymbolTable
+from LogSourceIndexClass import LogSourceIndex
+from CallFilterClass import CallFilter
+import os
 
 class EnhancedVectorSearch:
-    def __init__(self,gemini_model, vector_store: VectorStoreManager, entities: Dict[str, CodeEntity]):
+    def __init__(self,gemini_model, vector_store: VectorStoreManager, entities: Dict[str, CodeEntity],
+                 log_directory: Optional[str] = None, max_log_entries: Optional[int] = 1_000_000,
+                 call_filter: Optional[CallFilter] = None):
         self.gemini_model= gemini_model
         self.vector_store = vector_store
         self.entities = entities
-        self.log_analyzer = LogAnalyzer(r"C:\Users\39629\Desktop\prpl_assist_final\testing_final\rdklogs\logs")
+        # Share the parser's filter so learned suppressions apply to logs and responses too
+        self.call_filter = call_filter or CallFilter.from_config()
+        log_directory = log_directory or os.environ.get('RDK_LOG_DIRECTORY', 'rdklogs/logs')
+        self.log_analyzer = LogAnalyzer(log_directory, self.call_filter)
+        # Logs are parsed once and then followed; queries read from memory only,
+        # older entries beyond max_log_entries from the spill directory
+        self.log_index = LogIndex(str(self.log_analyzer.log_directory), self.log_analyzer,
+                                  max_entries=max_log_entries, spill_directory=os.path.join("vector_stores", "log_spill"))
+        self.log_index.start(interval=2.0)
+        
+    def set_entities(self, entities: Dict[str, CodeEntity], symbol_table: Optional[SymbolTable] = None,
+                     log_sources: Optional[LogSourceIndex] = None):
+        """Use a (re)loaded entity set and link the indexed log entries to it"""
+        self.entities = entities
+        self.log_index.set_correlator(LogCorrelator(entities, symbol_table, log_sources))
         
     def contextual_search(self, query: str) -> Tuple[List[CodeEntity], str]:
-        # Step 1: Analyze logs for recent context
-        log_entries = self.log_analyzer.parse_log_files()
+        # Step 1: Recent log context from the prebuilt log index
+        log_entries = self.log_index.recent(10)
         logger.info(f"-------------------------------------------")
-        logger.info(f"log_entries : {log_entries}")
+        logger.info(f"log_entries : {len(self.log_index)} indexed")
         logger.info(f"-------------------------------------------")
-        # Step 2: Extract relevant functions and APIs from logs
-        context_functions = set()
-        context_apis = set()
-        for entry in log_entries:
-            if entry.function_name:
-                context_functions.add(entry.function_name)
-            context_apis.update(entry.api_calls)
+        # Step 2: Functions and APIs that logged before the latest error
+        context_functions, context_apis = self._log_context_entities()
         logger.info(f"-------------------------------------------")
         logger.info(f"context_functions : {context_functions}")
         logger.info(f"-------------------------------------------")
@@ -76,6 +93,20 @@ class EnhancedVectorSearch:
         
         return search_results, final_response
     
+    def _log_context_entities(self, seconds: float = 30.0) -> Tuple[Set[str], Set[str]]:
+        """Functions and APIs linked to the log entries in the seconds before the latest error.
+
+        Falls back to every function and API seen in the logs when nothing is linked.
+        """
+        errors = self.log_index.query(level=['ERROR', 'FATAL'], limit=1)
+        if errors and self.log_index.correlator is not None:
+            when = errors[-1].timestamp
+            functions = set(self.log_index.entities_before(when, seconds, entity_types=['function']))
+            apis = set(self.log_index.entities_before(when, seconds, entity_types=['api']))
+            if functions or apis:
+                return functions, apis
+        return self.log_index.functions(), self.log_index.apis()
+    
     def _perform_enhanced_search(
         self,
         query: str,
@@ -161,7 +192,9 @@ class EnhancedVectorSearch:
         1. User Query: {query}
         2. Initial Analysis: {initial_response}
         3. Found {len(entities)} relevant code entities
-        4. Recent log activity from components: {', '.join(set(e.component for e in log_entries))}
+        4. Recent log activity from components: {', '.join(self.log_index.components())}
+        5. Recurring error log templates (count, components, template, first..last seen):
+        {chr(10).join(self.log_index.template_summaries(10, errors_only=True))}
         
         Please provide a detailed response that:
         1. Explains the relevant code flow and component interactions
@@ -232,15 +265,14 @@ class EnhancedVectorSearch:
             func_name = match.group()
             if (len(func_name) > 2 and  # Avoid short abbreviations
                 func_name.lower() not in common_words and
-                not func_name.endswith('_t')):  # Avoid type definitions
+                not func_name.endswith('_t') and  # Avoid type definitions
+                not self.call_filter.is_common(func_name)):
                 functions.add(func_name)
         
         return functions
     def _extract_apis_from_response(self, response: str) -> Set[str]:
         """Extract API calls from LLM response"""
-        # Pattern matches common RDK/CCSP API prefixes
-        api_pattern = re.compile(r'\b(?:CCSP_|RDK_|RBUS_|TR181_|CcspCommon_|DM_|PSM_)[A-Za-z0-9_]+\b')
-        return set(api_pattern.findall(response))
+        return self.call_filter.find_apis(response)
 
 
 
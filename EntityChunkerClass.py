@@ -0,0 +1,108 @@
+from typing import Dict, List, Set, Any, Optional, Tuple
+from CodeEntityClass import CodeEntity
+
+
+class EntityChunker:
+    """Split oversized entities into embedding chunks that map back to the entity.
+
+    Entities whose embedding text fits in max_chunk_chars are embedded whole.
+    Larger ones get a header chunk (name, signature, calls, structs, APIs) and
+    body chunks cut at statement and brace boundaries, preferring the shallowest
+    brace depth so that blocks stay together where possible.
+    """
+
+    def __init__(self, max_chunk_chars: int = 1500, max_chunks: int = 32):
+        self.max_chunk_chars = max_chunk_chars
+        self.max_chunks = max_chunks  # Body chunks beyond this are dropped
+
+    def chunk(self, entity: CodeEntity, text: Optional[str] = None, body: Optional[str] = None,
+              include_description: bool = True) -> List[Tuple[str, Dict[str, Any]]]:
+        """Return (text, metadata) pairs for an entity; metadata names the parent entity.
+
+        text is the entity's whole embedding text and body the source it should
+        contain; when the text is too long, or was built with a cut-down body,
+        the entity is chunked instead.
+        """
+        text = entity.to_embedding_text() if text is None else text
+        body = entity.content if body is None else body
+        if len(text) <= self.max_chunk_chars and body in text:
+            return [(text, self.metadata(entity, 0, 1, 'entity'))]
+
+        header = self._header_text(entity, include_description)
+        prefix = f"{entity.type.capitalize()}: {entity.name} ({entity.component})\n"
+        bodies = self._split_body(body, self.max_chunk_chars - len(prefix))[:self.max_chunks]
+
+        texts = [(header, 'header')] + [(prefix + body, 'body') for body in bodies]
+        return [
+            (chunk_text, self.metadata(entity, idx, len(texts), kind))
+            for idx, (chunk_text, kind) in enumerate(texts)
+        ]
+
+    @staticmethod
+    def metadata(entity: CodeEntity, chunk_index: int, chunk_count: int, chunk_kind: str) -> Dict[str, Any]:
+        return {
+            'name': entity.name,
+            'component': entity.component,
+            'file_path': entity.file_path,
+            'type': entity.type,
+            'chunk_index': chunk_index,
+            'chunk_count': chunk_count,
+            'chunk_kind': chunk_kind
+        }
+
+    def _header_text(self, entity: CodeEntity, include_description: bool = True) -> str:
+        brace = entity.content.find('{')
+        signature = ' '.join(entity.content[:brace if brace != -1 else None].split())
+        calls = list(dict.fromkeys(call.function_name for call in entity.function_calls))
+        parts = [
+            f"Name: {entity.name}",
+            f"Type: {entity.type}",
+            f"Component: {entity.component}",
+            f"Signature: {signature}",
+            "Function Calls: " + ", ".join(calls),
+            "Structs Used: " + ", ".join(entity.structs_used),
+            "API Calls: " + ", ".join(dict.fromkeys(entity.api_calls)),
+        ]
+        header = "\n".join(parts)
+        if include_description and entity.description:
+            header += "\nDescription: " + entity.description
+        return header[:self.max_chunk_chars]
+
+    @staticmethod
+    def _boundaries(body: str) -> Tuple[List[int], List[int]]:
+        """Positions just after ';', '{' and '}', with the brace depth at each."""
+        positions, depths = [], []
+        depth = 0
+        for idx, char in enumerate(body):
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+            elif char != ';':
+                continue
+            positions.append(idx + 1)
+            depths.append(depth)
+        return positions, depths
+
+    def _split_body(self, body: str, limit: int) -> List[str]:
+        limit = max(limit, 200)
+        positions, depths = self._boundaries(body)
+        chunks = []
+        start = 0
+        boundary = 0
+        while len(body) - start > limit:
+            # Among the boundaries in the second half of the window take the
+            # shallowest, then the latest, so chunks are neither tiny nor mid-block
+            while boundary < len(positions) and positions[boundary] - start < limit // 2:
+                boundary += 1
+            best = None
+            idx = boundary
+            while idx < len(positions) and positions[idx] - start <= limit:
+                if best is None or depths[idx] <= depths[best]:
+                    best = idx
+                idx += 1
+            end = positions[best] if best is not None else start + limit
+            chunks.append(body[start:end].strip())
+            start = end
+        chunks.append(body[start:].strip())
+        return [chunk for chunk in chunks if chunk]
@@ -0,0 +1,140 @@
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable
+from collections import defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from CodeEntityClass import CodeEntity
+from logger import logger
+import json
+import os
+
+
+class IncludeGraph:
+    """Resolved #include graph between source files and the headers of the code base."""
+
+    def __init__(self, headers: Iterable[Path] = ()):
+        self.headers_by_name: Dict[str, List[str]] = defaultdict(list)  # basename -> header paths
+        self.edges: Dict[str, Set[str]] = defaultdict(set)              # file -> resolved headers
+        self.reverse_edges: Dict[str, Set[str]] = defaultdict(set)      # header -> including files
+        self.unresolved: Dict[str, Set[str]] = defaultdict(set)         # file -> system/external includes
+        self.aliases: Dict[str, str] = {}                               # duplicate header -> canonical copy
+        self.digests: Dict[str, str] = {}                               # header -> md5 of the parsed content
+        for header in headers:
+            self.add_header(header)
+
+    def add_header(self, header_path: Path, digest: Optional[str] = None):
+        header_path = str(header_path)
+        known = self.headers_by_name[os.path.basename(header_path)]
+        if header_path not in known:
+            known.append(header_path)
+        if digest is not None:
+            # A parsed header is its own canonical copy, even if it used to be a duplicate
+            self.aliases.pop(header_path, None)
+            self.digests[header_path] = digest
+
+    def add_alias(self, header_path: Path, canonical_path: Path):
+        """Mark a header as a byte-identical copy of one that is already parsed."""
+        self.add_header(header_path)
+        self.aliases[str(header_path)] = str(canonical_path)
+
+    def resolve(self, include: str, from_file: str) -> Optional[str]:
+        """Resolve an include name to a header path of the code base."""
+        header = self._resolve_path(include, from_file)
+        return self.aliases.get(header, header)
+
+    def _resolve_path(self, include: str, from_file: str) -> Optional[str]:
+        # Quoted includes are normally relative to the including file
+        candidate = os.path.normpath(os.path.join(os.path.dirname(from_file), include))
+        candidates = self.headers_by_name.get(os.path.basename(include), [])
+        if candidate in candidates:
+            return candidate
+
+        # Otherwise any header whose path ends with the include, e.g. 'rbus/rbus.h'
+        suffix = os.sep + os.path.normpath(include)
+        matches = [h for h in candidates if h.endswith(suffix) or h == include]
+        if not matches:
+            return None
+
+        # Prefer the header closest to the including file in the directory tree
+        return max(matches, key=lambda h: len(os.path.commonprefix([h, from_file])))
+
+    def add_file(self, file_path: str, includes: List[str]):
+        """Record the includes of a file, replacing whatever was known about it."""
+        file_path = str(file_path)
+        for header in self.edges.pop(file_path, set()):
+            self.reverse_edges[header].discard(file_path)
+        self.unresolved.pop(file_path, None)
+
+        for include in includes:
+            header = self.resolve(include, file_path)
+            if header is None:
+                self.unresolved[file_path].add(include)
+                continue
+            self.edges[file_path].add(header)
+            self.reverse_edges[header].add(file_path)
+
+    def add_entities(self, entities: Iterable[CodeEntity]):
+        """Build edges from CodeEntity.includes, once per file."""
+        seen = set()
+        for entity in entities:
+            file_path = str(entity.file_path)
+            if file_path not in seen:
+                seen.add(file_path)
+                self.add_file(file_path, entity.includes)
+
+    def includes(self, file_path: str) -> Set[str]:
+        return set(self.edges.get(str(file_path), set()))
+
+    def includers(self, header_path: str) -> Set[str]:
+        return set(self.reverse_edges.get(str(header_path), set()))
+
+    def transitive_includes(self, file_path: str) -> Set[str]:
+        return self._reachable(str(file_path), self.edges)
+
+    def transitive_includers(self, header_path: str) -> Set[str]:
+        return self._reachable(str(header_path), self.reverse_edges)
+
+    @staticmethod
+    def _reachable(start: str, adjacency: Dict[str, Set[str]]) -> Set[str]:
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            for neighbour in adjacency.get(queue.popleft(), ()):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+        seen.discard(start)
+        return seen
+
+    def save(self, base_path: str = "vector_stores"):
+        os.makedirs(base_path, exist_ok=True)
+        with open(os.path.join(base_path, "include_graph.json"), 'w') as f:
+            json.dump({
+                'headers': [h for paths in self.headers_by_name.values() for h in paths],
+                'edges': {file: sorted(headers) for file, headers in self.edges.items()},
+                'unresolved': {file: sorted(names) for file, names in self.unresolved.items()},
+                'aliases': self.aliases,
+                'digests': self.digests,
+                'creation_timestamp': datetime.now().isoformat()
+            }, f)
+
+    @classmethod
+    def load(cls, base_path: str = "vector_stores") -> Optional['IncludeGraph']:
+        path = os.path.join(base_path, "include_graph.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            graph = cls(data['headers'])
+            for file_path, headers in data['edges'].items():
+                graph.edges[file_path] = set(headers)
+                for header in headers:
+                    graph.reverse_edges[header].add(file_path)
+            for file_path, names in data.get('unresolved', {}).items():
+                graph.unresolved[file_path] = set(names)
+            graph.aliases = data.get('aliases', {})
+            graph.digests = data.get('digests', {})
+            return graph
+        except Exception as e:
+            logger.error(f"Error loading include graph: {str(e)}")
+            return None
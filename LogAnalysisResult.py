@@ -39,12 +39,16 @@ class LogAnalysisResult:
         )
     
     @classmethod
-    def from_gemini_response(cls, response_text: str, log_results: List[Dict]) -> 'LogAnalysisResult':
-        """Parse Gemini's response into a structured analysis result"""
+    def from_gemini_response(cls, response_text: str, log_results: List[Dict],
+                             error_patterns: Optional[List[ErrorPattern]] = None) -> 'LogAnalysisResult':
+        """Parse Gemini's response into a structured analysis result
+
+        error_patterns, e.g. from LogIndex.error_patterns(), replace the
+        ERROR_PATTERNS section of the response.
+        """
         try:
             # Initialize containers
             mentioned_entities = {}
-            error_patterns = []
             code_paths = []
             system_state = {}
             
@@ -63,8 +67,8 @@ class LogAnalysisResult:
             if 'ENTITIES' in sections:
                 mentioned_entities = cls._parse_entities_section(sections['ENTITIES'])
             
-            if 'ERROR_PATTERNS' in sections:
-                error_patterns = cls._parse_error_patterns(sections['ERROR_PATTERNS'])
+            if error_patterns is None:
+                error_patterns = cls._parse_error_patterns(sections['ERROR_PATTERNS']) if 'ERROR_PATTERNS' in sections else []
             
             if 'CODE_PATHS' in sections:
                 code_paths = cls._parse_code_paths(sections['CODE_PATHS'])
@@ -1,12 +1,48 @@
-from typing import Dict, List, Set, Any, Optional, Tuple
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable, Callable
 import re
 from logger import logger
 from datetime import datetime, timedelta
 from pathlib import Path
-from LogEntryClass import LogEntry
+from concurrent.futures import ProcessPoolExecutor
+from LogEntryClass import LogEntry, LogRecord
+from LogFormatClass import LogFormat, LogSource, RDK_FORMAT, detect_format
+from LogRecordAssemblerClass import LogRecordAssembler
+from CallFilterClass import CallFilter
+import heapq
+import os
+
+# Byte range of a file to parse: (path, start offset, end offset)
+ByteRange = Tuple[str, int, int]
+
+# Analyzer used by the worker processes of LogAnalyzer.parse_ranges
+_worker_analyzer: Optional['LogAnalyzer'] = None
+
+
+def _init_worker(analyzer: 'LogAnalyzer'):
+    global _worker_analyzer
+    _worker_analyzer = analyzer
+
+
+def _parse_range_in_worker(task: Tuple[ByteRange, bool, bool]) -> Tuple[List[LogEntry], int]:
+    byte_range, include_partial_line, flush_pending = task
+    return _worker_analyzer.parse_range(*byte_range, include_partial_line=include_partial_line,
+                                        flush_pending=flush_pending)
+
 
 class LogAnalyzer:
-    def __init__(self, log_directory: str):
+    # Known components by log module
+    MODULE_COMPONENTS = {
+        'CR': 'CcspCr',
+        'PSM': 'CcspPsm',
+        'WANMGR': 'RdkWanManager',
+        'WIFI': 'RdkWifiManager',
+        'TR69': 'CcspTr069Pa',
+        'ETHAGT': 'CcspEthAgent',
+        'WEBPA': 'webpa'
+    }
+    FUNCTION_MARKERS = ('Entering', 'Exiting', 'Called', 'Executing')
+    
+    def __init__(self, log_directory: str, call_filter: Optional[CallFilter] = None):
         self.log_directory = Path(log_directory)
         # Updated pattern for new log format
         self.log_pattern = re.compile(
@@ -24,59 +60,260 @@ class LogAnalyzer:
         }
         
         self.function_pattern = re.compile(r'(?:Entering|Exiting|Called|Executing)\s+(\w+)')
-        self.api_pattern = re.compile(r'(CCSP_|RDK_|RBUS_|TR181_|CcspCommon_|DM_|PSM_)\w+')
-        
-    def parse_log_files(self) -> List[LogEntry]:
-        """Parse all log files in the directory with enhanced format parsing"""
-        log_entries = []
+        self.call_filter = call_filter or CallFilter.from_config()
+        self.api_pattern = self.call_filter.api_pattern
+        # Everything after the fixed-width timestamp of a record line
+        self.header_pattern = re.compile(
+            r'\s+\[mod=(?P<module>\w+),\s*lvl=(?P<level>\w+)\]\s+\[tid=(?P<thread_id>\d+)\]\s*(?P<message>.*?)$'
+        )
+        # YYMMDD -> epoch microseconds at midnight
+        self._day_micros: Dict[str, int] = {}
+        # path -> format detected from the start of the file
+        self._formats: Dict[str, LogFormat] = {}
+        self.max_record_lines = 64  # Continuation lines kept per record
+        self.max_record_chars = 8192
         
-        for log_file in self.log_directory.glob('*.txt*'):
+    def parse_log_files(self, workers: Optional[int] = None) -> List[LogEntry]:
+        """Parse all log files in the directory with enhanced format parsing
+
+        Files (and byte ranges of large files) are parsed in a process pool; each
+        file is time ordered, so the results are combined with a k-way merge.
+        """
+        ranges = []
+        for log_file in sorted(self.log_directory.glob('*.txt*')):
             try:
-                entries = self._parse_single_log(log_file)
-                log_entries.extend(entries)
-            except Exception as e:
+                ranges.append((str(log_file), 0, log_file.stat().st_size))
+            except OSError as e:
                 print(f"Error parsing log file {log_file}: {str(e)}")
-                
-        return sorted(log_entries, key=lambda x: x.timestamp)
+        
+        per_range = self.parse_ranges(ranges, workers=workers, include_partial_line=True)
+        return self.merge([entries for entries, _ in per_range])
+    
+    @staticmethod
+    def merge(per_file: List[List[LogEntry]]) -> List[LogEntry]:
+        """k-way merge of per-file entry lists by timestamp."""
+        runs = []
+        for entries in per_file:
+            # Threads of one process can log slightly out of order; sort those runs only
+            if any(entries[i].timestamp_us > entries[i + 1].timestamp_us for i in range(len(entries) - 1)):
+                entries = sorted(entries, key=lambda x: x.timestamp_us)
+            runs.append(entries)
+        return list(heapq.merge(*runs, key=lambda x: x.timestamp_us))
+    
+    @staticmethod
+    def split_range(path: str, start: int, end: int, chunk_bytes: int,
+                    is_header: Optional[Callable[[str], bool]] = None, max_skip_lines: int = 256) -> List[ByteRange]:
+        """Split [start, end) of a file into ranges of about chunk_bytes ending on line boundaries.
+
+        With is_header, boundaries move forward to the next record header so
+        that a multi-line record is not cut in two.
+        """
+        ranges = []
+        with open(path, 'rb') as f:
+            while end - start > chunk_bytes:
+                f.seek(start + chunk_bytes)
+                f.readline()
+                boundary = f.tell()
+                for _ in range(max_skip_lines if is_header is not None else 0):
+                    line = f.readline()
+                    if not line or is_header(line.decode('utf-8', errors='ignore')):
+                        break
+                    boundary = f.tell()
+                boundary = min(boundary, end)
+                ranges.append((path, start, boundary))
+                start = boundary
+        if end > start:
+            ranges.append((path, start, end))
+        return ranges
+    
+    def parse_ranges(self, ranges: List[ByteRange], workers: Optional[int] = None,
+                     include_partial_line: bool = False, flush_pending: bool = True,
+                     chunk_bytes: int = 16 * 2 ** 20,
+                     min_parallel_bytes: int = 4 * 2 ** 20) -> List[Tuple[List[LogEntry], int]]:
+        """Parse byte ranges, one result per input range: (entries, offset parsed up to).
+
+        Ranges above chunk_bytes are split at record boundaries and parsed as separate
+        tasks. Small inputs are parsed in-process, since starting workers costs more.
+        include_partial_line also parses a last line that has no newline yet.
+        Without flush_pending the last record of a range may still get continuation
+        lines, so it is left unparsed and the returned offset points at its header.
+        """
+        tasks: List[Tuple[ByteRange, bool, bool]] = []
+        owners: List[int] = []
+        for idx, (path, start, end) in enumerate(ranges):
+            try:
+                pieces = self.split_range(path, start, end, chunk_bytes, self.file_format(path).is_header)
+            except OSError as e:
+                print(f"Error parsing log file {path}: {str(e)}")
+                continue
+            for piece_idx, piece in enumerate(pieces):
+                # Only the last piece of a range can end in the middle of a line or record
+                last = piece_idx == len(pieces) - 1
+                tasks.append((piece, include_partial_line or not last, flush_pending or not last))
+                owners.append(idx)
+        
+        total_bytes = sum(end - start for (_, start, end), _, _ in tasks)
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(tasks) <= 1 or total_bytes < min_parallel_bytes:
+            outputs = [self.parse_range(*byte_range, include_partial_line=partial, flush_pending=flush)
+                       for byte_range, partial, flush in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                                     initargs=(self,)) as pool:
+                outputs = list(pool.map(_parse_range_in_worker, tasks))
+        
+        results = [([], start) for _, start, _ in ranges]
+        for owner, (entries, consumed_to) in zip(owners, outputs):
+            results[owner][0].extend(entries)
+            results[owner] = (results[owner][0], max(results[owner][1], consumed_to))
+        return results
+    
+    def parse_range(self, path: str, start: int, end: int, include_partial_line: bool = False,
+                    flush_pending: bool = True) -> Tuple[List[LogEntry], int]:
+        """Parse the records in [start, end) of a file; returns the entries and the offset parsed up to."""
+        try:
+            with open(path, 'rb') as f:
+                f.seek(start)
+                data = f.read(end - start)
+            source = LogSource(self, LogSource.module_name(path))
+        except OSError as e:
+            print(f"Error parsing log file {path}: {str(e)}")
+            return [], start
+        if not include_partial_line:
+            data = data[:data.rfind(b'\n') + 1]
+        
+        assembler = self._assembler(self.file_format(path), source)
+        entries = []
+        offset = start
+        for raw_line in data.splitlines(keepends=True):
+            record = assembler.feed(raw_line.decode('utf-8', errors='ignore'), offset)
+            if record is not None:
+                entries.append(record)
+            offset += len(raw_line)
+        
+        consumed_to = start + len(data)
+        if flush_pending or assembler.pending_full:
+            record = assembler.flush()
+            if record is not None:
+                entries.append(record)
+        elif assembler.pending_offset is not None:
+            consumed_to = assembler.pending_offset
+        return entries, consumed_to
+    
+    def file_format(self, path: str, sample_bytes: int = 16384) -> LogFormat:
+        """Format of a log file, detected once from its first lines."""
+        log_format = self._formats.get(path)
+        if log_format is None:
+            try:
+                with open(path, 'rb') as f:
+                    sample = f.read(sample_bytes).decode('utf-8', errors='ignore').splitlines()[:64]
+            except OSError:
+                sample = []
+            log_format = detect_format(sample)
+            if any(line.strip() for line in sample):
+                # An empty file is detected again once it has content
+                self._formats[path] = log_format
+                logger.info(f"Detected {log_format.name} log format for {path}")
+        return log_format
+    
+    def _assembler(self, log_format: LogFormat, source: LogSource) -> LogRecordAssembler:
+        return LogRecordAssembler(log_format, source, self.max_record_lines, self.max_record_chars)
     
     def _parse_single_log(self, log_file: Path) -> List[LogEntry]:
         """Parse a single log file with the new format"""
-        entries = []
         with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                try:
-                    match = self.log_pattern.match(line.strip())
-                    if not match:
-                        continue
-                        
-                    # Extract basic information
-                    timestamp = self._parse_timestamp(match.group('timestamp'))
-                    module = match.group('module')
-                    level = match.group('level')
-                    thread_id = match.group('thread_id')
-                    message = match.group('message')
-                    
-                    # Create log entry
-                    entry = LogEntry(
-                        timestamp=timestamp,
-                        module=module,
-                        level=level,
-                        thread_id=thread_id,
-                        message=message,
-                        component=self._determine_component(message, module)
-                    )
-                    
-                    # Extract additional information
-                    self._extract_function_info(message, entry)
-                    self._extract_api_calls(message, entry)
-                    entries.append(entry)
-                    
-                except Exception as e:
-                    print(f"Error parsing line: {str(e)}")
-                    continue
-                    
+            return self.parse_lines(f, self.file_format(str(log_file)), LogSource.module_name(str(log_file)))
+    
+    def parse_lines(self, lines, log_format: Optional[LogFormat] = None, module: str = '') -> List[LogEntry]:
+        """Parse an iterable of raw lines into records, joining continuation lines to their header"""
+        assembler = self._assembler(log_format or RDK_FORMAT, LogSource(self, module))
+        entries = []
+        for line in lines:
+            record = assembler.feed(line)
+            if record is not None:
+                entries.append(record)
+        record = assembler.flush()
+        if record is not None:
+            entries.append(record)
         return entries
     
+    def parse_record(self, header: str, continuation: List[str]) -> Optional[LogRecord]:
+        """Decode a record header line and attach its continuation lines to the message."""
+        record = self.parse_line(header)
+        if record is not None and continuation:
+            record.message = '\n'.join(part for part in [record.message] + continuation if part)
+            record.component = self._determine_component(record.message, record.module)
+        return record
+    
+    def parse_line(self, line: str) -> Optional[LogRecord]:
+        """Decode one record line, or return None for anything else.
+
+        The timestamp is sliced at fixed offsets into epoch microseconds, lines
+        without '[mod=' right after it are rejected before any regex runs, and
+        the function name and API calls are only extracted when first read.
+        """
+        line = line.strip()
+        # YYMMDD-HH:MM:SS.ffffff is 22 characters
+        if len(line) < 30 or line[6] != '-' or line[15] != '.' or '[mod=' not in line[22:30]:
+            return None
+        timestamp_us = self._timestamp_micros(line)
+        if timestamp_us is None:
+            return None
+        match = self.header_pattern.match(line, 22)
+        if not match:
+            return None
+        
+        module = match.group('module')
+        message = match.group('message')
+        return LogRecord(
+            timestamp_us=timestamp_us,
+            module=module,
+            level=match.group('level'),
+            thread_id=match.group('thread_id'),
+            message=message,
+            component=self._determine_component(message, module),
+            analyzer=self
+        )
+    
+    def _timestamp_micros(self, line: str) -> Optional[int]:
+        day = self._day_micros.get(line[:6])
+        try:
+            if day is None:
+                day = (datetime(2000 + int(line[:2]), int(line[2:4]), int(line[4:6])) - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+                self._day_micros[line[:6]] = day
+            seconds = int(line[7:9]) * 3600 + int(line[10:12]) * 60 + int(line[13:15])
+            return day + seconds * 1000000 + int(line[16:22])
+        except ValueError:
+            return None
+    
+    def _parse_line_reference(self, line: str) -> Optional[LogEntry]:
+        """Regex and strptime parser kept as the reference for benchmark_log_parsing.py."""
+        match = self.log_pattern.match(line.strip())
+        if not match:
+            return None
+            
+        # Extract basic information
+        timestamp = self._parse_timestamp(match.group('timestamp'))
+        module = match.group('module')
+        level = match.group('level')
+        thread_id = match.group('thread_id')
+        message = match.group('message')
+        
+        # Create log entry
+        entry = LogEntry(
+            timestamp=timestamp,
+            module=module,
+            level=level,
+            thread_id=thread_id,
+            message=message,
+            component=self._determine_component(message, module)
+        )
+        
+        # Extract additional information
+        self._extract_function_info(message, entry)
+        self._extract_api_calls(message, entry)
+        return entry
+    
     def _parse_timestamp(self, timestamp_str: str) -> datetime:
         """Parse timestamp from new format: YYMMDD-HH:MM:SS.NNNNNN"""
         try:
@@ -95,42 +332,45 @@ class LogAnalyzer:
     def _determine_component(self, message: str, module: str) -> str:
         """Determine component from message content and module"""
         # First check if it's a known component based on the module
-        module_component_map = {
-            'CR': 'CcspCr',
-            'PSM': 'CcspPsm',
-            'WANMGR': 'RdkWanManager',
-            'WIFI': 'RdkWifiManager',
-            'TR69': 'CcspTr069Pa',
-            'ETHAGT': 'CcspEthAgent',
-            'WEBPA': 'webpa'
-        }
-        
-        if module in module_component_map:
-            return module_component_map[module]
+        if module in self.MODULE_COMPONENTS:
+            return self.MODULE_COMPONENTS[module]
             
         # Check message content for component information
         if 'com.cisco.spvtg.ccsp.' in message:
-            component = message.split('com.cisco.spvtg.ccsp.')[1].split()[0]
-            return f"Ccsp{component}"
+            words = message.split('com.cisco.spvtg.ccsp.', 1)[1].split()
+            if words:
+                return f"Ccsp{words[0]}"
             
         return module  # Default to module name if no specific component found
     
     def _extract_function_info(self, message: str, entry: LogEntry):
         """Extract function name from log message"""
-        func_match = self.function_pattern.search(message)
-        if func_match:
-            entry.function_name = func_match.group(1)
-            
-        # Additional function name extraction for specific formats
-        if '.c:' in message and '--' in message:
-            try:
-                file_func = message.split('.c:')[0].split()[-1]
-                entry.function_name = file_func
-            except:
-                pass
+        function_name = self.extract_function_name(message)
+        if function_name:
+            entry.function_name = function_name
 
     def _extract_api_calls(self, message: str, entry: LogEntry):
         """Extract API calls from log message"""
-        api_calls = set(self.api_pattern.findall(message))
+        api_calls = self.extract_api_calls(message)
         if api_calls:
-            entry.api_calls.update(api_calls)
\ No newline at end of file
+            entry.api_calls.update(api_calls)
+
+    def extract_function_name(self, message: str) -> str:
+        function_name = ''
+        if any(marker in message for marker in self.FUNCTION_MARKERS):
+            func_match = self.function_pattern.search(message)
+            if func_match:
+                function_name = func_match.group(1)
+            
+        # Additional function name extraction for specific formats
+        if '.c:' in message and '--' in message:
+            words = message.split('.c:')[0].split()
+            if words:
+                function_name = words[-1]
+        return '' if self.call_filter.is_common(function_name) else function_name
+
+    def extract_api_calls(self, message: str) -> Set[str]:
+        # Cheap prefix check before the regex; most lines mention no API
+        if not any(prefix in message for prefix in self.call_filter.api_prefixes):
+            return set()
+        return set(self.api_pattern.findall(message))
\ No newline at end of file
@@ -0,0 +1,68 @@
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable
+from CodeEntityClass import CodeEntity
+from SymbolTableClass import SymbolTable
+import re
+
+
+class LogCorrelator:
+    """Links log entries to the code entities they mention.
+
+    A template's constant tokens are resolved once per template text: every
+    identifier that is an entity name, or a type the symbol table resolves to
+    an entity, is linked. The entry's own function name and API calls are
+    added per entry. An optional literal index (anything with a
+    lookup(message) -> entity names method) links the template to the
+    functions whose log format strings match its first message.
+    """
+
+    IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]{2,}')
+
+    def __init__(self, entities: Dict[str, CodeEntity], symbol_table: Optional[SymbolTable] = None,
+                 literal_index=None):
+        self.entities = entities
+        self.symbol_table = symbol_table
+        self.literal_index = literal_index
+        # template id -> (template text, linked entity names)
+        self._template_links: Dict[int, Tuple[str, Set[str]]] = {}
+
+    def resolve(self, identifier: str) -> Optional[str]:
+        """Entity name for an identifier, if it names one directly or as a type."""
+        if identifier in self.entities:
+            return identifier
+        if self.symbol_table is not None and identifier in self.symbol_table:
+            name = self.symbol_table.entity_name(identifier)
+            if name in self.entities:
+                return name
+        return None
+
+    def identifiers(self, text: str) -> Set[str]:
+        """Entity names among the identifiers of a text."""
+        names = set()
+        for identifier in set(self.IDENTIFIER.findall(text)):
+            name = self.resolve(identifier)
+            if name is not None:
+                names.add(name)
+        return names
+
+    def link(self, entry, template_id: int = -1, template_text: Optional[str] = None) -> Set[str]:
+        """Entity names linked to one entry; template_text defaults to the message."""
+        text = template_text if template_text is not None else entry.message
+        cached = self._template_links.get(template_id)
+        if template_id < 0 or cached is None or cached[0] != text:
+            names = self.identifiers(text)
+            if self.literal_index is not None:
+                names.update(self.literal_index.lookup(entry.message))
+            if template_id >= 0:
+                self._template_links[template_id] = (text, names)
+        else:
+            names = cached[1]
+
+        linked = set(names)
+        for name in [entry.function_name, *entry.api_calls]:
+            if name and name in self.entities:
+                linked.add(name)
+        return linked
+
+    def entity_type(self, name: str) -> str:
+        entity = self.entities.get(name)
+        return entity.type if entity is not None else ''
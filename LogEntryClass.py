@@ -24,4 +24,85 @@ class LogEntry:
     message: str
     component: str = ''
     function_name: str = ''
-    api_calls: Set[str] = field(default_factory=set)
\ No newline at end of file
+    api_calls: Set[str] = field(default_factory=set)
+    @property
+    def timestamp_us(self) -> int:
+        """Microseconds since 1970-01-01, treating the timestamp as naive."""
+        return (self.timestamp - _EPOCH) // timedelta(microseconds=1)
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class LogRecord:
+    """LogEntry decoded by the fast path of LogAnalyzer.parse_line.
+
+    The timestamp is kept as integer epoch microseconds and only turned into a
+    datetime on access; function_name and api_calls are extracted from the
+    message on first access by the analyzer that decoded the line.
+    """
+
+    __slots__ = ('timestamp_us', 'module', 'level', 'thread_id', 'message', 'component',
+                 '_function_name', '_api_calls', '_analyzer')
+
+    def __init__(self, timestamp_us: int, module: str, level: str, thread_id: str, message: str,
+                 component: str = '', analyzer=None):
+        self.timestamp_us = timestamp_us
+        self.module = module
+        self.level = level
+        self.thread_id = thread_id
+        self.message = message
+        self.component = component
+        self._function_name: Optional[str] = None
+        self._api_calls: Optional[Set[str]] = None
+        self._analyzer = analyzer
+
+    @property
+    def timestamp(self) -> datetime:
+        return _EPOCH + timedelta(microseconds=self.timestamp_us)
+
+    @property
+    def function_name(self) -> str:
+        if self._function_name is None:
+            self._function_name = self._analyzer.extract_function_name(self.message) if self._analyzer else ''
+        return self._function_name
+
+    @function_name.setter
+    def function_name(self, value: str):
+        self._function_name = value
+
+    @property
+    def api_calls(self) -> Set[str]:
+        if self._api_calls is None:
+            self._api_calls = self._analyzer.extract_api_calls(self.message) if self._analyzer else set()
+        return self._api_calls
+
+    @api_calls.setter
+    def api_calls(self, value: Set[str]):
+        self._api_calls = value
+
+    def __getstate__(self):
+        # Resolve the lazy fields so records can cross process boundaries without the analyzer
+        return (self.timestamp_us, self.module, self.level, self.thread_id, self.message,
+                self.component, self.function_name, self.api_calls)
+
+    def __setstate__(self, state):
+        (self.timestamp_us, self.module, self.level, self.thread_id, self.message,
+         self.component, self._function_name, self._api_calls) = state
+        self._analyzer = None
+
+    def to_entry(self) -> LogEntry:
+        return LogEntry(
+            timestamp=self.timestamp,
+            module=self.module,
+            level=self.level,
+            thread_id=self.thread_id,
+            message=self.message,
+            component=self.component,
+            function_name=self.function_name,
+            api_calls=set(self.api_calls)
+        )
+
+    def __repr__(self) -> str:
+        return (f"LogRecord(timestamp={self.timestamp!r}, module={self.module!r}, level={self.level!r}, "
+                f"thread_id={self.thread_id!r}, message={self.message!r}, component={self.component!r})")
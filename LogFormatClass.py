@@ -0,0 +1,222 @@
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable
+from datetime import datetime, timedelta
+from LogEntryClass import LogRecord
+import re
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class LogSource:
+    """What a format needs to know about the file a record came from."""
+
+    def __init__(self, analyzer, module: str, default_timestamp_us: int = 0):
+        self.analyzer = analyzer
+        self.module = module  # Used as module and component by formats without a [mod=] field
+        # For formats without timestamps; the default 0 sorts undated records before
+        # every dated one, so they stay out of time windows and recent()
+        self.default_timestamp_us = default_timestamp_us
+
+    @staticmethod
+    def module_name(path: str) -> str:
+        """Consolelog.txt.0 -> Consolelog"""
+        name = path.replace('\\', '/').rsplit('/', 1)[-1]
+        return name.split('.', 1)[0] or name
+
+
+class LogFormat:
+    """A log line format: recognises record header lines and decodes records.
+
+    Lines that are not headers are continuation lines of the previous record.
+    Formats are chosen once per file by detect_format.
+    """
+
+    name = 'base'
+
+    def is_header(self, line: str) -> bool:
+        raise NotImplementedError
+
+    def is_signature(self, line: str) -> bool:
+        """Stricter header test used for detection, when the format allows variants."""
+        return self.is_header(line)
+
+    def decode_header(self, line: str, source: LogSource) -> Optional[LogRecord]:
+        raise NotImplementedError
+
+    def decode(self, header: str, continuation: List[str], source: LogSource) -> Optional[LogRecord]:
+        record = self.decode_header(header, source)
+        if record is not None and continuation:
+            record.message = '\n'.join(part for part in [record.message] + continuation if part)
+        return record
+
+    @staticmethod
+    def _micros(year: int, month: int, day: int, clock: str) -> int:
+        """Epoch microseconds for a date and an HH:MM:SS[.ffffff] clock string."""
+        seconds, _, fraction = clock.partition('.')
+        hours, minutes, secs = seconds.split(':')
+        micros = int((fraction + '000000')[:6]) if fraction else 0
+        midnight = (datetime(year, month, day) - _EPOCH) // timedelta(microseconds=1)
+        return midnight + (int(hours) * 3600 + int(minutes) * 60 + int(secs)) * 1000000 + micros
+
+
+class RdkLogFormat(LogFormat):
+    """241007-14:40:07.885116 [mod=PAM, lvl=WARN] [tid=927] message (CCSP rdk_logger)"""
+
+    name = 'rdk'
+
+    def is_header(self, line: str) -> bool:
+        line = line.lstrip()
+        return len(line) >= 30 and line[6:7] == '-' and '[mod=' in line[22:31]
+
+    def decode_header(self, line: str, source: LogSource) -> Optional[LogRecord]:
+        return source.analyzer.parse_line(line)
+
+    def decode(self, header: str, continuation: List[str], source: LogSource) -> Optional[LogRecord]:
+        return source.analyzer.parse_record(header, continuation)
+
+
+class OneWifiLogFormat(LogFormat):
+    """[OneWifi] 241007-14:40:21.451571<I>  message, and the wifiHal variant without the tag
+
+    Some OneWifi lines carry no <level>; those are headers too, but only lines
+    with a level count when detecting the format.
+    """
+
+    name = 'onewifi'
+    PATTERN = re.compile(r'\s*(?:\[OneWifi\]\s*)?(\d{2})(\d{2})(\d{2})-(\d{2}:\d{2}:\d{2}\.\d{1,6})\s*(?:<([A-Z])>)?\s*(.*)$')
+    SIGNATURE = re.compile(r'\s*(?:\[OneWifi\]\s*)?\d{6}-\d{2}:\d{2}:\d{2}\.\d{1,6}\s*<[A-Z]>')
+    LEVELS = {'I': 'INFO', 'E': 'ERROR', 'W': 'WARN', 'D': 'DEBUG', 'N': 'NOTICE'}
+
+    def is_header(self, line: str) -> bool:
+        return self.PATTERN.match(line) is not None
+
+    def is_signature(self, line: str) -> bool:
+        return self.SIGNATURE.match(line) is not None
+
+    def decode_header(self, line: str, source: LogSource) -> Optional[LogRecord]:
+        match = self.PATTERN.match(line)
+        if not match:
+            return None
+        year, month, day, clock, level, message = match.groups()
+        try:
+            timestamp_us = self._micros(2000 + int(year), int(month), int(day), clock)
+        except ValueError:
+            return None
+        return LogRecord(timestamp_us, source.module, self.LEVELS.get(level, level or ''), '', message.strip(),
+                         source.module, analyzer=source.analyzer)
+
+
+class TimestampedLogFormat(LogFormat):
+    """241118-09:29:02.204637 message (Consolelog, FirewallDebug, agent.txt, ...)
+
+    Files mixing these lines with rdk_logger records (telemetry2_0) decode the
+    latter as rdk records.
+    """
+
+    name = 'timestamped'
+    PATTERN = re.compile(r'\s*(\d{2})(\d{2})(\d{2})-(\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?)\s+(.*)$')
+    LEVEL = re.compile(r'\[(DEBUG|INFO|NOTICE|WARN|WARNING|ERROR)\]')
+
+    def is_header(self, line: str) -> bool:
+        return self.PATTERN.match(line) is not None
+
+    def decode(self, header: str, continuation: List[str], source: LogSource) -> Optional[LogRecord]:
+        if RDK_FORMAT.is_header(header):
+            return RDK_FORMAT.decode(header, continuation, source)
+        return super().decode(header, continuation, source)
+
+    def decode_header(self, line: str, source: LogSource) -> Optional[LogRecord]:
+        match = self.PATTERN.match(line)
+        if not match:
+            return None
+        year, month, day, clock, message = match.groups()
+        try:
+            timestamp_us = self._micros(2000 + int(year), int(month), int(day), clock)
+        except ValueError:
+            return None
+        level = self.LEVEL.search(message[:32])
+        return LogRecord(timestamp_us, source.module, level.group(1) if level else '', '', message.strip(),
+                         source.module, analyzer=source.analyzer)
+
+
+class IsoLogFormat(LogFormat):
+    """2024-11-18 09:28:49 message (CellularManagerLog, MnetDebug)"""
+
+    name = 'iso'
+    PATTERN = re.compile(r'\s*(\d{4})-(\d{2})-(\d{2})[ T](\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?)\s+(.*)$')
+
+    def is_header(self, line: str) -> bool:
+        return self.PATTERN.match(line) is not None
+
+    def decode_header(self, line: str, source: LogSource) -> Optional[LogRecord]:
+        match = self.PATTERN.match(line)
+        if not match:
+            return None
+        year, month, day, clock, message = match.groups()
+        try:
+            timestamp_us = self._micros(int(year), int(month), int(day), clock)
+        except ValueError:
+            return None
+        return LogRecord(timestamp_us, source.module, '', '', message.strip(), source.module, analyzer=source.analyzer)
+
+
+class CtimeLogFormat(LogFormat):
+    """Monday, Oct 07 14:40:01 2024:[non-root]: message (CapDebug), also without the weekday"""
+
+    name = 'ctime'
+    PATTERN = re.compile(r'\s*(?:[A-Z][a-z]+,?\s+)?([A-Z][a-z]{2})\s+(\d{1,2})\s+(\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?)\s+(\d{4}):?\s*(.*)$')
+    MONTHS = {name: number for number, name in enumerate(
+        ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+    def is_header(self, line: str) -> bool:
+        match = self.PATTERN.match(line)
+        return match is not None and match.group(1) in self.MONTHS
+
+    def decode_header(self, line: str, source: LogSource) -> Optional[LogRecord]:
+        match = self.PATTERN.match(line)
+        if not match or match.group(1) not in self.MONTHS:
+            return None
+        month, day, clock, year, message = match.groups()
+        try:
+            timestamp_us = self._micros(int(year), self.MONTHS[month], int(day), clock)
+        except ValueError:
+            return None
+        return LogRecord(timestamp_us, source.module, '', '', message.strip(), source.module, analyzer=source.analyzer)
+
+
+class PlainLogFormat(LogFormat):
+    """Untimestamped logs (SelfHeal): one record per line, stamped with the source's default timestamp."""
+
+    name = 'plain'
+
+    def is_header(self, line: str) -> bool:
+        return bool(line.strip())
+
+    def decode_header(self, line: str, source: LogSource) -> Optional[LogRecord]:
+        return LogRecord(source.default_timestamp_us, source.module, '', '', line.strip(), source.module,
+                         analyzer=source.analyzer)
+
+
+RDK_FORMAT = RdkLogFormat()
+# Tried in order; on equal header counts the earlier, more specific format wins
+FORMATS: Tuple[LogFormat, ...] = (RDK_FORMAT, OneWifiLogFormat(), TimestampedLogFormat(), IsoLogFormat(),
+                                  CtimeLogFormat())
+PLAIN_FORMAT = PlainLogFormat()
+FORMATS_BY_NAME: Dict[str, LogFormat] = {fmt.name: fmt for fmt in FORMATS + (PLAIN_FORMAT,)}
+
+
+def detect_format(sample_lines: Iterable[str], min_share: float = 0.05) -> LogFormat:
+    """Pick the format whose header pattern matches most of the sample lines.
+
+    Falls back to the plain format when no format matches at least min_share
+    of the non-empty lines. Console logs interleave a few timestamped lines with
+    command output, hence the low default.
+    """
+    lines = [line for line in sample_lines if line.strip()]
+    if not lines:
+        return RDK_FORMAT
+    best, best_count = PLAIN_FORMAT, 0
+    for fmt in FORMATS:
+        count = sum(1 for line in lines if fmt.is_signature(line))
+        if count > best_count:
+            best, best_count = fmt, count
+    return best if best_count and best_count >= min_share * len(lines) else PLAIN_FORMAT
@@ -0,0 +1,364 @@
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable, Union
+from datetime import datetime, timedelta
+from pathlib import Path
+from LogEntryClass import LogEntry
+from LogAnalyzerClass import LogAnalyzer
+from ColumnarLogStoreClass import ColumnarLogStore, to_micros, from_micros
+from LogTemplateMinerClass import LogTemplateMiner
+from LogAnalysisResult import ErrorPattern
+from LogCorrelatorClass import LogCorrelator
+from logger import logger
+import threading
+import heapq
+import json
+import os
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # Without watchdog the directory is polled
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class LogIndex:
+    """In-memory index of the parsed entries of a log directory.
+
+    The directory is parsed once; after that refresh() only reads the bytes
+    appended since the last call. Files are tracked by (device, inode) so a
+    rotation by rename (WiFilog.txt.0 -> WiFilog.txt.1) keeps its read offset
+    and the new file under the old name is read from the start. Queries only
+    touch memory; refresh() runs from a background thread once start() is called.
+    Entries are held in a ColumnarLogStore, and every entry is assigned a
+    template by a LogTemplateMiner as it is ingested. With a LogCorrelator set,
+    entries are also linked to code entities, so "what ran before this error"
+    is a window query joined with the links.
+
+    The last record of a file may still get continuation lines, so it is only
+    ingested once the file has not grown for one refresh.
+
+    Memory is bounded for following a live device: a refresh reads at most
+    max_read_bytes of each file (the rest on the next one), and once more than
+    max_entries are held the oldest are evicted down to 80% of that. Evicted
+    entries are spilled as JSON lines segments to spill_directory, which
+    query() reads when its window starts before what is still in memory.
+    """
+
+    EVICT_TO = 0.8
+
+    def __init__(self, log_directory: str, analyzer: Optional[LogAnalyzer] = None,
+                 file_pattern: str = '*.txt*', workers: Optional[int] = None,
+                 max_entries: Optional[int] = None, spill_directory: Optional[str] = None,
+                 max_read_bytes: int = 64 * 1024 * 1024):
+        self.log_directory = Path(log_directory)
+        self.analyzer = analyzer or LogAnalyzer(log_directory)
+        self.file_pattern = file_pattern
+        self.workers = workers  # Process pool size for large ingests, default one per core
+        self.max_entries = max_entries
+        self.spill_directory = Path(spill_directory) if spill_directory else None
+        self.max_read_bytes = max_read_bytes
+        # Newest timestamp evicted so far: every spilled entry is at or before it,
+        # while late entries in memory may be older too
+        self.horizon_us: Optional[int] = None
+        # (first timestamp, last timestamp, path) of the spilled segments
+        self.segments: List[Tuple[int, int, Path]] = []
+        self._clear_spill()
+        # path -> {'file_id': (st_dev, st_ino), 'offset': bytes consumed, 'size': size at the last refresh}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.store = ColumnarLogStore()
+        self.templates = LogTemplateMiner()
+        self.correlator: Optional[LogCorrelator] = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+
+    def refresh(self) -> int:
+        """Ingest whatever was appended, rotated in or truncated since the last call.
+
+        Returns the number of new entries.
+        """
+        current = {}
+        for path in self.log_directory.glob(self.file_pattern):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Rotated away between glob and stat
+            current[str(path)] = ((stat.st_dev, stat.st_ino), stat.st_size)
+
+        by_file_id = {state['file_id']: path for path, state in self.files.items()}
+        files = {}
+        ranges = []
+        idle_ranges = []
+        for path, (file_id, size) in sorted(current.items()):
+            state = self.files.get(path)
+            if state is None or state['file_id'] != file_id:
+                previous = by_file_id.get(file_id)
+                # A renamed file continues where it was; anything else starts from 0
+                state = dict(self.files[previous]) if previous is not None else {'file_id': file_id, 'offset': 0}
+            if size < state['offset']:
+                logger.info(f"{path} was truncated, reading it again")
+                state['offset'] = 0
+            if size > state['offset']:
+                end = min(size, state['offset'] + self.max_read_bytes)
+                # Only a fully read file that stopped growing may flush its last record
+                idle = size == state.get('size') and end == size
+                (idle_ranges if idle else ranges).append((path, state['offset'], end))
+            state['size'] = size
+            files[path] = state
+
+        # A line still being written is left for the next refresh, and so is the
+        # last record of a growing file
+        per_file = self.analyzer.parse_ranges(ranges, workers=self.workers, flush_pending=False)
+        per_file += self.analyzer.parse_ranges(idle_ranges, workers=self.workers)
+        for (path, start, end), (_, consumed_to) in zip(ranges + idle_ranges, per_file):
+            if end < files[path]['size']:
+                if consumed_to == start:
+                    logger.warning(f"{path}: no complete line in {self.max_read_bytes} bytes at {start}, skipping them")
+                    consumed_to = end
+                self._wake.set()  # More to read, do not wait for the next interval
+            files[path]['offset'] = consumed_to
+        new_entries = self.analyzer.merge([entries for entries, _ in per_file])
+
+        with self._lock:
+            self.files = files
+            template_ids = [self.templates.add_entry(entry) for entry in new_entries]
+            self.store.append(new_entries, template_ids, self._link(new_entries, template_ids))
+            self._evict()
+        if new_entries:
+            logger.info(f"Log index ingested {len(new_entries)} entries, {len(self.store)} in total")
+        return len(new_entries)
+
+    def _evict(self):
+        """Drop the oldest entries once there are more than max_entries, spilling them if configured."""
+        if self.max_entries is None or len(self.store) <= self.max_entries:
+            return
+        order = self.store.query()
+        split = len(order) - int(self.max_entries * self.EVICT_TO)
+        evicted, kept = order[:split], order[split:]
+        if self.spill_directory is not None:
+            self._spill(evicted)
+        newest_evicted = to_micros(self.store.timestamp(evicted[-1]))
+        self.horizon_us = newest_evicted if self.horizon_us is None else max(self.horizon_us, newest_evicted)
+        self.store = self.store.retain(kept)
+        logger.info(f"Log index evicted {len(evicted)} entries, {len(self.store)} left in memory")
+
+    def _spill(self, rows):
+        first, last = to_micros(self.store.timestamp(rows[0])), to_micros(self.store.timestamp(rows[-1]))
+        path = self.spill_directory / f"segment-{first}-{last}-{len(self.segments)}.jsonl"
+        try:
+            self.spill_directory.mkdir(parents=True, exist_ok=True)
+            # Written under a temporary name so readers never see a partial segment
+            with open(path.with_suffix('.tmp'), 'w') as f:
+                for row in rows:
+                    entry = self.store.entry(int(row))
+                    f.write(json.dumps({
+                        'timestamp_us': entry.timestamp_us,
+                        'module': entry.module,
+                        'level': entry.level,
+                        'thread_id': entry.thread_id,
+                        'message': entry.message,
+                        'component': entry.component,
+                        'function_name': entry.function_name,
+                        'api_calls': sorted(entry.api_calls),
+                        'template_id': self.store.template_id(int(row))
+                    }) + '\n')
+            os.replace(path.with_suffix('.tmp'), path)
+            self.segments.append((first, last, path))
+        except Exception as e:
+            logger.error(f"Error spilling log entries to {path}: {str(e)}")
+
+    def _clear_spill(self):
+        """Remove segments of an earlier run; the files are read from the start again."""
+        if self.spill_directory is None or not self.spill_directory.exists():
+            return
+        for path in self.spill_directory.glob('segment-*.jsonl'):
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.error(f"Error removing spilled segment {path}: {str(e)}")
+
+    def _read_spill(self, start_us: Optional[int], end_us: Optional[int],
+                    facets: Dict[str, Union[str, Iterable[str], None]], limit: Optional[int] = None) -> List[LogEntry]:
+        """Spilled entries in a window that match the facets, in time order; limit keeps the latest.
+
+        Segments are read newest first, and with a limit only until no older
+        segment can hold an entry newer than the ones already found, so at most
+        limit entries and one segment are in memory.
+        """
+        wanted = {facet: {values} if isinstance(values, str) else set(values)
+                  for facet, values in facets.items() if values is not None}
+        entries = []
+        for first, last, path in sorted(self.segments, key=lambda segment: segment[1], reverse=True):
+            if limit is not None and len(entries) >= limit and last < entries[0].timestamp_us:
+                break
+            if (start_us is not None and last < start_us) or (end_us is not None and first > end_us):
+                continue
+            try:
+                with open(path, 'r') as f:
+                    for line in f:
+                        data = json.loads(line)
+                        if start_us is not None and data['timestamp_us'] < start_us:
+                            continue
+                        if end_us is not None and data['timestamp_us'] > end_us:
+                            continue
+                        if any(data[facet] not in values for facet, values in wanted.items()):
+                            continue
+                        entries.append(LogEntry(
+                            timestamp=from_micros(data['timestamp_us']),
+                            module=data['module'],
+                            level=data['level'],
+                            thread_id=data['thread_id'],
+                            message=data['message'],
+                            component=data['component'],
+                            function_name=data['function_name'],
+                            api_calls=set(data['api_calls'])
+                        ))
+            except Exception as e:
+                logger.error(f"Error reading spilled log entries from {path}: {str(e)}")
+            entries.sort(key=lambda entry: entry.timestamp_us)
+            if limit is not None:
+                entries = entries[-limit:] if limit > 0 else []
+        return entries
+
+    def _link(self, entries: List[LogEntry], template_ids: List[int]) -> Optional[List[Set[str]]]:
+        if self.correlator is None:
+            return None
+        templates = self.templates.templates
+        return [self.correlator.link(entry, template_id, templates[template_id].text if template_id >= 0 else None)
+                for entry, template_id in zip(entries, template_ids)]
+
+    def set_correlator(self, correlator: Optional[LogCorrelator]):
+        """Link entries to code entities from now on, relinking what is already indexed."""
+        with self._lock:
+            self.correlator = correlator
+            rows = range(len(self.store))
+            links = self._link([self.store.entry(row) for row in rows], [self.store.template_id(row) for row in rows])
+            self.store.set_entity_links(links or [()] * len(self.store))
+
+    def start(self, interval: float = 5.0, follow: bool = True):
+        """Build the index now and keep it up to date from a daemon thread.
+
+        The thread refreshes every interval seconds; with follow and watchdog
+        installed, file system events on the directory trigger a refresh at once.
+        """
+        self.refresh()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        if follow and Observer is not None and self._observer is None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_WakeHandler(self._wake), str(self.log_directory), recursive=False)
+                self._observer.start()
+            except Exception as e:
+                logger.error(f"Error watching {self.log_directory}, polling instead: {str(e)}")
+                self._observer = None
+        self._thread = threading.Thread(target=self._watch, args=(interval,), name="log-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self, interval: float):
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing log index: {str(e)}")
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def recent(self, count: int) -> List[LogEntry]:
+        with self._lock:
+            return self.store.entries(self.store.recent(count))
+
+    def window(self, start: datetime, end: datetime) -> List[LogEntry]:
+        """Entries with start <= timestamp <= end, in time order."""
+        return self.query(start, end)
+
+    def query(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              limit: Optional[int] = None, **facets: Union[str, Iterable[str], None]) -> List[LogEntry]:
+        """Entries in a time window filtered by module, level and component; see ColumnarLogStore.query.
+
+        Spilled entries are included when the window starts at or before the
+        newest evicted entry. Entries that arrived late may be older than spilled
+        ones, so the two are merged by time.
+        """
+        with self._lock:
+            entries = self.store.entries(self.store.query(start, end, limit, **facets))
+            horizon_us = self.horizon_us
+        if horizon_us is None or not self.segments or (start is not None and to_micros(start) > horizon_us):
+            return entries
+        if limit is not None and len(entries) >= limit and entries[0].timestamp_us >= horizon_us:
+            return entries  # Nothing spilled is newer than the oldest entry kept
+        spilled = self._read_spill(to_micros(start) if start else None, to_micros(end) if end else None, facets, limit)
+        entries = list(heapq.merge(spilled, entries, key=lambda entry: entry.timestamp_us))
+        return entries[-limit:] if limit is not None else entries
+
+    def functions(self) -> Set[str]:
+        with self._lock:
+            return self.store.distinct('function')
+
+    def apis(self) -> Set[str]:
+        with self._lock:
+            return self.store.distinct('api')
+
+    def components(self) -> Set[str]:
+        with self._lock:
+            return self.store.distinct('component')
+
+    def error_patterns(self, limit: int = 10, since: Optional[datetime] = None) -> List[ErrorPattern]:
+        """Most frequent error-like templates, optionally only those seen since a time."""
+        with self._lock:
+            return self.templates.error_patterns(limit, since_us=to_micros(since) if since else None)
+
+    def template_summaries(self, limit: int = 20, errors_only: bool = False) -> List[str]:
+        with self._lock:
+            return self.templates.summaries(limit, errors_only)
+
+    def template_entries(self, template_id: int, limit: Optional[int] = None) -> List[LogEntry]:
+        """Entries of one template in time order; limit keeps the latest."""
+        with self._lock:
+            return self.store.entries(self.store.template_rows(template_id, limit))
+
+    def entities_in_window(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           entity_types: Optional[Iterable[str]] = None, **facets) -> Dict[str, int]:
+        """Code entities linked to the entries of a window, with the number of entries each."""
+        with self._lock:
+            counts = self.store.linked_entities(self.store.query(start, end, **facets))
+            if entity_types is not None and self.correlator is not None:
+                entity_types = set(entity_types)
+                counts = {name: count for name, count in counts.items()
+                          if self.correlator.entity_type(name) in entity_types}
+            return counts
+
+    def entities_before(self, when: datetime, seconds: float = 30.0,
+                        entity_types: Optional[Iterable[str]] = None, **facets) -> Dict[str, int]:
+        """Code entities that logged in the seconds up to and including when."""
+        return self.entities_in_window(when - timedelta(seconds=seconds), when, entity_types, **facets)
+
+
+class _WakeHandler(FileSystemEventHandler):
+    """Sets an event on any change in the watched directory."""
+
+    def __init__(self, wake: threading.Event):
+        super().__init__()
+        self.wake = wake
+
+    def on_any_event(self, event):
+        self.wake.set()
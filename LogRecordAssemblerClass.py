@@ -0,0 +1,74 @@
+from typing import Dict, List, Set, Any, Optional, Tuple
+from LogEntryClass import LogRecord
+from LogFormatClass import LogFormat, LogSource
+
+
+class LogRecordAssembler:
+    """Streaming assembly of multi-line log records.
+
+    Lines are fed one at a time. A header line of the file's format starts a new
+    record and every other line is a continuation of the pending one (stack
+    traces, wrapped messages, the 'Subsystem is eRT.' line after an empty PAM
+    message). The pending record is bounded by max_lines continuation lines and
+    max_chars characters; lines past the bound, and continuation lines with no
+    header before them, are counted in dropped_lines.
+    """
+
+    def __init__(self, log_format: LogFormat, source: LogSource,
+                 max_lines: int = 64, max_chars: int = 8192):
+        self.log_format = log_format
+        self.source = source
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+        self.dropped_lines = 0
+        self._header: Optional[str] = None
+        self._continuation: List[str] = []
+        self._chars = 0
+        self._offset: Optional[int] = None
+        self._full = False
+
+    @property
+    def pending_offset(self) -> Optional[int]:
+        """Offset of the header line of the pending record, if there is one."""
+        return self._offset if self._header is not None else None
+
+    @property
+    def pending_full(self) -> bool:
+        """The pending record reached its bound and will not change any more."""
+        return self._full
+
+    def feed(self, line: str, offset: int = 0) -> Optional[LogRecord]:
+        """Add a line; returns the previous record when this line starts a new one."""
+        line = line.rstrip('\r\n')
+        if self.log_format.is_header(line):
+            record = self.flush()
+            self._header = line
+            self._offset = offset
+            self._chars = len(line)
+            return record
+
+        if not line.strip():
+            return None
+        if self._header is None or self._full:
+            self.dropped_lines += 1
+            return None
+        line = line.strip()
+        if len(self._continuation) >= self.max_lines or self._chars + len(line) > self.max_chars:
+            self._full = True
+            self.dropped_lines += 1
+            return None
+        self._continuation.append(line)
+        self._chars += len(line)
+        return None
+
+    def flush(self) -> Optional[LogRecord]:
+        """Return the pending record, if any, and reset."""
+        if self._header is None:
+            return None
+        header, continuation = self._header, self._continuation
+        self._header, self._continuation, self._chars, self._offset, self._full = None, [], 0, None, False
+        try:
+            return self.log_format.decode(header, continuation, self.source)
+        except Exception as e:
+            print(f"Error parsing line: {str(e)}")
+            return None
@@ -0,0 +1,167 @@
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable
+from CodeEntityClass import CodeEntity
+from logger import logger
+import re
+
+# printf conversion specification, e.g. %d, %-08.3lf, %s, %llu, %%
+FORMAT_SPEC = re.compile(r'%(?:%|[-+ #0]*(?:\*|\d+)?(?:\.(?:\*|\d+))?(?:hh|h|ll|l|L|q|j|z|t)?([diouxXeEfFgGaAcspn]))')
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '"': '"', "'": "'", '\\': '\\', '0': ''}
+
+
+class LogFormatString:
+    """A printf-style format string found in the source and where it is logged from."""
+
+    __slots__ = ('entity', 'format', 'call', 'file_path', 'line', 'fragments', '_pattern')
+
+    def __init__(self, entity: str, format_string: str, call: str = '', file_path: str = '', line: int = 0):
+        self.entity = entity
+        self.format = format_string
+        self.call = call
+        self.file_path = file_path
+        self.line = line
+        # Constant text between the conversions, whitespace-trimmed
+        self.fragments = [part.strip() for part in FORMAT_SPEC.split(self.unescape(format_string))[::2]
+                          if part is not None and part.strip()]
+        self._pattern: Optional[re.Pattern] = None
+
+    @staticmethod
+    def unescape(literal: str) -> str:
+        return re.sub(r'\\(.)', lambda m: ESCAPES.get(m.group(1), m.group(1)), literal)
+
+    @property
+    def key(self) -> str:
+        """Longest constant fragment; what the trigram index is built on."""
+        return max(self.fragments, key=len) if self.fragments else ''
+
+    @property
+    def pattern(self) -> re.Pattern:
+        """Regex matching a line produced by this format."""
+        if self._pattern is None:
+            parts = []
+            text = self.unescape(self.format).strip()
+            position = 0
+            for spec in FORMAT_SPEC.finditer(text):
+                parts.append(re.escape(text[position:spec.start()]))
+                conversion = spec.group(1)
+                if conversion is None:
+                    parts.append('%')
+                elif conversion in 'diu':
+                    parts.append(r'-?\d+')
+                elif conversion in 'xXop':
+                    parts.append(r'(?:(?:0x)?[0-9a-fA-F]+|\(nil\))')
+                else:
+                    parts.append(r'.*?')
+                position = spec.end()
+            parts.append(re.escape(text[position:]))
+            # Runs of spaces in a format rarely survive log shipping unchanged
+            self._pattern = re.compile(''.join(parts).replace('\\ ', r'\s*'))
+        return self._pattern
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'entity': self.entity, 'format': self.format, 'call': self.call,
+                'file_path': self.file_path, 'line': self.line}
+
+
+class LogSourceIndex:
+    """Trigram index from log format strings to the functions that log them.
+
+    Each format is indexed under the keys_per_format rarest trigrams of its
+    longest constant fragment. A log message proposes the formats whose keys
+    all occur among its own trigrams; those few candidates are checked with
+    the format's regex and ranked by how much constant text they explain.
+    """
+
+    def __init__(self, keys_per_format: int = 3, min_key_length: int = 4):
+        self.keys_per_format = keys_per_format
+        self.min_key_length = min_key_length  # Formats with less constant text (e.g. "%s\n") are not indexed
+        self.formats: List[LogFormatString] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._key_counts: Dict[int, int] = {}  # format id -> number of distinct keys
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.formats)
+
+    @staticmethod
+    def trigrams(text: str) -> Set[str]:
+        text = text.lower()
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, log_format: LogFormatString) -> bool:
+        if len(log_format.key) < self.min_key_length:
+            return False
+        self.formats.append(log_format)
+        self._dirty = True
+        return True
+
+    def add_entity(self, entity: CodeEntity) -> int:
+        """Index the log formats the parser stored on a function entity."""
+        added = 0
+        for found in entity.metadata.get('log_formats', []):
+            added += self.add(LogFormatString(entity.name, found['format'], found.get('call', ''),
+                                        entity.file_path, found.get('line', 0)))
+        return added
+
+    @classmethod
+    def from_entities(cls, entities: Iterable[CodeEntity]) -> 'LogSourceIndex':
+        index = cls()
+        index.rebuild(entities)
+        return index
+
+    def rebuild(self, entities: Iterable[CodeEntity]):
+        """Replace the indexed formats with those of an entity set."""
+        self.formats = []
+        for entity in entities:
+            self.add_entity(entity)
+        self.build()
+        logger.info(f"Indexed {len(self)} log format strings")
+
+    def build(self):
+        """Choose the index keys of every format from the current trigram frequencies."""
+        frequency: Dict[str, int] = {}
+        grams_by_format = [self.trigrams(log_format.key) for log_format in self.formats]
+        for grams in grams_by_format:
+            for gram in grams:
+                frequency[gram] = frequency.get(gram, 0) + 1
+        self._postings = {}
+        self._key_counts = {}
+        for format_id, grams in enumerate(grams_by_format):
+            keys = sorted(grams, key=lambda gram: (frequency[gram], gram))[:self.keys_per_format]
+            for gram in keys:
+                self._postings.setdefault(gram, []).append(format_id)
+            self._key_counts[format_id] = len(keys)
+        self._dirty = False
+
+    def _matches(self, message: str) -> List[Tuple[bool, int, LogFormatString]]:
+        """(regex matched, constant characters explained, format) for every candidate, best first."""
+        if self._dirty:
+            self.build()
+        hits: Dict[int, int] = {}
+        for gram in self.trigrams(message):
+            for format_id in self._postings.get(gram, ()):
+                hits[format_id] = hits.get(format_id, 0) + 1
+
+        lowered = message.lower()
+        matches = []
+        for format_id, count in hits.items():
+            if count < self._key_counts[format_id]:
+                continue
+            log_format = self.formats[format_id]
+            if not all(fragment.lower() in lowered for fragment in log_format.fragments):
+                continue
+            exact = log_format.pattern.search(message) is not None
+            matches.append((exact, sum(len(fragment) for fragment in log_format.fragments), log_format))
+        matches.sort(key=lambda match: (match[0], match[1]), reverse=True)
+        return matches
+
+    def find(self, message: str, limit: int = 3) -> List[LogFormatString]:
+        """Formats that could have produced a log message, best first."""
+        return [log_format for _, _, log_format in self._matches(message)[:limit]]
+
+    def lookup(self, message: str) -> List[str]:
+        """Names of the functions whose best matching formats produced the message."""
+        matches = self._matches(message)
+        if not matches:
+            return []
+        best = matches[0][:2]
+        return sorted({log_format.entity for exact, length, log_format in matches if (exact, length) == best})
@@ -0,0 +1,163 @@
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable
+from dataclasses import dataclass, field
+from LogAnalysisResult import ErrorPattern
+from ColumnarLogStoreClass import from_micros
+import re
+
+WILDCARD = '<*>'
+
+
+@dataclass
+class LogTemplate:
+    template_id: int
+    tokens: List[str]
+    count: int = 0
+    first_seen_us: int = 0
+    last_seen_us: int = 0
+    level_counts: Dict[str, int] = field(default_factory=dict)
+    components: Set[str] = field(default_factory=set)
+    example: str = ''
+
+    @property
+    def text(self) -> str:
+        return ' '.join(self.tokens)
+
+    def summary(self) -> str:
+        components = ', '.join(sorted(self.components))
+        return (f"{self.count}x [{components}] {self.text} "
+                f"({from_micros(self.first_seen_us).isoformat()} .. {from_micros(self.last_seen_us).isoformat()})")
+
+
+class LogTemplateMiner:
+    """Incremental log template mining in the style of Drain.
+
+    Messages are split into tokens and obvious variables (numbers, hex values,
+    IP and MAC addresses) masked. A fixed-depth tree keyed by token count and
+    the first depth - 2 tokens leads to a small list of templates; the message
+    joins the most similar one if at least similarity_threshold of the tokens
+    agree, which turns the differing positions into wildcards, and starts a new
+    template otherwise. Template ids never change once assigned.
+    """
+
+    MASKS = re.compile(
+        r'^(?:[-+]?\d+(?:\.\d+)?[a-zA-Z%]{0,3}'       # 42, -1, 3.5, 100ms, 80%
+        r'|0x[0-9a-fA-F]+'                           # 0x7f3a
+        r'|(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?'          # 10.0.0.1[:port]
+        r'|(?:[0-9a-fA-F]{2}[:-]){5}[0-9a-fA-F]{2}'   # MAC address
+        r'|[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}'  # UUID
+        r')[,;.)\]]?$'
+    )
+    ERROR_LEVELS = ('ERROR', 'FATAL', 'CRITICAL', 'EMERG', 'ALERT')
+    ERROR_KEYWORDS = ('error', 'fail', 'timeout', 'timed out', 'crash', 'abort', 'exception',
+                      'invalid', 'unable', 'not found', 'refused', 'denied')
+
+    def __init__(self, depth: int = 4, similarity_threshold: float = 0.4, max_children: int = 100):
+        self.depth = max(depth, 3)
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.templates: List[LogTemplate] = []
+        # token count -> token -> ... -> [template ids]
+        self._root: Dict[int, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def tokenize(self, message: str) -> List[str]:
+        return message.split()
+
+    def add(self, message: str, timestamp_us: int = 0, level: str = '', component: str = '') -> Tuple[int, List[str]]:
+        """Assign a message to a template; returns the template id and the variable values."""
+        tokens = self.tokenize(message)
+        masked = [WILDCARD if self.MASKS.match(token) else token for token in tokens]
+        leaf = self._leaf(masked)
+
+        template = self._best_match(leaf, masked)
+        if template is None:
+            template = LogTemplate(len(self.templates), masked, first_seen_us=timestamp_us,
+                                   last_seen_us=timestamp_us, example=message[:200])
+            self.templates.append(template)
+            leaf.append(template.template_id)
+        else:
+            template.tokens = [old if old == new else WILDCARD for old, new in zip(template.tokens, masked)]
+
+        template.count += 1
+        template.first_seen_us = min(template.first_seen_us, timestamp_us)
+        template.last_seen_us = max(template.last_seen_us, timestamp_us)
+        if level:
+            template.level_counts[level] = template.level_counts.get(level, 0) + 1
+        if component:
+            template.components.add(component)
+        return template.template_id, self.variables(template.template_id, message)
+
+    def add_entry(self, entry) -> int:
+        """Template id of a LogEntry or LogRecord."""
+        template_id, _ = self.add(entry.message, entry.timestamp_us, entry.level, entry.component)
+        return template_id
+
+    def variables(self, template_id: int, message: str) -> List[str]:
+        """Values of the wildcard positions of a template in a message."""
+        template = self.templates[template_id]
+        tokens = self.tokenize(message)
+        if len(tokens) != len(template.tokens):
+            return []
+        return [token for token, slot in zip(tokens, template.tokens) if slot == WILDCARD]
+
+    def _leaf(self, tokens: List[str]) -> List[int]:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            if any(char.isdigit() for char in token):
+                token = WILDCARD
+            if token not in node:
+                # Once a node is full, new tokens share the wildcard branch
+                token = token if len(node) < self.max_children or token == WILDCARD else WILDCARD
+            node = node.setdefault(token, {})
+        return node.setdefault(None, [])
+
+    def _best_match(self, leaf: List[int], tokens: List[str]) -> Optional[LogTemplate]:
+        best, best_similarity, best_wildcards = None, -1.0, -1
+        for template_id in leaf:
+            template = self.templates[template_id]
+            same = wildcards = 0
+            for slot, token in zip(template.tokens, tokens):
+                if slot == WILDCARD:
+                    wildcards += 1
+                elif slot == token:
+                    same += 1
+            similarity = same / len(tokens) if tokens else 1.0
+            if similarity > best_similarity or (similarity == best_similarity and wildcards > best_wildcards):
+                best, best_similarity, best_wildcards = template, similarity, wildcards
+        if best is not None and (best_similarity >= self.similarity_threshold or not tokens):
+            return best
+        return None
+
+    def is_error(self, template: LogTemplate) -> bool:
+        if any(template.level_counts.get(level) for level in self.ERROR_LEVELS):
+            return True
+        text = template.text.lower()
+        return any(keyword in text for keyword in self.ERROR_KEYWORDS)
+
+    def top(self, limit: int = 20, errors_only: bool = False, since_us: Optional[int] = None) -> List[LogTemplate]:
+        """Most frequent templates, optionally only error-like ones seen since a time."""
+        templates = [
+            template for template in self.templates
+            if (not errors_only or self.is_error(template))
+            and (since_us is None or template.last_seen_us >= since_us)
+        ]
+        return sorted(templates, key=lambda template: (-template.count, template.template_id))[:limit]
+
+    def error_patterns(self, limit: int = 10, min_count: int = 1, since_us: Optional[int] = None) -> List[ErrorPattern]:
+        """Recurring error templates as ErrorPattern, most frequent first."""
+        return [
+            ErrorPattern(
+                pattern=template.text,
+                frequency=template.count,
+                examples=[template.example],
+                related_components=sorted(template.components)
+            )
+            for template in self.top(len(self.templates), errors_only=True, since_us=since_us)
+            if template.count >= min_count
+        ][:limit]
+
+    def summaries(self, limit: int = 20, errors_only: bool = False) -> List[str]:
+        """One line per template, for prompts."""
+        return [template.summary() for template in self.top(limit, errors_only)]
@@ -0,0 +1,128 @@
+from typing import Dict, List, Set, Any, Optional, Tuple
+from langchain_community.vectorstores import FAISS
+from LogIndexClass import LogIndex
+from ColumnarLogStoreClass import from_micros
+from logger import logger
+from datetime import datetime
+import hashlib
+import json
+import os
+
+
+class LogVectorIndex:
+    """Vector index over the log templates of a LogIndex.
+
+    One vector per distinct template text instead of one per line, so a device
+    bundle with millions of lines needs a few thousand embeddings. update()
+    embeds templates that appeared or changed since the last call and drops the
+    ones the miner has generalised away. Hits map back to the template id and
+    to its rows in the columnar log store.
+    """
+
+    def __init__(self, embedding_model, log_index: LogIndex, min_count: int = 1):
+        self.embedding_model = embedding_model
+        self.log_index = log_index
+        self.min_count = min_count  # Templates seen fewer times are not embedded yet
+        self.store: Optional[FAISS] = None
+        # template text -> docstore id
+        self.embedded: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.embedded)
+
+    @staticmethod
+    def document_id(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def update(self) -> int:
+        """Embed new and changed templates; returns the number of vectors added or removed."""
+        with self.log_index._lock:
+            wanted = {template.text for template in self.log_index.templates.templates
+                      if template.count >= self.min_count and template.text}
+
+        stale = [text for text in self.embedded if text not in wanted]
+        if stale and self.store is not None:
+            self.store.delete([self.embedded[text] for text in stale])
+            for text in stale:
+                del self.embedded[text]
+
+        new_texts = sorted(wanted - self.embedded.keys())
+        if not new_texts:
+            return len(stale)
+        try:
+            vectors = self.embedding_model.embed_documents(new_texts)
+        except Exception as e:
+            logger.error(f"Error embedding log templates: {str(e)}")
+            return len(stale)
+        ids = [self.document_id(text) for text in new_texts]
+        metadatas = [{'template': text} for text in new_texts]
+        if self.store is None:
+            self.store = FAISS.from_embeddings(list(zip(new_texts, vectors)), self.embedding_model,
+                                               metadatas=metadatas, ids=ids)
+        else:
+            self.store.add_embeddings(list(zip(new_texts, vectors)), metadatas=metadatas, ids=ids)
+        self.embedded.update(zip(new_texts, ids))
+        logger.info(f"Log vector index embedded {len(new_texts)} templates, removed {len(stale)}, "
+                    f"{len(self.embedded)} in total")
+        return len(new_texts) + len(stale)
+
+    def search(self, query: str, k: int = 5, rows_per_template: int = 20) -> List[Dict]:
+        """Templates closest to the query with the latest rows and entries of each."""
+        if self.store is None or not self.embedded:
+            return []
+        hits = self.store.similarity_search_with_score(query, k=min(2 * k, len(self.embedded)))
+
+        results = []
+        with self.log_index._lock:
+            by_text = {template.text: template for template in self.log_index.templates.templates}
+            for doc, score in hits:
+                template = by_text.get(doc.page_content)
+                if template is None:
+                    continue  # Generalised since the last update()
+                rows = self.log_index.store.template_rows(template.template_id, rows_per_template)
+                results.append({
+                    'template_id': template.template_id,
+                    'template': template.text,
+                    'score': float(score),
+                    'count': template.count,
+                    'components': sorted(template.components),
+                    'first_seen': from_micros(template.first_seen_us).isoformat(),
+                    'last_seen': from_micros(template.last_seen_us).isoformat(),
+                    'rows': rows.tolist(),
+                    'entries': self.log_index.store.entries(rows)
+                })
+                if len(results) == k:
+                    break
+        return results
+
+    def save(self, base_path: str = "vector_stores"):
+        if self.store is None:
+            return
+        os.makedirs(base_path, exist_ok=True)
+        self.store.save_local(os.path.join(base_path, "log_index"))
+        with open(os.path.join(base_path, "log_metadata.json"), 'w') as f:
+            json.dump({
+                'store_type': 'log',
+                'total_vectors': len(self.embedded),
+                'embedding_dimension': self.store.index.d,
+                'templates': self.embedded,
+                'creation_timestamp': datetime.now().isoformat()
+            }, f)
+
+    @classmethod
+    def load(cls, embedding_model, log_index: LogIndex, base_path: str = "vector_stores",
+             min_count: int = 1) -> Optional['LogVectorIndex']:
+        store_path = os.path.join(base_path, "log_index")
+        metadata_path = os.path.join(base_path, "log_metadata.json")
+        if not os.path.exists(store_path) or not os.path.exists(metadata_path):
+            return None
+        try:
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+            index = cls(embedding_model, log_index, min_count)
+            index.store = FAISS.load_local(store_path, embedding_model, allow_dangerous_deserialization=True)
+            index.embedded = dict(metadata['templates'])
+            return index
+        except Exception as e:
+            logger.error(f"Error loading log vector index: {str(e)}")
+            return None
@@ -0,0 +1,389 @@
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable
+from collections import OrderedDict
+from datetime import datetime
+from logger import logger
+import hashlib
+import json
+import os
+import re
+
+
+class Preprocessor:
+    """Lightweight C preprocessing stage run before parsing.
+
+    Resolves #if/#ifdef/#elif/#else blocks for one build profile (a set of
+    defines) and blanks the inactive lines, keeping every newline so line
+    numbers do not move. #define directives seen along the way are learned into
+    a macro table, which lets the parser tell function-like macros such as
+    CcspTraceInfo or ERR_CHK apart from real function calls. It does not expand
+    macros or read included files itself, but the macros a header defined when
+    it was processed are applied to the files that include it.
+    """
+
+    DIRECTIVE = re.compile(r'^\s*#\s*(\w+)(.*)$')
+    DEFINE = re.compile(r'(\w+)(\(([^)]*)\))?\s*(.*)$', re.DOTALL)
+    EXPRESSION_TOKEN = re.compile(
+        r'\s*(?:(0[xX][0-9a-fA-F]+|\d+)[uUlL]*|([A-Za-z_]\w*)|(\|\||&&|<<|>>|<=|>=|==|!=|[-+*/%<>&|^!~?:()]))'
+    )
+    CONDITIONALS = frozenset(('if', 'ifdef', 'ifndef', 'elif', 'else', 'endif'))
+
+    def __init__(self, defines: Optional[Dict[str, str]] = None, cache_size: int = 4096):
+        self.defines: Dict[str, str] = dict(defines or {})
+        # name -> {'params': [...] for function-like macros or None, 'body': str}
+        self.macros: Dict[str, Dict[str, Any]] = {}
+        # file path -> macros the file defines, to seed the files that include it
+        self.file_macros: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.cache_size = cache_size
+        # (content hash, profile) -> (inactive line numbers, defines made by the file)
+        self._cache: 'OrderedDict[Tuple[str, str], Tuple[Tuple[int, ...], Dict[str, Dict[str, Any]]]]' = OrderedDict()
+        self.profile = self._profile_key(self.defines)
+
+    @staticmethod
+    def parse_defines(spec: Optional[str]) -> Dict[str, str]:
+        """Parse 'FEATURE_A,WIFI_BANDS=3' style define lists, e.g. from an env variable."""
+        defines = {}
+        for item in (spec or '').replace(';', ',').split(','):
+            name, _, value = item.strip().partition('=')
+            if name:
+                defines[name] = value or '1'
+        return defines
+
+    @staticmethod
+    def _profile_key(defines: Dict[str, str]) -> str:
+        text = '\n'.join(f"{name}={value}" for name, value in sorted(defines.items()))
+        return hashlib.md5(text.encode()).hexdigest()
+
+    @property
+    def function_macros(self) -> Set[str]:
+        return {name for name, macro in self.macros.items() if macro['params'] is not None}
+
+    def is_function_macro(self, name: str) -> bool:
+        macro = self.macros.get(name)
+        return macro is not None and macro['params'] is not None
+
+    def included_defines(self, included: Iterable[str]) -> Dict[str, str]:
+        """Defines made by already processed headers, as #if evaluation sees them."""
+        defines = {}
+        for header in sorted(str(path) for path in included):
+            for name, macro in self.file_macros.get(header, {}).items():
+                defines[name] = macro['body'] or '1'
+        return defines
+
+    def process(self, content: str, file_path: Optional[str] = None, included: Iterable[str] = ()) -> str:
+        """Return content with the inactive conditional blocks of this profile blanked.
+
+        included are the headers the file includes; their macros count as defined.
+        """
+        seed = self.included_defines(included)
+        key = (hashlib.md5(content.encode('utf-8', errors='ignore')).hexdigest(), self.profile,
+               self._profile_key(seed) if seed else '')
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._evaluate(content, seed)
+            self._cache[key] = cached
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+
+        inactive, learned = cached
+        self.macros.update(learned)
+        if file_path is not None and (learned or str(file_path) in self.file_macros):
+            self.file_macros[str(file_path)] = learned
+        if not inactive:
+            return content
+
+        lines = content.split('\n')
+        for line_number in inactive:
+            lines[line_number] = ''
+        return '\n'.join(lines)
+
+    def _directives(self, lines: List[str]) -> Iterable[Tuple[List[int], str, str]]:
+        """Yield (line numbers, directive, argument) for each directive, joining continuations."""
+        in_comment = False
+        idx = 0
+        while idx < len(lines):
+            line = lines[idx]
+            start = idx
+            idx += 1
+            if in_comment:
+                if '*/' not in line:
+                    continue
+                line = line[line.index('*/') + 2:]
+                in_comment = False
+
+            match = self.DIRECTIVE.match(line) if line.lstrip().startswith('#') else None
+            if match is None:
+                in_comment = self._ends_in_comment(line)
+                continue
+
+            text = match.group(2)
+            while text.endswith('\\') and idx < len(lines):
+                text = text[:-1] + ' ' + lines[idx]
+                idx += 1
+            text = re.sub(r'/\*.*?\*/', ' ', text, flags=re.DOTALL)
+            if '/*' in text:
+                text = text[:text.index('/*')]
+                in_comment = True
+            text = text.split('//', 1)[0].strip()
+            yield list(range(start, idx)), match.group(1), text
+
+    @staticmethod
+    def _ends_in_comment(line: str) -> bool:
+        # Strip strings and complete comments, then look for an open block comment
+        line = re.sub(r'"(?:[^"\\]|\\.)*"|/\*.*?\*/', '', line)
+        line = line.split('//', 1)[0]
+        return '/*' in line
+
+    def _define(self, argument: str, table: Dict[str, Dict[str, Any]]) -> Optional[str]:
+        match = self.DEFINE.match(argument)
+        if not match:
+            return None
+        name, function_like, params, body = match.groups()
+        # A parameter list only makes a function-like macro when it follows the name directly
+        if function_like and argument[len(name)] == '(':
+            table[name] = {
+                'params': [p.strip() for p in params.split(',') if p.strip()],
+                'body': body.strip()
+            }
+        else:
+            table[name] = {'params': None, 'body': argument[len(name):].strip()}
+        return name
+
+    def _evaluate(self, content: str, seed: Optional[Dict[str, str]] = None) -> Tuple[Tuple[int, ...], Dict[str, Dict[str, Any]]]:
+        lines = content.split('\n')
+        learned: Dict[str, Dict[str, Any]] = {}
+        defines = dict(self.defines)
+        defines.update(seed or {})
+        inactive: List[int] = []
+        # One frame per open #if: [parent active, a branch has been taken, current branch active]
+        stack: List[List[bool]] = []
+        active = True
+        last_line = 0
+
+        for line_numbers, directive, argument in self._directives(lines):
+            if not active:
+                inactive.extend(range(last_line, line_numbers[0]))
+            last_line = line_numbers[-1] + 1
+
+            if directive in self.CONDITIONALS:
+                if directive in ('if', 'ifdef', 'ifndef'):
+                    if directive == 'if':
+                        taken = bool(self._eval_condition(argument, defines)) if active else False
+                    else:
+                        taken = active and ((argument.split() or [''])[0] in defines) == (directive == 'ifdef')
+                    stack.append([active, taken, taken])
+                elif not stack:
+                    logger.debug(f"Unbalanced #{directive} ignored")
+                    continue
+                elif directive == 'elif':
+                    frame = stack[-1]
+                    frame[2] = frame[0] and not frame[1] and bool(self._eval_condition(argument, defines))
+                    frame[1] = frame[1] or frame[2]
+                elif directive == 'else':
+                    frame = stack[-1]
+                    frame[2] = frame[0] and not frame[1]
+                    frame[1] = True
+                else:
+                    stack.pop()
+                active = stack[-1][2] if stack else True
+                continue
+
+            if not active:
+                inactive.extend(line_numbers)
+            elif directive == 'define':
+                name = self._define(argument, learned)
+                if name:
+                    defines[name] = learned[name]['body'] or '1'
+            elif directive == 'undef':
+                defines.pop(argument.strip(), None)
+                learned.pop(argument.strip(), None)
+
+        if not active:
+            inactive.extend(range(last_line, len(lines)))
+        return tuple(inactive), learned
+
+    def save(self, base_path: str = "vector_stores"):
+        """Persist the learned macro tables so incremental parses see header macros too."""
+        os.makedirs(base_path, exist_ok=True)
+        with open(os.path.join(base_path, "macro_table.json"), 'w') as f:
+            json.dump({
+                'profile': self.profile,
+                'macros': self.macros,
+                'file_macros': self.file_macros,
+                'creation_timestamp': datetime.now().isoformat()
+            }, f)
+
+    def load_macros(self, base_path: str = "vector_stores") -> bool:
+        """Load the macro tables saved for the same build profile."""
+        path = os.path.join(base_path, "macro_table.json")
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if data.get('profile') != self.profile:
+                logger.info("Saved macro table is for another build profile, not loading it")
+                return False
+            self.macros = data.get('macros', {})
+            self.file_macros = data.get('file_macros', {})
+            return True
+        except Exception as e:
+            logger.error(f"Error loading macro table: {str(e)}")
+            return False
+
+    def _eval_condition(self, expression: str, defines: Dict[str, str]) -> int:
+        """Evaluate an #if expression; expressions that cannot be parsed count as true."""
+        try:
+            return _ExpressionParser(expression, defines, self.EXPRESSION_TOKEN).parse()
+        except (ValueError, ZeroDivisionError, RecursionError) as e:
+            logger.debug(f"Could not evaluate #if {expression!r}: {str(e)}")
+            return 1
+
+
+class _ExpressionParser:
+    """Recursive-descent evaluator for #if expressions (C precedence, integers only)."""
+
+    BINARY_PRECEDENCE = (
+        ('||',), ('&&',), ('|',), ('^',), ('&',), ('==', '!='),
+        ('<', '<=', '>', '>='), ('<<', '>>'), ('+', '-'), ('*', '/', '%')
+    )
+
+    def __init__(self, expression: str, defines: Dict[str, str], token_pattern: re.Pattern, depth: int = 0):
+        if depth > 16:
+            raise ValueError("macro expansion too deep")
+        self.defines = defines
+        self.token_pattern = token_pattern
+        self.depth = depth
+        self.tokens = self._tokenize(expression)
+        self.pos = 0
+
+    def _tokenize(self, expression: str) -> List[Tuple[str, Any]]:
+        tokens = []
+        pos = 0
+        expression = expression.strip()
+        while pos < len(expression):
+            match = self.token_pattern.match(expression, pos)
+            if not match or match.end() == pos:
+                raise ValueError(f"unexpected character {expression[pos]!r}")
+            number, identifier, operator = match.groups()
+            if number is not None:
+                tokens.append(('num', int(number, 16) if number[:2].lower() == '0x' else int(number, 8 if number.startswith('0') and len(number) > 1 else 10)))
+            elif identifier is not None:
+                tokens.append(('id', identifier))
+            else:
+                tokens.append(('op', operator))
+            pos = match.end()
+        return tokens
+
+    def _peek(self) -> Optional[Tuple[str, Any]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self) -> Tuple[str, Any]:
+        token = self._peek()
+        if token is None:
+            raise ValueError("unexpected end of expression")
+        self.pos += 1
+        return token
+
+    def _accept(self, operator: str) -> bool:
+        if self._peek() == ('op', operator):
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self) -> int:
+        value = self._conditional()
+        if self._peek() is not None:
+            raise ValueError(f"trailing tokens {self.tokens[self.pos:]}")
+        return value
+
+    def _conditional(self) -> int:
+        condition = self._binary(0)
+        if not self._accept('?'):
+            return condition
+        if_true = self._conditional()
+        if not self._accept(':'):
+            raise ValueError("expected ':'")
+        if_false = self._conditional()
+        return if_true if condition else if_false
+
+    def _binary(self, level: int) -> int:
+        if level == len(self.BINARY_PRECEDENCE):
+            return self._unary()
+        value = self._binary(level + 1)
+        while True:
+            token = self._peek()
+            if token is None or token[0] != 'op' or token[1] not in self.BINARY_PRECEDENCE[level]:
+                return value
+            self.pos += 1
+            value = self._apply(token[1], value, self._binary(level + 1))
+
+    @staticmethod
+    def _apply(operator: str, left: int, right: int) -> int:
+        if operator == '||':
+            return int(bool(left) or bool(right))
+        if operator == '&&':
+            return int(bool(left) and bool(right))
+        if operator in ('/', '%'):
+            quotient = abs(left) // abs(right) * (1 if (left < 0) == (right < 0) else -1)
+            return quotient if operator == '/' else left - quotient * right
+        return {
+            '|': lambda: left | right, '^': lambda: left ^ right, '&': lambda: left & right,
+            '==': lambda: int(left == right), '!=': lambda: int(left != right),
+            '<': lambda: int(left < right), '<=': lambda: int(left <= right),
+            '>': lambda: int(left > right), '>=': lambda: int(left >= right),
+            '<<': lambda: left << right, '>>': lambda: left >> right,
+            '+': lambda: left + right, '-': lambda: left - right, '*': lambda: left * right
+        }[operator]()
+
+    def _unary(self) -> int:
+        if self._accept('!'):
+            return int(not self._unary())
+        if self._accept('-'):
+            return -self._unary()
+        if self._accept('+'):
+            return self._unary()
+        if self._accept('~'):
+            return ~self._unary()
+        return self._primary()
+
+    def _primary(self) -> int:
+        kind, value = self._next()
+        if kind == 'num':
+            return value
+        if kind == 'op':
+            if value != '(':
+                raise ValueError(f"unexpected operator {value!r}")
+            result = self._conditional()
+            if not self._accept(')'):
+                raise ValueError("expected ')'")
+            return result
+
+        if value == 'defined':
+            parenthesised = self._accept('(')
+            kind, name = self._next()
+            if kind != 'id':
+                raise ValueError("expected macro name after 'defined'")
+            if parenthesised and not self._accept(')'):
+                raise ValueError("expected ')'")
+            return int(name in self.defines)
+
+        # Function-like macro invocations cannot be expanded here: skip the arguments
+        if self._peek() == ('op', '('):
+            depth = 0
+            while True:
+                token = self._next()
+                if token == ('op', '('):
+                    depth += 1
+                elif token == ('op', ')'):
+                    depth -= 1
+                    if depth == 0:
+                        return 0
+
+        if value not in self.defines:
+            return 0
+        body = self.defines[value].strip()
+        if not body:
+            return 0
+        return _ExpressionParser(body, self.defines, self.token_pattern, self.depth + 1).parse()
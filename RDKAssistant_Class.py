@@ -17,7 +17,15 @@ from pathlib import Path
 from typing import Dict, List, Set, Any, Optional, Tuple
 from tqdm import tqdm
 from VectorStoreManager import VectorStoreManager
+from VectorQuantizerClass import VectorQuantizer
 from ProcessingStateClass import ProcessingState
+from CallGraphClass import CallGraph
+from ComponentMatcherClass import ComponentMatcher
+from IncludeGraphClass import IncludeGraph
+from SymbolTableClass import SymbolTable
+from LogSourceIndexClass import LogSourceIndex
+from PreprocessorClass import Preprocessor
+import hashlib
 import pickle
 
 # credential_path = "credentials.json"
@@ -55,12 +63,22 @@ else:
     credentials = Credentials.from_service_account_info(credentials_info)
 
 class RDKAssistant:
-    def __init__(self, code_base_path: str, gemini_api_key: str,):
+    def __init__(self, code_base_path: str, gemini_api_key: str, context_lines: int = 40,
+                 parse_timeout: Optional[float] = 30.0, build_defines: Optional[Dict[str, str]] = None,
+                 quantization: Optional[str] = None, log_directory: Optional[str] = None):
         self.code_base_path = Path(code_base_path)
-        self.parser = EnhancedCodeParser()
+        self.log_directory = log_directory  # Followed device logs, default RDK_LOG_DIRECTORY or rdklogs/logs
+        # Preprocessing is only enabled when a build profile is given
+        preprocessor = Preprocessor(build_defines) if build_defines is not None else None
+        self.parser = EnhancedCodeParser(
+            context_lines=context_lines, parse_timeout=parse_timeout, preprocessor=preprocessor
+        )
+        self.component_matcher = ComponentMatcher()
         self.entities: Dict[str, CodeEntity] = {}
         self.processing_state = ProcessingState.load()
         self.enhanced_search = None
+        # Log format strings of the parsed functions, for find_log_source
+        self.log_sources = LogSourceIndex()
 
 
 
@@ -75,7 +93,9 @@ class RDKAssistant:
             credentials=credentials
         )
         #-------------------------
-        self.vector_store = VectorStoreManager(self.embedding_model)
+        self.vector_store = VectorStoreManager(
+            self.embedding_model, quantizer=VectorQuantizer(quantization or 'none')
+        )
         
         # Initialize Gemini
         genai.configure(api_key=gemini_api_key)
@@ -94,7 +114,9 @@ class RDKAssistant:
         self.enhanced_search = EnhancedVectorSearch(
             self.gemini_model,
             self.vector_store,
-            self.entities
+            self.entities,
+            log_directory=self.log_directory,
+            call_filter=self.parser.call_filter
         )
         #==========================================================
         
@@ -105,6 +127,12 @@ class RDKAssistant:
                 
                 if self.vector_store.load_indices(vector_store_path):
                     logger.info("Vector stores loaded successfully")
+                    self._load_call_graph(vector_store_path)
+                    self.parser.include_graph = IncludeGraph.load(vector_store_path) or IncludeGraph()
+                    self._load_symbol_table(vector_store_path)
+                    if self.parser.preprocessor is not None:
+                        self.parser.preprocessor.load_macros(vector_store_path)
+                    self.parser.call_filter.load_suppressed(vector_store_path)
                 else:
                     logger.warning("Failed to load vector stores, rebuilding...")
                     self._process_codebase(max_workers)
@@ -114,8 +142,12 @@ class RDKAssistant:
             
             self.sequence_generator = SequenceDiagramGenerator(
                 self.vector_store,
-                self.entities
+                self.entities,
+                self.parser.call_graph
             )
+            # Entities were (re)loaded above; link the indexed logs to them
+            self.log_sources.rebuild(self.entities.values())
+            self.enhanced_search.set_entities(self.entities, self.parser.symbol_table, self.log_sources)
             #==========================================
             logger.info(f"Loaded {len(self.entities)} entities")
             logger.debug(f"Entity names: {list(self.entities.keys())}")
@@ -134,20 +166,19 @@ class RDKAssistant:
     def _process_codebase(self, max_workers: int):
         """Process all source files in the codebase with parallel processing"""
         try:
-            source_files = []
-            for ext in ['.c', '.cpp', '.cc']:
-                source_files.extend(self.code_base_path.rglob(f'*{ext}'))
+            source_files, header_files = self._collect_files(self.code_base_path)
             
             total_files = len(source_files)
-            logger.info(f"Found {total_files} source files")
+            logger.info(f"Found {total_files} source files and {len(header_files)} headers")
+            
+            # Headers first, so every struct and typedef is known before the sources
+            processed_entities = self._process_headers(header_files)
             
             if self.processing_state.processed_files:
                 source_files = [f for f in source_files 
                             if str(f) not in self.processing_state.processed_files]
                 logger.info(f"Resuming processing with {len(source_files)} remaining files")
             
-            processed_entities = []
-
             # Use tqdm for progress bar without threading
             for file_path in tqdm(source_files, desc="Processing files"):
                 try:
@@ -173,15 +204,34 @@ class RDKAssistant:
             for entity in processed_entities:
                 self.entities[entity.name] = entity
             
+            # Record which components share the structs of each header
+            self._share_header_entities()
+            self.parser.include_graph.save()
+            
+            # Types from files parsed later may resolve names used earlier
+            self.parser.symbol_table.resolve_structs_used(self.entities.values())
+            self.parser.symbol_table.save()
+            if self.parser.preprocessor is not None:
+                self.parser.preprocessor.save()
+            
+            # Drop calls to callees made from almost every function (logging macros etc.)
+            self.parser.call_filter.suppress_ubiquitous(self.entities.values())
+            self.parser.call_filter.save()
+            
+            # Build the call graph from the final entity set so that resumed runs
+            # and name collisions are accounted for
+            self.parser.call_graph.build(self.entities)
+            
+            # Update function call component information before embedding
+            self._update_function_call_components()
+            
             # Create vector store indices
             logger.info(f"passing entities from process codebase to save in vector store...")
             self.vector_store.create_indices(list(self.entities.values()))
             
-            # Update function call component information
-            self._update_function_call_components()
-            
             # Save cache using JSON serialization instead of pickle
             save_entities(self.entities, "rdk_assistant_cache.json")
+            self.parser.call_graph.save()
             
             # Save final processing state
             self.processing_state.save()
@@ -191,34 +241,101 @@ class RDKAssistant:
             raise
     #---------------------------------------------------------------------
 
-    def _update_function_call_components(self):
-        """Update component information for function calls"""
+    def _collect_files(self, path: Path) -> Tuple[List[Path], List[Path]]:
+        """Split a file or directory into source files and headers"""
+        if path.is_file():
+            files = [path]
+        else:
+            files = []
+            for ext in ['.c', '.cpp', '.cc', '.h']:
+                files.extend(path.rglob(f'*{ext}'))
+        
+        source_files = [f for f in files if f.suffix != '.h']
+        header_files = [f for f in files if f.suffix == '.h']
+        return source_files, header_files
+
+    def _process_headers(self, header_files: List[Path]) -> List[CodeEntity]:
+        """Parse each header exactly once, however many files include it, and again when it changes"""
+        # Register every header and alias vendored copies (e.g. wifi_hal.h) to the
+        # first identical one before parsing, so all includes resolve the same way
+        unique_headers = []
+        unchanged = set()
+        parsed_by_hash: Dict[str, Path] = {}
+        for header in header_files:
+            try:
+                digest = hashlib.md5(header.read_bytes()).hexdigest()
+            except OSError as exc:
+                logger.error(f"Error reading header {header}: {exc}")
+                continue
+            if digest in parsed_by_hash:
+                self.parser.include_graph.add_alias(header, parsed_by_hash[digest])
+            else:
+                if self.parser.include_graph.digests.get(str(header)) == digest:
+                    unchanged.add(str(header))
+                parsed_by_hash[digest] = header
+                self.parser.include_graph.add_header(header, digest)
+                unique_headers.append(header)
+        
+        logger.info(f"Found {len(unique_headers)} unique headers out of {len(header_files)}")
+        
+        entities = []
+        for header in tqdm(unique_headers, desc="Processing headers"):
+            if str(header) in unchanged and str(header) in self.processing_state.processed_files:
+                continue
+            entities.extend(self._process_single_file(
+                header, self._determine_component_name(header), is_header=True
+            ))
+            self.processing_state.processed_files.add(str(header))
+        
+        return entities
+
+    def _share_header_entities(self):
+        """Record every component that includes a header on the structs it defines"""
         for entity in self.entities.values():
-            for call in entity.function_calls:
-                if called_entity := self.entities.get(call.function_name):
-                    call.component = called_entity.component
-    
+            if entity.type != 'struct' or Path(entity.file_path).suffix != '.h':
+                continue
+            components = {entity.component}
+            for includer in self.parser.include_graph.transitive_includers(entity.file_path):
+                components.add(self._determine_component_name(Path(includer)))
+            entity.metadata['shared_by_components'] = sorted(components)
+
+    def _load_call_graph(self, base_path: str = "vector_stores"):
+        """Load the persisted call graph, rebuilding it from entities if missing"""
+        call_graph = CallGraph.load(base_path)
+        if call_graph is None:
+            logger.warning("No persisted call graph found, rebuilding from entities...")
+            call_graph = CallGraph()
+            call_graph.build(self.entities)
+            call_graph.save(base_path)
+        self.parser.call_graph = call_graph
+
+    def _load_symbol_table(self, base_path: str = "vector_stores"):
+        """Load the persisted symbol table, rebuilding it from struct entities if missing"""
+        table = SymbolTable.load(base_path)
+        if table is None:
+            logger.info("No persisted symbol table found, rebuilding from entities")
+            table = SymbolTable()
+            for entity in self.entities.values():
+                if entity.type != 'struct':
+                    continue
+                tag = entity.metadata.get('struct_name')
+                table.add_aggregate(
+                    entity.metadata.get('kind', 'struct'), tag,
+                    entity.name if entity.name != tag else None,
+                    entity.metadata.get('members', []), entity.file_path,
+                    entity.metadata.get('documentation', '')
+                )
+            table.save(base_path)
+        self.parser.symbol_table = table
 
+    def _update_function_call_components(self):
+        """Update component information for function calls"""
+        updated = self.parser.call_graph.resolve_call_components(self.entities)
+        logger.info(f"Resolved components for {updated} function calls")
 
     def _determine_component_name(self, file_path: Path) -> str:
         """Determine RDK component name from file path"""
-        # Common RDK component names
-        rdk_components = {
-            'CcspCr', 'CcspCommonLibrary', 'CcspPsm', 'RdkWanManager',
-            'RdkWifiManager', 'RdkCellularManager', 'CcspTr069Pa',
-            'CcspLMLite', 'CcspEthAgent', 'Utopia', 'hal', 'webpa',
-            'OneWifi','CcspWifiAgent'
-        }
-        
-        # Check path parts for component names
-        parts = file_path.parts
-        for part in parts:
-            for component in rdk_components:
-                if component.lower() in part.lower():
-                    return component
-        
-        # If no known component found, use parent directory name
-        return parts[-2] if len(parts) > 1 else 'Unknown'
+        return self.component_matcher.component_for(file_path)
     
     def _create_function_analysis_prompt(self, entity: CodeEntity) -> str:
         """Create analysis prompt for function entity"""
@@ -260,9 +377,9 @@ class RDKAssistant:
         5. Any specific RDK-related details
         """
 
-    def _process_single_file(self, file_path: Path, component_name: str) -> List[CodeEntity]:
+    def _process_single_file(self, file_path: Path, component_name: str, is_header: bool = False) -> List[CodeEntity]:
         try:
-            entities = self.parser.parse_file(str(file_path), component_name)
+            entities = self.parser.parse_file(str(file_path), component_name, include_functions=not is_header)
             logger.info(f"Parsed {len(entities)} entities from {file_path}")
             
             processor = ImprovedRateLimitedGeminiProcessor(
@@ -324,29 +441,40 @@ class RDKAssistant:
     def _process_new_code(self, path: Path):
         """Process new code files and add to database"""
         try:
-            if path.is_file():
-                files = [path]
-            else:
-                files = []
-                for ext in ['.c', '.cpp', '.h', '.cc']:
-                    files.extend(path.rglob(f'*{ext}'))
-            
-            i=1
-            for file_path  in files:
-                # print("\nJAS50 ============= >> Listing all files in provided directory...")
-                # print("\nJAS50 ============= >> ",i ,') ',file_path)
-                i=i+1
-            for file_path in tqdm(files, desc="Processing new files"):
+            source_files, header_files = self._collect_files(path)
+            files = header_files + source_files
+            
+            new_entities = self._process_headers(header_files)
+            for file_path in tqdm(source_files, desc="Processing new files"):
                 # print("\nJAS51 ============= >> Processing File : ",file_path)
                 component_name = self._determine_component_name(file_path)
                 # print("\nJAS51 ============= >> From Component : ",component_name)
-                entities = self._process_single_file(file_path, component_name)
-                
-                for entity in entities:
-                    self.entities[entity.name] = entity
+                new_entities.extend(self._process_single_file(file_path, component_name))
             
-            # Update vector stores
-            self.vector_store.create_indices(list(self.entities.values()))
+            for entity in new_entities:
+                self.entities[entity.name] = entity
+            
+            self._share_header_entities()
+            self.parser.include_graph.save()
+            
+            self.parser.symbol_table.resolve_structs_used(self.entities.values())
+            self.parser.symbol_table.save()
+            if self.parser.preprocessor is not None:
+                self.parser.preprocessor.save()
+            
+            # Replace the edges of the re-parsed files in one CSR rebuild
+            entities_by_file: Dict[str, List[CodeEntity]] = {str(file_path): [] for file_path in source_files}
+            for entity in new_entities:
+                entities_by_file.setdefault(str(entity.file_path), []).append(entity)
+            self.parser.call_graph.update_files(entities_by_file)
+            self._update_function_call_components()
+            self.parser.call_graph.save()
+            
+            self.log_sources.rebuild(self.entities.values())
+            
+            # Update vector stores: only the shards of the touched components are rebuilt
+            for component in sorted({entity.component for entity in new_entities}):
+                self.vector_store.rebuild_component(component, self.entities.values())
             
             # Save updated cache
             with open("rdk_assistant_cache.pkl", 'wb') as f:
@@ -485,6 +613,10 @@ class RDKAssistant:
             return []
     
 
+    def find_log_source(self, line: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Functions whose logging calls can produce a raw log line, best match first"""
+        return [log_format.to_dict() for log_format in self.log_sources.find(line.strip(), limit)]
+    
     def generate_sequence_diagram(self, query: str, max_depth: int = 5) -> str:
         try:
             # Get context from logs and vector store
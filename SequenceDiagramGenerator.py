@@ -1,11 +1,14 @@
 from typing import Dict, List, Set, Any, Optional, Tuple
 from VectorStoreManager import VectorStoreManager
 from CodeEntityClass import CodeEntity
+from CallGraphClass import CallGraph
 
 class SequenceDiagramGenerator:
-    def __init__(self, vector_store: VectorStoreManager, entities: Dict[str, CodeEntity]):
+    def __init__(self, vector_store: VectorStoreManager, entities: Dict[str, CodeEntity],
+                 call_graph: Optional[CallGraph] = None):
         self.vector_store = vector_store
         self.entities = entities
+        self.call_graph = call_graph
         self.visited = set()
         
     def generate(self, query: str, max_depth: int = 5) -> str:
@@ -46,8 +49,7 @@ class SequenceDiagramGenerator:
         
         self.visited.add(entity.name)
         
-        for call in entity.function_calls:
-            called_entity = self.entities.get(call.function_name)
+        for call, called_entity in self._resolved_calls(entity):
             if called_entity:
                 # Add participants if not already added
                 diagram_lines.append(
@@ -72,3 +74,14 @@ class SequenceDiagramGenerator:
                 diagram_lines.append(
                     f"{called_entity.component}-->>-{entity.component}: return"
                 )
+
+    def _resolved_calls(self, entity: CodeEntity):
+        """Yield (call, called entity) pairs, using the call graph edges when available"""
+        if self.call_graph is not None and entity.name in self.call_graph.ids:
+            for callee_name, call_idx in self.call_graph.callee_edges(entity.name):
+                if call_idx < len(entity.function_calls):
+                    yield entity.function_calls[call_idx], self.entities.get(callee_name)
+            return
+
+        for call in entity.function_calls:
+            yield call, self.entities.get(call.function_name)
@@ -0,0 +1,257 @@
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable
+from datetime import datetime
+from CodeEntityClass import CodeEntity
+from CFunctionParserClass import CFunctionParser, TOKEN_CODES
+from logger import logger
+import json
+import os
+import re
+
+# Only the tokenizer is used: it skips comments and string literals
+_TOKENIZER = CFunctionParser()
+
+
+class SymbolTable:
+    """Global table of struct, union and enum types and the typedefs naming them.
+
+    Aggregates are keyed by their tag ('struct _radio'), or by their typedef name
+    when they are anonymous. Every name a type is known by (tagged key, typedef
+    name, pointer alias) maps to that key in one dict, so lookups are O(1) and
+    tables built by separate parser processes can simply be merged. A bare tag
+    is not a type name in C, so '_radio' alone only resolves if it is also a
+    typedef name; otherwise every variable or field named like a tag would.
+    """
+
+    IDENTIFIER = re.compile(r'\b[A-Za-z_]\w*\b')
+    TAGGED = re.compile(r'\b(struct|union|enum)\s+([A-Za-z_]\w*)')
+    QUALIFIERS = frozenset(('const', 'volatile', 'struct', 'union', 'enum', 'unsigned', 'signed'))
+
+    def __init__(self):
+        self.types: Dict[str, Dict[str, Any]] = {}           # type key -> kind, name, members, ...
+        self.aliases: Dict[str, Tuple[str, bool]] = {}       # typedef name -> (target name, is_pointer)
+        self._lookup: Dict[str, Tuple[str, bool]] = {}       # any name -> (type key, is_pointer)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __contains__(self, type_name: str) -> bool:
+        return self.lookup(type_name) is not None
+
+    @staticmethod
+    def type_key(kind: str, name: str) -> str:
+        return f"{kind} {name}"
+
+    def add_aggregate(self, kind: str, tag: Optional[str], typedef_name: Optional[str],
+                      members: List[Dict], file_path: str = "", documentation: str = ""):
+        """Register a struct/union/enum definition and the typedef declared with it."""
+        name = tag or typedef_name
+        if not name:
+            return
+        key = self.type_key(kind, name)
+
+        # A forward declaration or an earlier partial parse never replaces members
+        existing = self.types.get(key)
+        if existing is None or (members and not existing['members']):
+            self.types[key] = {
+                'kind': kind,
+                'tag': tag,
+                'name': typedef_name or tag,
+                'members': members,
+                'file_path': str(file_path),
+                'documentation': documentation
+            }
+        elif typedef_name and existing['name'] == existing['tag']:
+            existing['name'] = typedef_name
+
+        self._lookup[key] = (key, False)
+        if typedef_name:
+            self.aliases[typedef_name] = (key, False)
+            self._lookup[typedef_name] = (key, False)
+
+    def add_typedef(self, alias: str, target: str, is_pointer: bool = False):
+        """Register 'typedef <target> alias' where target is a tag key or another type name."""
+        self.aliases[alias] = (target, is_pointer)
+        resolved = self._resolve_alias(alias)
+        if resolved is not None:
+            self._lookup[alias] = resolved
+
+    def _resolve_alias(self, name: str) -> Optional[Tuple[str, bool]]:
+        is_pointer = False
+        seen = set()
+        while name in self.aliases and name not in seen:
+            seen.add(name)
+            name, pointer = self.aliases[name]
+            is_pointer = is_pointer or pointer
+        if name in self.types:
+            return name, is_pointer
+        found = self._lookup.get(name)
+        if found is not None:
+            return found[0], is_pointer or found[1]
+        return None
+
+    def lookup(self, type_name: str, pointer_prefix: bool = True) -> Optional[Tuple[str, bool]]:
+        """Resolve a type name to (type key, is_pointer), or None if it is unknown.
+
+        pointer_prefix allows the RDK PFOO -> FOO * fallback; only use it where
+        the name is known to be in a type position.
+        """
+        type_name = type_name.strip()
+        found = self._lookup.get(type_name)
+        if found is not None:
+            return found
+
+        # Typedefs seen before the type they name are resolved on first use
+        if type_name in self.aliases:
+            found = self._resolve_alias(type_name)
+            if found is not None:
+                self._lookup[type_name] = found
+            return found
+
+        # 'const struct _radio *' and similar spellings
+        tagged = self.TAGGED.search(type_name)
+        if tagged is not None:
+            key = self.type_key(*tagged.groups())
+            found = self._lookup.get(key) if key != type_name else None
+            if found is not None:
+                return found[0], found[1] or '*' in type_name
+            return None
+        words = [w for w in self.IDENTIFIER.findall(type_name) if w not in self.QUALIFIERS]
+        if len(words) == 1 and words[0] != type_name:
+            found = self.lookup(words[0], pointer_prefix)
+            if found is not None:
+                return found[0], found[1] or '*' in type_name
+            return None
+
+        # RDK convention: PFOO is a pointer to FOO
+        if pointer_prefix and len(type_name) > 1 and type_name[0] == 'P':
+            found = self._lookup.get(type_name[1:])
+            if found is not None:
+                return found[0], True
+        return None
+
+    def resolve(self, type_name: str) -> Optional[Dict[str, Any]]:
+        """Return the definition (kind, name, members, ...) a type name refers to."""
+        found = self.lookup(type_name)
+        if found is None:
+            return None
+        definition = dict(self.types.get(found[0], {}))
+        if not definition:
+            return None
+        definition['is_pointer'] = found[1]
+        return definition
+
+    def entity_name(self, type_name: str, pointer_prefix: bool = True) -> Optional[str]:
+        """Name of the CodeEntity that defines a type, i.e. its typedef or tag name."""
+        found = self.lookup(type_name, pointer_prefix)
+        if found is None or found[0] not in self.types:
+            return None
+        return self.types[found[0]]['name']
+
+    def members(self, type_name: str) -> List[Dict]:
+        definition = self.resolve(type_name)
+        return definition['members'] if definition else []
+
+    def structs_used(self, entity: CodeEntity) -> List[str]:
+        """Resolve the types referenced by an entity to the entities defining them."""
+        if entity.type == 'struct':
+            candidates = {(member.get('type', ''), True) for member in entity.metadata.get('members', [])}
+        else:
+            candidates = self._code_type_names(entity.content)
+
+        used = set()
+        for candidate, pointer_prefix in candidates:
+            name = self.entity_name(candidate, pointer_prefix)
+            if name and name != entity.name:
+                used.add(name)
+        return sorted(used)
+
+    def _code_type_names(self, content: str) -> Set[Tuple[str, bool]]:
+        """(name, in a type position) for the identifiers of code, leaving out comments and strings.
+
+        Tags only count when spelled with their kind ('struct _radio'). A name is
+        in a type position when another identifier follows it (declarations and
+        parameters, pointers included since '*' is not a token) or it is a cast.
+        """
+        tokens = _TOKENIZER.tokenize_compact(content)
+        identifier = TOKEN_CODES['IDENTIFIER']
+        open_paren, close_paren = TOKEN_CODES['('], TOKEN_CODES[')']
+        types = tokens.types
+        names = set()
+        index = 0
+        while index < len(types):
+            if types[index] != identifier:
+                index += 1
+                continue
+            value = tokens.value(index)
+            following = types[index + 1] if index + 1 < len(types) else None
+            if value in ('struct', 'union', 'enum') and following == identifier:
+                names.add((self.type_key(value, tokens.value(index + 1)), False))
+                index += 2
+                continue
+            cast = following == close_paren and index > 0 and types[index - 1] == open_paren
+            names.add((value, following == identifier or cast))
+            index += 1
+        return names
+
+    def resolve_structs_used(self, entities: Iterable[CodeEntity]) -> int:
+        """Recompute structs_used for every entity against the full table."""
+        updated = 0
+        for entity in entities:
+            structs_used = self.structs_used(entity)
+            if structs_used != entity.structs_used:
+                entity.structs_used = structs_used
+                updated += 1
+        return updated
+
+    def merge(self, other: 'SymbolTable'):
+        """Merge a table built by another parser, e.g. a worker process."""
+        for key, definition in other.types.items():
+            existing = self.types.get(key)
+            if existing is None or (definition['members'] and not existing['members']):
+                self.types[key] = definition
+        self.aliases.update(other.aliases)
+        self._rebuild_lookup()
+
+    def _rebuild_lookup(self):
+        self._lookup = {}
+        for key, definition in self.types.items():
+            self._lookup[key] = (key, False)
+        for alias in self.aliases:
+            resolved = self._resolve_alias(alias)
+            if resolved is not None:
+                self._lookup[alias] = resolved
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'types': self.types,
+            'aliases': {alias: list(target) for alias, target in self.aliases.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SymbolTable':
+        table = cls()
+        table.types = data.get('types', {})
+        table.aliases = {alias: (target, is_pointer) for alias, (target, is_pointer) in data.get('aliases', {}).items()}
+        table._rebuild_lookup()
+        return table
+
+    def save(self, base_path: str = "vector_stores"):
+        os.makedirs(base_path, exist_ok=True)
+        data = self.to_dict()
+        data['creation_timestamp'] = datetime.now().isoformat()
+        with open(os.path.join(base_path, "symbol_table.json"), 'w') as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, base_path: str = "vector_stores") -> Optional['SymbolTable']:
+        path = os.path.join(base_path, "symbol_table.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                table = cls.from_dict(json.load(f))
+            logger.info(f"Loaded symbol table with {len(table.types)} types and {len(table.aliases)} typedefs")
+            return table
+        except Exception as e:
+            logger.error(f"Error loading symbol table: {str(e)}")
+            return None
@@ -0,0 +1,109 @@
+from typing import Dict, List, Set, Any, Optional, Tuple
+from langchain_community.vectorstores import FAISS
+from logger import logger
+import numpy as np
+import faiss
+import os
+
+
+class VectorQuantizer:
+    """Replace the flat float32 index of a FAISS store with a compressed one.
+
+    Schemes: 'none' (IndexFlatL2), 'fp16' and 'sq8' (IndexScalarQuantizer, 2 and
+    1 byte per dimension) and 'pq' (IndexPQ, pq_subquantizers codes of pq_bits
+    each). Stores below min_vectors stay flat, and PQ falls back to sq8 when there
+    are too few vectors to train its codebooks. The full-precision vectors are
+    kept in a .npy file next to the index so that the top candidates can be
+    re-ranked exactly from a memory map shared by all processes.
+    """
+
+    SCHEMES = ('none', 'fp16', 'sq8', 'pq')
+    VECTORS_FILE = "vectors.npy"
+
+    def __init__(self, scheme: str = 'none', pq_subquantizers: int = 96, pq_bits: int = 8,
+                 min_vectors: int = 256):
+        if scheme not in self.SCHEMES:
+            raise ValueError(f"Unknown quantization scheme {scheme!r}, expected one of {self.SCHEMES}")
+        self.scheme = scheme
+        self.pq_subquantizers = pq_subquantizers
+        self.pq_bits = pq_bits
+        self.min_vectors = min_vectors
+
+    def effective_scheme(self, count: int, dimension: int) -> str:
+        if self.scheme == 'none' or count < self.min_vectors:
+            return 'none'
+        if self.scheme == 'pq':
+            # k-means needs a few points per centroid, and the dimension must split evenly
+            if dimension % self.pq_subquantizers or count < 4 * (1 << self.pq_bits):
+                logger.info(f"Too few vectors ({count}) or uneven dimension ({dimension}) for PQ, using sq8")
+                return 'sq8'
+        return self.scheme
+
+    def build_index(self, vectors: np.ndarray) -> faiss.Index:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        count, dimension = vectors.shape
+        scheme = self.effective_scheme(count, dimension)
+        if scheme == 'fp16':
+            index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16)
+        elif scheme == 'sq8':
+            index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit)
+        elif scheme == 'pq':
+            index = faiss.IndexPQ(dimension, self.pq_subquantizers, self.pq_bits)
+        else:
+            index = faiss.IndexFlatL2(dimension)
+        if not index.is_trained:
+            index.train(vectors)
+        index.add(vectors)
+        return index
+
+    def quantize(self, store: FAISS) -> Optional[np.ndarray]:
+        """Swap the store's index for a quantized one and return the full-precision vectors.
+
+        Returns None when the store stays flat, since the index itself is then exact.
+        """
+        index = store.index
+        if self.scheme == 'none' or index.ntotal == 0 or not isinstance(index, faiss.IndexFlat):
+            return None
+        vectors = index.reconstruct_n(0, index.ntotal)
+        store.index = self.build_index(vectors)
+        if isinstance(store.index, faiss.IndexFlat):
+            return None
+        return vectors
+
+    @staticmethod
+    def describe(index: faiss.Index) -> Dict[str, Any]:
+        """Quantization details of an index, as recorded in the store metadata."""
+        if isinstance(index, faiss.IndexScalarQuantizer):
+            scheme = 'fp16' if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else 'sq8'
+            details = {'scheme': scheme}
+        elif isinstance(index, faiss.IndexPQ):
+            details = {'scheme': 'pq', 'subquantizers': index.pq.M, 'bits': index.pq.nbits}
+        else:
+            details = {'scheme': 'none'}
+        details['index_type'] = type(index).__name__
+        details['bytes_per_vector'] = index.sa_code_size()
+        return details
+
+    @classmethod
+    def save_vectors(cls, vectors: Optional[np.ndarray], store_path: str):
+        path = os.path.join(store_path, cls.VECTORS_FILE)
+        if vectors is not None:
+            np.save(path, np.asarray(vectors, dtype=np.float32))
+        elif os.path.exists(path):
+            os.remove(path)  # Left over from an earlier quantized build
+
+    @classmethod
+    def load_vectors(cls, store_path: str) -> Optional[np.ndarray]:
+        path = os.path.join(store_path, cls.VECTORS_FILE)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r')
+
+    @staticmethod
+    def rerank(vectors: np.ndarray, query: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact squared L2 distances for the candidate rows, closest first."""
+        order = np.argsort(rows)  # Sorted reads are kinder to the memory map
+        candidates = np.asarray(vectors[rows[order]], dtype=np.float32)
+        distances = ((candidates - query) ** 2).sum(axis=1)
+        ranking = np.argsort(distances, kind='stable')
+        return rows[order][ranking], distances[ranking]
@@ -0,0 +1,136 @@
+from typing import Dict, List, Set, Any, Optional, Tuple
+from langchain_community.vectorstores import FAISS
+from VectorQuantizerClass import VectorQuantizer
+from datetime import datetime
+import numpy as np
+import shutil
+import json
+import os
+import re
+
+
+class VectorShard:
+    """The vectors of one component for one store type.
+
+    Holds the code index, the optional description index and, for quantized
+    indices, their full-precision vectors. Shards live under
+    vector_stores/<type>/<component>/ so that a component can be rebuilt and
+    saved on its own.
+    """
+
+    def __init__(self, store_type: str, component: str, store: FAISS,
+                 description_store: Optional[FAISS] = None,
+                 exact_vectors: Optional[np.ndarray] = None,
+                 description_vectors: Optional[np.ndarray] = None):
+        self.store_type = store_type
+        self.component = component
+        self.store = store
+        self.description_store = description_store
+        self.exact_vectors = exact_vectors
+        self.description_vectors = description_vectors
+        # Ids are '<entity name>#<chunk>', see VectorStoreManager._build_shard
+        self.names: Set[str] = {doc_id.rsplit('#', 1)[0] for doc_id in store.index_to_docstore_id.values()}
+
+    @staticmethod
+    def directory_name(component: str) -> str:
+        return re.sub(r'[^\w.-]', '_', component) or '_'
+
+    @property
+    def size(self) -> int:
+        return self.store.index.ntotal
+
+    @property
+    def description_size(self) -> int:
+        return self.description_store.index.ntotal if self.description_store is not None else 0
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        index_path = os.path.join(path, "index")
+        self.store.save_local(index_path)
+        VectorQuantizer.save_vectors(self.exact_vectors, index_path)
+
+        description_path = os.path.join(path, "desc_index")
+        if self.description_store is not None:
+            self.description_store.save_local(description_path)
+            VectorQuantizer.save_vectors(self.description_vectors, description_path)
+        elif os.path.exists(description_path):
+            shutil.rmtree(description_path)
+
+        with open(os.path.join(path, "metadata.json"), 'w') as f:
+            json.dump({
+                'store_type': self.store_type,
+                'component': self.component,
+                'total_vectors': self.size,
+                'description_vectors': self.description_size,
+                'embedding_dimension': self.store.index.d,
+                'quantization': VectorQuantizer.describe(self.store.index),
+                'exact_rerank': self.exact_vectors is not None,
+                'creation_timestamp': datetime.now().isoformat()
+            }, f)
+
+    @classmethod
+    def load(cls, path: str, store_type: str, component: str, embedding_model) -> Optional['VectorShard']:
+        index_path = os.path.join(path, "index")
+        if not os.path.exists(index_path):
+            return None
+        store = FAISS.load_local(index_path, embedding_model, allow_dangerous_deserialization=True)
+
+        description_store = None
+        description_path = os.path.join(path, "desc_index")
+        if os.path.exists(description_path):
+            description_store = FAISS.load_local(description_path, embedding_model, allow_dangerous_deserialization=True)
+        return cls(
+            store_type, component, store, description_store,
+            VectorQuantizer.load_vectors(index_path),
+            VectorQuantizer.load_vectors(description_path) if description_store is not None else None
+        )
+
+    def search(self, query_vector: List[float], fetch_k: int, filter_dict: Optional[Dict] = None,
+               rerank_factor: int = 4, description: bool = False) -> List[Tuple[Any, float]]:
+        """Nearest (document, squared L2 distance) pairs, exactly re-ranked for quantized indices."""
+        store = self.description_store if description else self.store
+        exact = self.description_vectors if description else self.exact_vectors
+        if store is None:
+            return []
+
+        query = np.asarray([query_vector], dtype=np.float32)
+        candidates = fetch_k * (rerank_factor if exact is not None else 1)
+        if filter_dict:
+            candidates = max(20, candidates * 5)
+        candidates = min(candidates, store.index.ntotal)
+        if candidates <= 0:
+            return []
+
+        distances, rows = store.index.search(query, candidates)
+        valid = rows[0] >= 0
+        rows, distances = rows[0][valid], distances[0][valid]
+        if exact is not None:
+            rows, distances = VectorQuantizer.rerank(exact, query[0], rows)
+
+        results = []
+        for row, distance in zip(rows, distances):
+            doc = store.docstore.search(store.index_to_docstore_id[int(row)])
+            if filter_dict and not self.matches_filter(doc.metadata, filter_dict):
+                continue
+            results.append((doc, float(distance)))
+            if len(results) == fetch_k:
+                break
+        return results
+
+    @staticmethod
+    def matches_filter(metadata: Dict[str, Any], filter_dict: Dict[str, Any]) -> bool:
+        """Metadata filter supporting plain equality, $eq, $ne, $in and $nin."""
+        for key, condition in filter_dict.items():
+            value = metadata.get(key)
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            for operator, operand in condition.items():
+                if operator == '$eq' and value != operand:
+                    return False
+                if operator == '$ne' and value == operand:
+                    return False
+                if operator == '$in' and value not in operand:
+                    return False
+                if operator == '$nin' and value in operand:
+                    return False
+        return True
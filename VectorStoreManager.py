@@ -1,4 +1,4 @@
-from typing import Dict, List, Set, Any, Optional, Tuple
+from typing import Dict, List, Set, Any, Optional, Tuple, Iterable
 from CodeEntityClass import CodeEntity
 from langchain_community.vectorstores import FAISS
 from logger import logger
@@ -6,78 +6,170 @@ import json
 import os
 from datetime import datetime
 from langchain_community.embeddings import GooglePalmEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from EntityChunkerClass import EntityChunker
+from EmbeddingTextBuilderClass import EmbeddingTextBuilder
+from VectorQuantizerClass import VectorQuantizer
+from VectorShardClass import VectorShard
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+import heapq
+import shutil
 from LogAnalysisResult import LogAnalysisResult
 
 class VectorStoreManager:
-    def __init__(self, embedding_model: GooglePalmEmbeddings):
+    # Store types split into one shard per component under vector_stores/<type>/<component>/
+    SHARDED_STORES = ('function', 'struct', 'api')
+    # Store types that get a second index over the entity descriptions
+    DESCRIPTION_STORES = ('function', 'struct', 'api')
+
+    def __init__(self, embedding_model: GooglePalmEmbeddings,
+                 text_builder: Optional[EmbeddingTextBuilder] = None,
+                 search_weights: Optional[Dict[str, float]] = None,
+                 quantizer: Optional[VectorQuantizer] = None, rerank_factor: int = 4,
+                 route_k: Optional[int] = None, search_workers: int = 8):
         self.embedding_model = embedding_model
-        self.vector_stores = {
-            'function': None,
-            'struct': None,
-            'component': None,
-            'api': None
-        }
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
-        )
+        self.text_builder = text_builder or EmbeddingTextBuilder()
+        # One FAISS entry per component name; used to route queries to shards
+        self.component_store: Optional[FAISS] = None
+        # store type -> component -> shard
+        self.shards: Dict[str, Dict[str, VectorShard]] = {store_type: {} for store_type in self.SHARDED_STORES}
+        self.search_weights = {'code': 0.5, 'description': 0.5}
+        self.search_weights.update(search_weights or {})
+        # Oversized entities are embedded as several chunks carrying the entity name
+        self.chunker = EntityChunker()
+        self.quantizer = quantizer or VectorQuantizer()
+        # Quantized stores re-rank rerank_factor times the requested candidates exactly
+        self.rerank_factor = rerank_factor
+        # Without a filter, only the route_k components closest to the query are searched (None: all)
+        self.route_k = route_k
+        self.executor = ThreadPoolExecutor(max_workers=search_workers, thread_name_prefix="shard-search")
+    
+    @staticmethod
+    def _shard_path(base_path: str, store_type: str, component: str) -> str:
+        return os.path.join(base_path, store_type, VectorShard.directory_name(component))
     
     def save_indices(self, base_path: str = "vector_stores"):
         """Save all vector store indices with explicit safety settings"""
         os.makedirs(base_path, exist_ok=True)
-        for store_type, store in self.vector_stores.items():
-            if store is not None:
-                store_path = os.path.join(base_path, f"{store_type}_index")
-                # store.save_local(store_path, allow_dangerous_deserialization=True)
-                store.save_local(store_path)
-                
-                # Save metadata separately in JSON format
-                metadata_path = os.path.join(base_path, f"{store_type}_metadata.json")
-                with open(metadata_path, 'w') as f:
-                    json.dump({
-                        'store_type': store_type,
-                        'total_vectors': len(store.index_to_docstore_id),
-                        'embedding_dimension': store.index.d,
-                        'creation_timestamp': datetime.now().isoformat()
-                    }, f)
+        if self.component_store is not None:
+            store_path = os.path.join(base_path, "component_index")
+            self.component_store.save_local(store_path)
+            with open(os.path.join(base_path, "component_metadata.json"), 'w') as f:
+                json.dump({
+                    'store_type': 'component',
+                    'total_vectors': len(self.component_store.index_to_docstore_id),
+                    'embedding_dimension': self.component_store.index.d,
+                    'creation_timestamp': datetime.now().isoformat()
+                }, f)
+        
+        for store_type, shards in self.shards.items():
+            for component, shard in shards.items():
+                shard.save(self._shard_path(base_path, store_type, component))
+            self._save_store_metadata(store_type, base_path)
+    
+    def _save_store_metadata(self, store_type: str, base_path: str):
+        """Write <type>_metadata.json listing the shards and drop directories no longer listed."""
+        shards = self.shards[store_type]
+        directories = {component: VectorShard.directory_name(component) for component in shards}
+        
+        store_dir = os.path.join(base_path, store_type)
+        if os.path.isdir(store_dir):
+            for directory in set(os.listdir(store_dir)) - set(directories.values()):
+                shutil.rmtree(os.path.join(store_dir, directory), ignore_errors=True)
+        # Indices from before sharding
+        for legacy in (f"{store_type}_index", f"{store_type}_desc_index"):
+            shutil.rmtree(os.path.join(base_path, legacy), ignore_errors=True)
+        
+        if not shards:
+            metadata_path = os.path.join(base_path, f"{store_type}_metadata.json")
+            if os.path.exists(metadata_path):
+                os.remove(metadata_path)
+            return
+        
+        with open(os.path.join(base_path, f"{store_type}_metadata.json"), 'w') as f:
+            json.dump({
+                'store_type': store_type,
+                'shards': directories,
+                'total_vectors': sum(shard.size for shard in shards.values()),
+                'description_vectors': sum(shard.description_size for shard in shards.values()),
+                'embedding_dimension': next(iter(shards.values())).store.index.d,
+                'max_chunk_chars': self.chunker.max_chunk_chars,
+                'embedding_text_version': self.text_builder.version,
+                'quantization': self.quantizer.scheme,
+                'creation_timestamp': datetime.now().isoformat()
+            }, f)
     
     def load_indices(self, base_path: str = "vector_stores") -> bool:
         """Load all vector store indices with explicit safety settings"""
         try:
-            for store_type in self.vector_stores.keys():
-                store_path = os.path.join(base_path, f"{store_type}_index")
+            component_path = os.path.join(base_path, "component_index")
+            if os.path.exists(component_path):
+                self.component_store = FAISS.load_local(
+                    component_path,
+                    self.embedding_model,
+                    allow_dangerous_deserialization=True
+                )
+            
+            for store_type in self.SHARDED_STORES:
                 metadata_path = os.path.join(base_path, f"{store_type}_metadata.json")
+                if not os.path.exists(metadata_path):
+                    continue
+                
+                # Load and verify metadata first
+                with open(metadata_path, 'r') as f:
+                    metadata = json.load(f)
+                    if metadata['store_type'] != store_type:
+                        logger.warning(f"Metadata mismatch for {store_type}, skipping...")
+                        continue
+                
+                if 'shards' not in metadata:
+                    logger.warning(f"{store_type} index is not sharded by component; rebuild required")
+                    return False
                 
-                if os.path.exists(store_path) and os.path.exists(metadata_path):
-                    # Load and verify metadata first
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                        if metadata['store_type'] != store_type:
-                            logger.warning(f"Metadata mismatch for {store_type}, skipping...")
-                            continue
-                    
-                    # Load the vector store with explicit safety setting
-                    self.vector_stores[store_type] = FAISS.load_local(
-                        store_path,
-                        self.embedding_model,
-                        allow_dangerous_deserialization=True
+                # Indices embedded with different text must be rebuilt, not mixed
+                version = metadata.get('embedding_text_version')
+                if version is None:
+                    logger.warning(f"{store_type} index has no embedding text version, assuming it is current")
+                elif version != self.text_builder.version:
+                    logger.warning(
+                        f"{store_type} index was built with embedding text {version}, "
+                        f"current is {self.text_builder.version}; rebuild required"
                     )
-                    logger.info(f"Successfully loaded {store_type} index with {metadata['total_vectors']} vectors")
+                    return False
+                
+                scheme = metadata.get('quantization', 'none')
+                if scheme != self.quantizer.scheme:
+                    logger.info(f"{store_type} index uses {scheme} quantization, configured is {self.quantizer.scheme}")
+                
+                shards = {}
+                for component, directory in metadata['shards'].items():
+                    shard = VectorShard.load(
+                        os.path.join(base_path, store_type, directory), store_type, component, self.embedding_model
+                    )
+                    if shard is None:
+                        logger.warning(f"Missing {store_type} shard for {component}; rebuild required")
+                        return False
+                    shards[component] = shard
+                self.shards[store_type] = shards
+                logger.info(
+                    f"Successfully loaded {store_type} index with {metadata['total_vectors']} vectors "
+                    f"in {len(shards)} shards"
+                )
             return True
         except Exception as e:
             logger.error(f"Error loading indices: {str(e)}")
             return False
     #--------------------------------------------------------------
 
-    def create_indices(self, entities: List[CodeEntity]):
-        """Create specialized indices for different types of searches"""
-        grouped_entities = {
-            'function': [],
-            'struct': [],
-            'component': set(),
-            'api': []
+    @staticmethod
+    def _group_entities(entities: Iterable[CodeEntity]) -> Tuple[Dict[str, Dict[str, List[CodeEntity]]], Set[str]]:
+        """Entities per sharded store type and component, and the set of all components."""
+        grouped_entities: Dict[str, Dict[str, List[CodeEntity]]] = {
+            'function': {},
+            'struct': {},
+            'api': {}
         }
+        components = set()
         
         for entity in entities:
             # logger.info(f"enitity.name : {entity.name}, enitity.type : {entity.type}")
@@ -90,65 +182,247 @@ class VectorStoreManager:
                     logger.info(f"---> from {entity.function_calls[i].component} Component")
                     logger.info(f"---------------")
                     # logger.info(f"Function Calls : ")
-                grouped_entities['function'].append(entity)
+                grouped_entities['function'].setdefault(entity.component, []).append(entity)
                 if any(call.is_api for call in entity.function_calls):
-                    grouped_entities['api'].append(entity)
+                    grouped_entities['api'].setdefault(entity.component, []).append(entity)
             elif entity.type == 'struct':
-                grouped_entities['struct'].append(entity)
-            grouped_entities['component'].add(entity.component)
+                grouped_entities['struct'].setdefault(entity.component, []).append(entity)
+            components.add(entity.component)
+        return grouped_entities, components
+
+    def create_indices(self, entities: List[CodeEntity]):
+        """Create specialized indices for different types of searches"""
+        grouped_entities, components = self._group_entities(entities)
         
         # Create vector stores
-        for store_type, items in grouped_entities.items():
-            if items:
-                if store_type == 'component':
-                    texts = list(items)
-                    metadatas = [{'component': comp} for comp in items]
-                else:
-                    texts = [entity.to_embedding_text() for entity in items]
-                    metadatas = [{
-                        'name': entity.name,
-                        'component': entity.component,
-                        'file_path': entity.file_path,
-                        'type': entity.type
-                    } for entity in items]
-                # logger.info(r"--------------------------------------")
-                # logger.info(f"texts : {texts}")
-                # logger.info(r"--------------------------------------")
-                # logger.info(f"metadatas : {metadatas}")
-                # logger.info(r"--------------------------------------")
-                self.vector_stores[store_type] = FAISS.from_texts(
-                    texts=texts,
-                    embedding=self.embedding_model,
-                    metadatas=metadatas
-                )
+        for store_type, by_component in grouped_entities.items():
+            self.shards[store_type] = {
+                component: self._build_shard(store_type, component, items)
+                for component, items in by_component.items()
+            }
+        
+        self.component_store = None
+        if components:
+            self.component_store = FAISS.from_texts(
+                texts=list(components),
+                embedding=self.embedding_model,
+                metadatas=[{'component': comp} for comp in components]
+            )
         
         # Save indices after creation
         self.save_indices()
     
+    def rebuild_component(self, component: str, entities: Iterable[CodeEntity], base_path: str = "vector_stores"):
+        """Rebuild and save the shards of one component, leaving the other components untouched.
+
+        entities may be the whole entity set; only those of the component are used.
+        """
+        grouped_entities, _ = self._group_entities(entity for entity in entities if entity.component == component)
+        for store_type, by_component in grouped_entities.items():
+            items = by_component.get(component)
+            if items:
+                shard = self._build_shard(store_type, component, items)
+                self.shards[store_type][component] = shard
+                shard.save(self._shard_path(base_path, store_type, component))
+            else:
+                self.shards[store_type].pop(component, None)
+            self._save_store_metadata(store_type, base_path)
+        
+        known = set()
+        if self.component_store is not None:
+            known = {doc.metadata.get('component') for doc in self.component_store.docstore._dict.values()}
+        if component not in known:
+            if self.component_store is None:
+                self.component_store = FAISS.from_texts([component], self.embedding_model, metadatas=[{'component': component}])
+            else:
+                self.component_store.add_texts([component], metadatas=[{'component': component}])
+            self.component_store.save_local(os.path.join(base_path, "component_index"))
+    
+    def _build_shard(self, store_type: str, component: str, items: List[CodeEntity]) -> VectorShard:
+        """Build the code index and, where descriptions exist, the description index.
+
+        Both are embedded in one batch and use ids '<entity name>#<chunk>' and
+        '<entity name>#desc', so hits from either index resolve to the same entity.
+        """
+        with_descriptions = store_type in self.DESCRIPTION_STORES
+        texts, metadatas, ids = [], [], []
+        desc_texts, desc_metadatas, desc_ids = [], [], []
+        for entity in items:
+            description = self.text_builder.description_text(entity) if with_descriptions else ""
+            text = self.text_builder.build(entity, include_description=not with_descriptions)
+            chunks = self.chunker.chunk(
+                entity, text, self.text_builder.body(entity), include_description=not with_descriptions
+            )
+            for text, metadata in chunks:
+                metadata['has_description'] = bool(description)
+                texts.append(text)
+                metadatas.append(metadata)
+                ids.append(f"{entity.name}#{metadata['chunk_index']}")
+            if description:
+                metadata = self.chunker.metadata(entity, 0, 1, 'description')
+                metadata['has_description'] = True
+                desc_texts.append(description)
+                desc_metadatas.append(metadata)
+                desc_ids.append(f"{entity.name}#desc")
+        
+        vectors = self.embedding_model.embed_documents(texts + desc_texts)
+        store = FAISS.from_embeddings(
+            list(zip(texts, vectors[:len(texts)])), self.embedding_model, metadatas=metadatas, ids=ids
+        )
+        description_store, description_vectors = None, None
+        if desc_texts:
+            description_store = FAISS.from_embeddings(
+                list(zip(desc_texts, vectors[len(texts):])), self.embedding_model,
+                metadatas=desc_metadatas, ids=desc_ids
+            )
+            description_vectors = self.quantizer.quantize(description_store)
+        return VectorShard(
+            store_type, component, store, description_store,
+            self.quantizer.quantize(store), description_vectors
+        )
+
     def search(self, query: str, store_type: str, k: int = 5,
-              filter_dict: Optional[Dict] = None) -> List[Dict]:
-        """Search specific vector store with optional filtering"""
-        if self.vector_stores[store_type] is None:
+              filter_dict: Optional[Dict] = None, pooling: str = 'max',
+              fetch_factor: int = 4, weights: Optional[Dict[str, float]] = None,
+              components: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Search specific vector store with optional filtering.
+
+        Chunk hits are pooled per entity ('max' keeps the best chunk, 'sum' adds up
+        the similarities of all chunks hit), so k is a number of entities. When a
+        shard has a description index the query vector is searched there too and
+        the two similarities are combined with the code/description weights. The
+        result keeps the best code chunk's document and distance as 'document'/'score'.
+
+        Shards are picked from components, else from 'component'/'name' conditions
+        in filter_dict, else from the route_k closest components, and are searched
+        in parallel with the per-shard top k merged.
+        """
+        if k <= 0:
+            return []
+        fetch_k = k * fetch_factor
+        
+        if store_type == 'component':
+            if self.component_store is None:
+                return []
+            results = self.component_store.similarity_search_with_score(query, k=fetch_k, filter=filter_dict)
+            return [
+                {'document': doc, 'score': score, 'metadata': doc.metadata,
+                 'pooled_score': 1.0 / (1.0 + float(score)), 'chunk_hits': 1}
+                for doc, score in results[:k]
+            ]
+        
+        query_vector = self.embedding_model.embed_query(query)
+        shards = self._route(store_type, query_vector, components, filter_dict)
+        if not shards:
             return []
         
-        search_kwargs = {}
-        if filter_dict:
-            search_kwargs['filter'] = filter_dict
+        weights = dict(self.search_weights, **(weights or {}))
+        def search_shard(shard: VectorShard) -> List[Dict]:
+            return self._search_shard(shard, query_vector, k, fetch_k, filter_dict, pooling, weights)
         
-        results = self.vector_stores[store_type].similarity_search_with_score(
-            query,
-            k=k,
-            **search_kwargs
+        if len(shards) == 1:
+            per_shard = [search_shard(shards[0])]
+        else:
+            per_shard = list(self.executor.map(search_shard, shards))
+        return heapq.nlargest(k, chain.from_iterable(per_shard), key=lambda hit: hit['pooled_score'])
+
+    def _route(self, store_type: str, query_vector: List[float], components: Optional[Iterable[str]],
+               filter_dict: Optional[Dict]) -> List[VectorShard]:
+        shards = self.shards.get(store_type, {})
+        if components is None and filter_dict:
+            components = self._components_from_filter(shards, filter_dict)
+        elif components is None and self.route_k and self.component_store is not None and len(shards) > self.route_k:
+            hits = self.component_store.similarity_search_with_score_by_vector(query_vector, k=self.route_k)
+            components = [doc.metadata['component'] for doc, _ in hits]
+        
+        if components is None:
+            return list(shards.values())
+        return [shards[component] for component in dict.fromkeys(components) if component in shards]
+
+    @staticmethod
+    def _components_from_filter(shards: Dict[str, VectorShard], filter_dict: Dict) -> Set[str]:
+        """Components whose shards can match the filter's component and name conditions."""
+        selected = set(shards)
+        if 'component' in filter_dict:
+            condition = {'component': filter_dict['component']}
+            selected = {component for component in selected if VectorShard.matches_filter({'component': component}, condition)}
+        
+        condition = filter_dict.get('name')
+        if condition is not None:
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            wanted = set(condition.get('$in', []))
+            if '$eq' in condition:
+                wanted.add(condition['$eq'])
+            if '$in' in condition or '$eq' in condition:
+                selected = {component for component in selected if shards[component].names & wanted}
+        return selected
+
+    def _search_shard(self, shard: VectorShard, query_vector: List[float], k: int, fetch_k: int,
+                      filter_dict: Optional[Dict], pooling: str, weights: Dict[str, float]) -> List[Dict]:
+        code_results = shard.search(query_vector, fetch_k, filter_dict, self.rerank_factor)
+        if shard.description_store is None or not weights.get('description'):
+            return self._pool_by_entity(code_results, k, pooling)
+        
+        description_results = shard.search(query_vector, fetch_k, filter_dict, self.rerank_factor, description=True)
+        return self._combine_scores(
+            self._pool_by_entity(code_results, None, pooling),
+            self._pool_by_entity(description_results, None, pooling),
+            k, weights
         )
-        # Convert results to a more usable format
-        formatted_results = []
-        for doc, score in results:
-            formatted_results.append({
-                'document': doc,
-                'score': score,
-                'metadata': doc.metadata
-            })
-        # print("------------> JAS21 formatted_results : ",formatted_results)
-        return formatted_results
 
-  
\ No newline at end of file
+    @staticmethod
+    def _combine_scores(code_hits: List[Dict], description_hits: List[Dict], k: int,
+                        weights: Dict[str, float]) -> List[Dict]:
+        """Weighted sum of code and description similarities per entity.
+
+        An entity missing from one result list scores 0 there, unless it has no
+        description at all, in which case only the code weight counts.
+        """
+        code_weight, description_weight = weights.get('code', 0.0), weights.get('description', 0.0)
+        code_by_name = {hit['metadata']['name']: hit for hit in code_hits}
+        description_by_name = {hit['metadata']['name']: hit for hit in description_hits}
+        
+        combined = []
+        for name in dict.fromkeys(list(code_by_name) + list(description_by_name)):
+            code_hit = code_by_name.get(name)
+            description_hit = description_by_name.get(name)
+            hit = dict(code_hit or description_hit)
+            code_score = code_hit['pooled_score'] if code_hit else 0.0
+            description_score = description_hit['pooled_score'] if description_hit else 0.0
+            has_description = description_hit is not None or hit['metadata'].get('has_description', False)
+            total_weight = code_weight + (description_weight if has_description else 0.0)
+            hit['code_score'] = code_score
+            hit['description_score'] = description_score
+            hit['pooled_score'] = (code_weight * code_score + description_weight * description_score) / (total_weight or 1.0)
+            combined.append(hit)
+        
+        combined.sort(key=lambda hit: hit['pooled_score'], reverse=True)
+        return combined[:k]
+
+    @staticmethod
+    def _pool_by_entity(results: List[Tuple[Any, float]], k: Optional[int], pooling: str = 'max') -> List[Dict]:
+        pooled: Dict[str, Dict] = {}
+        for doc, score in results:
+            name = doc.metadata.get('name')
+            similarity = 1.0 / (1.0 + float(score))  # FAISS returns L2 distances
+            entry = pooled.get(name)
+            if entry is None:
+                pooled[name] = {
+                    'document': doc,
+                    'score': score,
+                    'metadata': doc.metadata,
+                    'pooled_score': similarity,
+                    'chunk_hits': 1
+                }
+                continue
+            entry['chunk_hits'] += 1
+            if pooling == 'sum':
+                entry['pooled_score'] += similarity
+            else:
+                entry['pooled_score'] = max(entry['pooled_score'], similarity)
+            if score < entry['score']:
+                entry.update(document=doc, score=score, metadata=doc.metadata)
+        
+        ranked = sorted(pooled.values(), key=lambda entry: entry['pooled_score'], reverse=True)
+        return ranked[:k]
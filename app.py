@@ -1,6 +1,7 @@
 from flask import Flask, render_template, request, jsonify
 from flask_cors import CORS
 from RDKAssistant_Class import RDKAssistant
+from PreprocessorClass import Preprocessor
 import os
 
 app = Flask(__name__)
@@ -9,7 +10,11 @@ CORS(app)
 # Use environment variables for configuration
 assistant = RDKAssistant(
     code_base_path=os.environ.get('CODE_BASE_PATH', '/tmp/code_base'),
-    gemini_api_key=os.environ.get('GEMINI_API_KEY')
+    gemini_api_key=os.environ.get('GEMINI_API_KEY'),
+    build_defines=Preprocessor.parse_defines(os.environ.get('RDK_BUILD_DEFINES'))
+    if os.environ.get('RDK_BUILD_DEFINES') is not None else None,
+    quantization=os.environ.get('RDK_VECTOR_QUANTIZATION'),
+    log_directory=os.environ.get('RDK_LOG_DIRECTORY')
 )
 assistant.initialize()
 
@@ -26,5 +31,13 @@ def chat():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/log-source', methods=['POST'])
+def log_source():
+    line = request.json['line']
+    try:
+        return jsonify({'sources': assistant.find_log_source(line)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""Per-line throughput benchmark for LogAnalyzer line parsing on real RDK logs.
+
+Usage:
+    python benchmark_log_parsing.py [log_dir] [--repeat N] [--scale N] [--fields]
+
+log_dir defaults to rdklogs/logs. Every line of every file is parsed with the
+fast decoder and with the regex/strptime reference parser; --scale repeats the
+input N times for steadier numbers. --fields also reads the function name and
+API calls of each record, which the fast decoder otherwise extracts lazily.
+"""
+from LogAnalyzerClass import LogAnalyzer
+from pathlib import Path
+from typing import List
+import argparse
+import contextlib
+import io
+import time
+
+
+def load_lines(log_dir: Path) -> List[str]:
+    lines = []
+    for log_file in sorted(log_dir.iterdir()):
+        if log_file.is_file():
+            lines.extend(log_file.read_text(encoding='utf-8', errors='ignore').splitlines())
+    return lines
+
+
+def run(name: str, parse, lines: List[str], repeat: int, fields: bool):
+    best = float('inf')
+    records = 0
+    for _ in range(repeat):
+        # The reference parser prints on malformed lines
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            records = 0
+            for line in lines:
+                record = parse(line)
+                if record is not None:
+                    records += 1
+                    if fields:
+                        record.function_name, record.api_calls
+            best = min(best, time.perf_counter() - start)
+
+    print(f"{name:<10} {len(lines):>9} lines {records:>9} records  {best:8.3f}s  "
+          f"{len(lines) / best:>12,.0f} lines/s  {best / len(lines) * 1e6:8.2f} us/line")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('log_dir', nargs='?', default='rdklogs/logs')
+    arg_parser.add_argument('--repeat', type=int, default=3, help="Report the best of N runs")
+    arg_parser.add_argument('--scale', type=int, default=10, help="Parse the input N times per run")
+    arg_parser.add_argument('--fields', action='store_true', help="Also read function name and API calls")
+    args = arg_parser.parse_args()
+
+    lines = load_lines(Path(args.log_dir)) * args.scale
+    print(f"Loaded {len(lines)} lines, {sum(len(line) for line in lines) / 1e6:.2f} MB")
+
+    analyzer = LogAnalyzer(args.log_dir)
+    run("fast", analyzer.parse_line, lines, args.repeat, args.fields)
+    run("reference", analyzer._parse_line_reference, lines, args.repeat, args.fields)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Micro-benchmark for CFunctionParser tokenizers on real RDK sources.
+
+Usage:
+    python benchmark_tokenizer.py [source_dir] [--limit N] [--repeat N]
+
+source_dir defaults to $CODE_BASE_PATH. Reports tokens/sec and MB/sec for the
+regex tokenizer and the character-loop reference tokenizer.
+"""
+from CFunctionParserClass import CFunctionParser
+from pathlib import Path
+from typing import List
+import argparse
+import os
+import time
+
+
+def load_sources(source_dir: Path, limit: int) -> List[str]:
+    files = []
+    for ext in ['.c', '.cpp', '.cc', '.h']:
+        files.extend(source_dir.rglob(f'*{ext}'))
+    files = sorted(files)[:limit] if limit else sorted(files)
+    return [f.read_text(encoding='utf-8', errors='ignore') for f in files]
+
+
+def run(name: str, tokenize, sources: List[str], repeat: int):
+    best = float('inf')
+    token_count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        token_count = sum(len(tokenize(content)) for content in sources)
+        best = min(best, time.perf_counter() - start)
+
+    total_mb = sum(len(content) for content in sources) / 1e6
+    print(f"{name:<12} {token_count:>10} tokens  {best:8.3f}s  "
+          f"{token_count / best:>12,.0f} tokens/s  {total_mb / best:8.2f} MB/s")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('source_dir', nargs='?', default=os.getenv('CODE_BASE_PATH'))
+    arg_parser.add_argument('--limit', type=int, default=0, help="Only use the first N files")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="Report the best of N runs")
+    args = arg_parser.parse_args()
+
+    if not args.source_dir:
+        arg_parser.error("source_dir is required when CODE_BASE_PATH is not set")
+
+    sources = load_sources(Path(args.source_dir), args.limit)
+    print(f"Loaded {len(sources)} files, {sum(len(s) for s in sources) / 1e6:.2f} MB")
+
+    parser = CFunctionParser()
+    run("regex", parser.tokenize_compact, sources, args.repeat)
+    run("charwise", parser._tokenize_compact_charwise, sources, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
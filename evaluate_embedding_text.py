@@ -0,0 +1,147 @@
+"""Offline comparison of embedding-text builder configurations.
+
+Usage:
+    python evaluate_embedding_text.py [source] [--queries FILE] [--k N] [--embeddings]
+
+source is an entity cache (rdk_assistant_cache.json, the default) or a source
+directory, which is parsed without LLM descriptions. For every configuration
+the script reports the total embedded bytes and recall@k / MRR over a query set.
+The query file is a JSON list of {"query": ..., "expected": [entity names]};
+without one, queries are derived from function names ("wifi_getRadioEnable"
+becomes "wifi get radio enable"). Retrieval uses a TF-IDF model by default so no
+API calls are made; --embeddings uses the Gemini embedding model instead.
+"""
+from EmbeddingTextBuilderClass import EmbeddingTextBuilder
+from CodeEntityClass import CodeEntity
+from LoadEnities import load_entities
+from pathlib import Path
+from typing import Dict, List, Tuple, Callable
+from collections import Counter
+import numpy as np
+import argparse
+import json
+import math
+import os
+import re
+
+CONFIGURATIONS = {
+    'legacy': None,  # CodeEntity.to_embedding_text
+    'default': EmbeddingTextBuilder(),
+    'no_description': EmbeddingTextBuilder(budgets={'description': 0}),
+    'small_body': EmbeddingTextBuilder(budgets={'content': 128}),
+    'large_body': EmbeddingTextBuilder(budgets={'content': 1024, 'description': 256}),
+}
+
+WORD = re.compile(r'[A-Za-z]+|\d+')
+
+
+def words(text: str) -> List[str]:
+    # Split identifiers on underscores and camelCase so queries can match code
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
+    return [w.lower() for w in WORD.findall(text)]
+
+
+def load_source(source: str) -> Dict[str, CodeEntity]:
+    path = Path(source)
+    if path.is_file():
+        return load_entities(str(path))
+
+    from EnhancedCodeParserClass import EnhancedCodeParser
+    parser = EnhancedCodeParser()
+    entities = {}
+    for ext in ['.h', '.c', '.cpp', '.cc']:
+        for file_path in sorted(path.rglob(f'*{ext}')):
+            for entity in parser.parse_file(str(file_path), file_path.parent.name, include_functions=ext != '.h'):
+                entities[entity.name] = entity
+    return entities
+
+
+def default_queries(entities: Dict[str, CodeEntity]) -> List[Dict]:
+    queries = []
+    for entity in entities.values():
+        query_words = words(entity.name)
+        if entity.type == 'function' and len(query_words) >= 2:
+            queries.append({'query': ' '.join(query_words), 'expected': [entity.name]})
+    return queries
+
+
+def tfidf_embedder(texts: List[str]) -> Callable[[List[str]], np.ndarray]:
+    documents = [Counter(words(text)) for text in texts]
+    document_frequency = Counter(term for doc in documents for term in doc)
+    vocabulary = {term: idx for idx, term in enumerate(document_frequency)}
+    idf = np.zeros(len(vocabulary), dtype=np.float32)
+    for term, idx in vocabulary.items():
+        idf[idx] = math.log((1 + len(documents)) / (1 + document_frequency[term])) + 1
+
+    def embed(batch: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(batch), len(vocabulary)), dtype=np.float32)
+        for row, text in enumerate(batch):
+            for term, count in Counter(words(text)).items():
+                if term in vocabulary:
+                    matrix[row, vocabulary[term]] = (1 + math.log(count)) * idf[vocabulary[term]]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-9)
+    return embed
+
+
+def gemini_embedder(texts: List[str]) -> Callable[[List[str]], np.ndarray]:
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    model = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=os.getenv('GEMINI_API_KEY'))
+
+    def embed(batch: List[str]) -> np.ndarray:
+        matrix = np.asarray(model.embed_documents(batch), dtype=np.float32)
+        return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-9)
+    return embed
+
+
+def evaluate(names: List[str], texts: List[str], queries: List[Dict], k: int,
+             make_embedder) -> Tuple[float, float]:
+    embed = make_embedder(texts)
+    document_vectors = embed(texts)
+    query_vectors = embed([q['query'] for q in queries])
+    scores = query_vectors @ document_vectors.T
+
+    hits, reciprocal_ranks = 0, 0.0
+    for row, query in enumerate(queries):
+        ranking = np.argsort(-scores[row])[:k]
+        ranked_names = [names[i] for i in ranking]
+        expected = set(query['expected'])
+        for rank, name in enumerate(ranked_names, 1):
+            if name in expected:
+                hits += 1
+                reciprocal_ranks += 1.0 / rank
+                break
+    return hits / max(len(queries), 1), reciprocal_ranks / max(len(queries), 1)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('source', nargs='?', default='rdk_assistant_cache.json')
+    arg_parser.add_argument('--queries', help="JSON file with query/expected pairs")
+    arg_parser.add_argument('--k', type=int, default=5)
+    arg_parser.add_argument('--embeddings', action='store_true', help="Use Gemini embeddings instead of TF-IDF")
+    args = arg_parser.parse_args()
+
+    entities = load_source(args.source)
+    if args.queries:
+        with open(args.queries, 'r') as f:
+            queries = json.load(f)
+    else:
+        queries = default_queries(entities)
+    print(f"{len(entities)} entities, {len(queries)} queries")
+
+    names = list(entities)
+    make_embedder = gemini_embedder if args.embeddings else tfidf_embedder
+    print(f"{'configuration':<16} {'version':<12} {'bytes':>12} {'recall@' + str(args.k):>10} {'MRR':>8}")
+    for label, builder in CONFIGURATIONS.items():
+        if builder is None:
+            texts, version = [entities[n].to_embedding_text() for n in names], '-'
+        else:
+            texts, version = [builder.build(entities[n]) for n in names], builder.version
+        total_bytes = sum(len(text.encode('utf-8')) for text in texts)
+        recall, mrr = evaluate(names, texts, queries, args.k, make_embedder)
+        print(f"{label:<16} {version:<12} {total_bytes:>12,} {recall:>10.3f} {mrr:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 from RDKAssistant_Class import RDKAssistant
+from PreprocessorClass import Preprocessor
 import os
 from dotenv import load_dotenv
 
@@ -8,7 +9,14 @@ load_dotenv()
 if __name__ == "__main__":
     assistant = RDKAssistant(
         code_base_path=os.getenv('CODE_BASE_PATH'),
-        gemini_api_key=os.getenv('GEMINI_API_KEY')
+        gemini_api_key=os.getenv('GEMINI_API_KEY'),
+        # e.g. RDK_BUILD_DEFINES="FEATURE_SUPPORT_MESH,WIFI_HAL_VERSION_3"
+        build_defines=Preprocessor.parse_defines(os.getenv('RDK_BUILD_DEFINES'))
+        if os.getenv('RDK_BUILD_DEFINES') is not None else None,
+        # none, fp16, sq8 or pq
+        quantization=os.getenv('RDK_VECTOR_QUANTIZATION'),
+        # Directory of the device logs to follow
+        log_directory=os.getenv('RDK_LOG_DIRECTORY')
     )
     assistant.initialize()
     assistant.handle_user_interaction()
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""Memory and recall report for the vector quantization schemes.
+
+Usage:
+    python quantization_report.py [index_dir] [--store TYPE] [--component NAME] [--k N] [--queries N] [--rerank-factor N]
+
+index_dir is a saved FAISS store. By default the vectors of every shard of
+--store (function) under vector_stores/<type>/<component>/index are used, or
+only those of --component. The vectors are rebuilt under every scheme and searched with a sample of the stored
+vectors as queries, each query excluding itself. recall@k is measured against
+the exact flat search, with and without exact re-ranking of rerank_factor * k
+candidates from the full-precision vectors.
+"""
+from VectorQuantizerClass import VectorQuantizer
+from VectorShardClass import VectorShard
+from typing import Dict, List, Tuple
+import numpy as np
+import argparse
+import faiss
+import json
+import os
+import time
+
+SCHEMES = {
+    'none': VectorQuantizer('none', min_vectors=0),
+    'fp16': VectorQuantizer('fp16', min_vectors=0),
+    'sq8': VectorQuantizer('sq8', min_vectors=0),
+    'pq96x8': VectorQuantizer('pq', pq_subquantizers=96, pq_bits=8, min_vectors=0),
+    'pq96x6': VectorQuantizer('pq', pq_subquantizers=96, pq_bits=6, min_vectors=0),
+    'pq48x6': VectorQuantizer('pq', pq_subquantizers=48, pq_bits=6, min_vectors=0),
+}
+
+
+def neighbours(index: faiss.Index, queries: np.ndarray, query_rows: np.ndarray, k: int,
+               vectors: np.ndarray = None, rerank_factor: int = 1) -> List[List[int]]:
+    """Top-k rows per query, without the query's own row, optionally re-ranked exactly."""
+    candidates = min(k * rerank_factor + 1, index.ntotal)
+    _, rows = index.search(queries, candidates)
+    results = []
+    for query, own_row, row_list in zip(queries, query_rows, rows):
+        row_list = row_list[(row_list >= 0) & (row_list != own_row)]
+        if vectors is not None:
+            row_list, _ = VectorQuantizer.rerank(vectors, query, row_list)
+        results.append(list(row_list[:k]))
+    return results
+
+
+def recall(found: List[List[int]], truth: List[List[int]]) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / max(sum(len(t) for t in truth), 1)
+
+
+def shard_paths(store_type: str, component: str = None, base_path: str = "vector_stores") -> List[str]:
+    """Index directories of the shards of a store type, or of one component."""
+    if component is not None:
+        return [os.path.join(base_path, store_type, VectorShard.directory_name(component), "index")]
+    with open(os.path.join(base_path, f"{store_type}_metadata.json"), 'r') as f:
+        metadata = json.load(f)
+    return [os.path.join(base_path, store_type, directory, "index") for directory in metadata['shards'].values()]
+
+
+def load_vectors(index_dir: str) -> np.ndarray:
+    vectors = VectorQuantizer.load_vectors(index_dir)
+    if vectors is None:
+        index = faiss.read_index(os.path.join(index_dir, 'index.faiss'))
+        vectors = index.reconstruct_n(0, index.ntotal)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('index_dir', nargs='?')
+    arg_parser.add_argument('--store', default='function', help="store type whose shards are used without index_dir")
+    arg_parser.add_argument('--component', help="only this component's shard")
+    arg_parser.add_argument('--k', type=int, default=10)
+    arg_parser.add_argument('--queries', type=int, default=200)
+    arg_parser.add_argument('--rerank-factor', type=int, default=4)
+    args = arg_parser.parse_args()
+
+    index_dirs = [args.index_dir] if args.index_dir else shard_paths(args.store, args.component)
+    vectors = np.concatenate([load_vectors(index_dir) for index_dir in index_dirs])
+    count, dimension = vectors.shape
+
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(count, size=min(args.queries, count), replace=False)
+    queries = vectors[query_rows]
+    truth = neighbours(SCHEMES['none'].build_index(vectors), queries, query_rows, args.k)
+    print(f"{count} vectors of dimension {dimension}, {len(queries)} queries, k={args.k}")
+
+    print(f"{'scheme':<8} {'index':<22} {'B/vector':>9} {'index MB':>9} {'ms/query':>9} "
+          f"{'recall@' + str(args.k):>10} {'reranked':>9}")
+    for label, quantizer in SCHEMES.items():
+        if quantizer.scheme == 'pq' and dimension % quantizer.pq_subquantizers:
+            continue
+        built = quantizer.build_index(vectors)
+        details = VectorQuantizer.describe(built)
+
+        start = time.perf_counter()
+        found = neighbours(built, queries, query_rows, args.k)
+        elapsed = (time.perf_counter() - start) * 1000 / len(queries)
+        reranked = neighbours(built, queries, query_rows, args.k, vectors, args.rerank_factor)
+
+        megabytes = details['bytes_per_vector'] * count / 2 ** 20
+        print(f"{label:<8} {details['index_type']:<22} {details['bytes_per_vector']:>9} {megabytes:>9.2f} "
+              f"{elapsed:>9.3f} {recall(found, truth):>10.3f} {recall(reranked, truth):>9.3f}")
+    print(f"Re-ranking reads {dimension * 4} bytes per candidate from the memory-mapped {VectorQuantizer.VECTORS_FILE}")
+
+
+if __name__ == '__main__':
+    main()